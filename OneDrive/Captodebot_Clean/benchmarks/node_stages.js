@@ -0,0 +1,79 @@
+/**
+ * Node-side stages of a cell run, timed offline for run_benchmarks.py:
+ * stdout accumulation (output marshalling) and MockGPUService's close
+ * handler (finalizeExecution) against an in-memory database stub.
+ *
+ * Usage: node node_stages.js <results.json> [repeat]
+ */
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const MockGPUService = require('../server/services/mockGPUService');
+
+const OUTPUT_SIZES = { small: 10 * 1024, medium: 1024 * 1024, large: 10 * 1024 * 1024 };
+const CHUNK_BYTES = 64 * 1024;
+
+// sqlite3-style run(sql, params, callback) that completes on the next tick
+const db = {
+  run(sql, params, callback) {
+    if (typeof callback === 'function') {
+      setImmediate(() => callback.call({ lastID: 0, changes: 1 }, null));
+    }
+  }
+};
+
+function cellOutput(bytes) {
+  // Mostly an inline PNG, like a cell that draws a figure
+  const image = 'iVBORw0KGgo'.repeat(Math.ceil(bytes / 11)).slice(0, Math.max(0, bytes - 64));
+  return `Model RMSE: 0.1234\n<img src="data:image/png;base64,${image}" alt="Figure 1">\n`;
+}
+
+async function timeRuns(repeat, run) {
+  const samples = [];
+  for (let i = 0; i < repeat; i++) {
+    const start = process.hrtime.bigint();
+    await run();
+    samples.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  return samples;
+}
+
+async function main() {
+  const [outputPath, repeatArg] = process.argv.slice(2);
+  const repeat = parseInt(repeatArg, 10) || 5;
+  // Telemetry batching is not part of the timed close handler
+  const service = new MockGPUService(db, { record() {} });
+  const tempDir = fs.mkdtempSync(path.join(os.tmpdir(), 'captodebot-bench-'));
+  const stages = {};
+
+  for (const [size, bytes] of Object.entries(OUTPUT_SIZES)) {
+    const output = Buffer.from(cellOutput(bytes));
+
+    // The child's stdout arrives in pipe-sized chunks and is appended to a string
+    stages[`output_marshalling_${size}`] = await timeRuns(repeat, () => {
+      let stdout = '';
+      for (let offset = 0; offset < output.length; offset += CHUNK_BYTES) {
+        stdout += output.subarray(offset, offset + CHUNK_BYTES).toString();
+      }
+      return stdout.length;
+    });
+
+    const stdout = output.toString();
+    stages[`close_handler_${size}`] = await timeRuns(repeat, () => {
+      const tempFile = path.join(tempDir, `temp_bench_${Date.now()}.py`);
+      fs.writeFileSync(tempFile, 'print(1)\n');
+      return service.finalizeExecution({
+        userId: 1, sessionId: 'bench', source: 'print(1)', exitCode: 0, stdout, stderr: '',
+        requestedAt: Date.now(), startTime: Date.now(), tempFile, tempDir
+      });
+    });
+  }
+
+  fs.rmSync(tempDir, { recursive: true, force: true });
+  fs.writeFileSync(outputPath, JSON.stringify({ node: process.version, stages }, null, 2));
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
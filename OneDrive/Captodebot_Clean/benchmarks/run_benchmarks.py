@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+# Offline micro-benchmarks for the cell execution path
+#
+# Times each stage of a cell run separately, without network access:
+#   interpreter_start      cold `python -c pass`
+#   template_import        cold interpreter running ml_template.py
+#   latest_upload_lookup   the kernel's catalog query for the caller's latest upload
+#   user_code_compile      compiling ml_template.py plus a sample cell, as every run does
+#   figure_render_*        render_existing_figures() for small/medium/large figures
+#   output_marshalling_*   Node appending child stdout chunks (10 KB / 1 MB / 10 MB)
+#   close_handler_*        MockGPUService.finalizeExecution for the same outputs
+#
+# Results go to benchmarks/results/micro.json. They are compared with
+# benchmarks/results/micro.baseline.json (written with --update-baseline;
+# baselines are per machine and not committed); the run fails when there is
+# no baseline or a stage's median regresses by more than --threshold.
+#
+#   python benchmarks/run_benchmarks.py [--repeat 5] [--threshold 0.25] [--update-baseline]
+
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(ROOT, 'server', 'ml_template.py')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Differences below this many milliseconds are treated as noise
+NOISE_FLOOR_MS = 2.0
+
+SAMPLE_CELL = '''
+import numpy as np
+import pandas as pd
+df = pd.DataFrame({'x': np.arange(1000), 'y': np.random.rand(1000)})
+print(df.describe())
+model, X_train, X_test, y_train, y_test = train_model(df[['x']], df['y'], model_type='regression')
+'''
+
+# Catalog rows (spread over CATALOG_USERS owners) behind the latest-upload lookup
+CATALOG_ROWS = 10_000
+CATALOG_USERS = 100
+
+FIGURE_SIZES = {
+    'small': ((6, 4), 1_000),
+    'medium': ((10, 6), 10_000),
+    'large': ((16, 12), 100_000),
+}
+
+
+def write_catalog(workdir):
+    """A dataset catalog like the server's, with one stored object for user 1"""
+    digest = '0' * 64
+    with open(os.path.join(workdir, 'uploads', 'objects', f'{digest}.csv'), 'w') as f:
+        f.write('x,y\n1,2\n')
+    with contextlib.closing(sqlite3.connect(os.path.join(workdir, 'database.sqlite'))) as conn, conn:
+        conn.execute('CREATE TABLE datasets (id TEXT PRIMARY KEY, user_id INTEGER, name TEXT NOT NULL, '
+                     'digest TEXT NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)')
+        conn.execute('CREATE INDEX idx_datasets_owner ON datasets (user_id, created_at)')
+        conn.executemany('INSERT INTO datasets (id, user_id, name, digest) VALUES (?, ?, ?, ?)',
+                         [(str(i), i % CATALOG_USERS, f'data_{i}.csv', digest) for i in range(CATALOG_ROWS)])
+
+
+def time_runs(repeat, run):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'min_ms': round(min(samples), 3),
+        'max_ms': round(max(samples), 3),
+        'runs': len(samples),
+    }
+
+
+def kernel_env():
+    env = dict(os.environ, MPLBACKEND='Agg', PYTHONIOENCODING='utf-8')
+    env.pop('CAPTODEBOT_USER_ID', None)
+    return env
+
+
+def python_stages(repeat, workdir):
+    """Stage name -> millisecond samples for the Python side"""
+    stages = {}
+    temp_dir = os.path.join(workdir, 'temp')
+    os.makedirs(os.path.join(workdir, 'uploads', 'objects'), exist_ok=True)
+    os.makedirs(temp_dir, exist_ok=True)
+    write_catalog(workdir)
+    with open(TEMPLATE_PATH, encoding='utf-8') as f:
+        template = f.read()
+    script = os.path.join(temp_dir, 'temp_bench.py')
+    with open(script, 'w', encoding='utf-8') as f:
+        f.write(template)
+
+    def run_python(*args):
+        subprocess.run([sys.executable, *args], cwd=temp_dir, env=kernel_env(),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+    stages['interpreter_start'] = time_runs(repeat, lambda: run_python('-c', 'pass'))
+    stages['template_import'] = time_runs(repeat, lambda: run_python(script))
+
+    source = template + '\n\n# User Code\n' + SAMPLE_CELL
+    stages['user_code_compile'] = time_runs(repeat, lambda: compile(source, script, 'exec'))
+
+    # Load the template in this process once, then time its figure rendering
+    cwd = os.getcwd()
+    os.chdir(temp_dir)
+    os.environ.update(kernel_env())
+    namespace = {'__name__': '__bench__'}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(compile(template, script, 'exec'), namespace)
+        # This process is not a kernel: no metrics line on exit
+        atexit.unregister(namespace['_emit_cell_metrics'])
+        plt, np = namespace['plt'], namespace['np']
+        render = namespace['render_existing_figures']
+
+        namespace['_CURRENT_USER_ID'] = '1'
+        stages['latest_upload_lookup'] = time_runs(repeat * 4, namespace['_latest_upload'])
+
+        for size, (figsize, points) in FIGURE_SIZES.items():
+            rng = np.random.default_rng(0)
+            x = rng.normal(size=points)
+            y = x * 2 + rng.normal(size=points)
+
+            def draw_and_render():
+                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=figsize)
+                ax1.scatter(x, y, s=4, alpha=0.5)
+                ax2.hist(x, bins=50)
+                fig.suptitle(f'{points:,} points')
+                with contextlib.redirect_stdout(io.StringIO()):
+                    render()
+
+            stages[f'figure_render_{size}'] = time_runs(repeat, draw_and_render)
+    finally:
+        os.chdir(cwd)
+    return stages
+
+
+def node_stages(repeat):
+    """Stage name -> millisecond samples for the Node side (empty without node)"""
+    node = shutil.which('node')
+    if node is None:
+        print("⚠️  node not found; skipping output marshalling and close handler stages")
+        return {}, None
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'node.json')
+        subprocess.run([node, os.path.join(ROOT, 'benchmarks', 'node_stages.js'), output, str(repeat)],
+                       stdout=subprocess.DEVNULL, check=True)
+        with open(output) as f:
+            data = json.load(f)
+    return data['stages'], data['node']
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table; returns the names of regressed stages"""
+    regressed = []
+    print(f"\n{'stage':<44}{'median ms':>12}{'baseline':>12}{'change':>10}")
+    for name, stats in results['stages'].items():
+        median = stats['median_ms']
+        base = baseline.get('stages', {}).get(name, {}).get('median_ms') if baseline else None
+        if base is None:
+            print(f"{name:<44}{median:>12.2f}{'-':>12}{'new':>10}")
+            continue
+        change = (median - base) / base if base else 0.0
+        flag = ''
+        if change > threshold and median - base > NOISE_FLOOR_MS:
+            regressed.append(name)
+            flag = '  ❌ regression'
+        print(f"{name:<44}{median:>12.2f}{base:>12.2f}{change:>+10.0%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline micro-benchmarks for the cell execution path')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per stage (default 5)')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed median slowdown as a fraction of the baseline (default 0.25)')
+    parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'micro.json'))
+    parser.add_argument('--baseline', default=os.path.join(RESULTS_DIR, 'micro.baseline.json'))
+    parser.add_argument('--update-baseline', action='store_true', help='store this run as the new baseline')
+    args = parser.parse_args()
+
+    print(f"⏱️  Micro-benchmarks: {args.repeat} run(s) per stage")
+    with tempfile.TemporaryDirectory() as workdir:
+        samples = python_stages(args.repeat, workdir)
+    node_samples, node_version = node_stages(args.repeat)
+    samples.update(node_samples)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'node': node_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+        },
+        'stages': {name: summarize(values) for name, values in samples.items()},
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressed = compare(results, baseline, args.threshold)
+    print(f"\n📄 Results written to {args.output}")
+
+    if args.update_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"📌 Baseline stored at {args.baseline}")
+    elif baseline is None:
+        # Baselines are machine-specific and not committed; never pass without one
+        print(f"❌ No baseline at {args.baseline}, nothing was compared. "
+              f"Run with --update-baseline on this machine first.")
+        return 2
+    elif regressed:
+        print(f"❌ {len(regressed)} stage(s) regressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+        return 1
+    else:
+        print(f"✅ No stage regressed by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
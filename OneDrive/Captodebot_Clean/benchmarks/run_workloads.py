@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+# End-to-end workload benchmarks built from the bundled analysis scripts
+#
+# Each workload is one of the scripts users actually run (dataset_analyzer.py,
+# insurance_graphs.py, debug_breast_cancer_classifier.py), fed a synthetic
+# dataset of the requested size and executed the way the server runs a cell:
+# ml_template.py first, then the script, in the same namespace, from a
+# server/temp-style working directory. Every run gets a fresh directory, so
+# fit and dataset caches start cold.
+#
+# Time, peak RSS and stdout bytes are attributed to phases by wrapping the
+# template helpers and library calls the scripts go through:
+#   load        pandas.read_csv / read_parquet, load_dataset
+#   preprocess  preprocess, build_pipeline, train_test_split
+#   fit         cached_fit, compare_models, train_model
+#   evaluate    evaluate_classifiers
+#   plot        plt.show, render_existing_figures, build_report
+#   script      everything else the script does between those calls
+# Nested calls are charged to the innermost phase (build_report's model fits
+# count as fit). Peak RSS is sampled for the kernel process only; process-pool
+# workers are reported once per run as children_max_rss_mb.
+#
+# Results go to benchmarks/results/macro.json; wall times are compared with
+# benchmarks/results/macro.baseline.json like the micro-benchmarks.
+#
+#   python benchmarks/run_workloads.py [--rows 1k,10k,100k] [--workloads insurance_graphs] [--repeat 1]
+#   python benchmarks/run_workloads.py --rows 1M,10M --timeout 3600
+
+import argparse
+import collections
+import copy
+import functools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from run_benchmarks import RESULTS_DIR, ROOT, TEMPLATE_PATH, compare, kernel_env, summarize
+
+PHASES = ['load', 'preprocess', 'fit', 'evaluate', 'plot', 'script']
+
+# Callables wrapped in the kernel, by phase; 'ns:' names live in the template namespace
+PHASE_HOOKS = {
+    'load': ['pandas:read_csv', 'pandas:read_parquet', 'ns:load_dataset'],
+    'preprocess': ['ns:preprocess', 'ns:build_pipeline', 'sklearn.model_selection:train_test_split'],
+    'fit': ['ns:cached_fit', 'ns:compare_models', 'ns:train_model'],
+    'evaluate': ['ns:evaluate_classifiers'],
+    'plot': ['matplotlib.pyplot:show', 'ns:render_existing_figures', 'ns:build_report'],
+}
+
+RSS_SAMPLE_SECONDS = 0.02
+CSV_CHUNK_ROWS = 1_000_000
+
+
+# -----------------------------
+# Synthetic data generators
+# -----------------------------
+def analyzer_data(rng, n):
+    """Columns of dataset_analyzer.py's sample data, with a learnable target"""
+    feature3 = rng.choice(['A', 'B', 'C'], n)
+    df = pd.DataFrame({
+        'feature1': rng.normal(50, 15, n),
+        'feature2': rng.normal(100, 25, n),
+        'feature3': feature3,
+        'feature4': rng.uniform(0, 100, n),
+    })
+    df['target'] = (2 * df['feature1'] + 0.5 * df['feature2'] + 0.3 * df['feature4']
+                    + pd.Series(feature3).map({'A': 0, 'B': 15, 'C': 30}).to_numpy()
+                    + rng.normal(0, 20, n))
+    return df
+
+
+def insurance_data(rng, n):
+    """Columns of insurance.csv, with charges driven by age, bmi, children and smoking"""
+    age = rng.integers(18, 65, n)
+    bmi = rng.normal(30.7, 6.1, n).round(2)
+    children = rng.integers(0, 6, n)
+    smoker = rng.choice(['yes', 'no'], n, p=[0.2, 0.8])
+    charges = (250 * age + 330 * bmi + 475 * children + 23800 * (smoker == 'yes')
+               - 11900 + rng.normal(0, 6000, n))
+    return pd.DataFrame({
+        'age': age,
+        'sex': rng.choice(['male', 'female'], n),
+        'bmi': bmi,
+        'children': children,
+        'smoker': smoker,
+        'region': rng.choice(['northeast', 'northwest', 'southeast', 'southwest'], n),
+        'charges': np.clip(charges, 1100, None).round(2),
+    })
+
+
+@functools.lru_cache(maxsize=1)
+def _breast_cancer_moments():
+    from sklearn.datasets import load_breast_cancer
+    cancer = load_breast_cancer()
+    moments = {label: (cancer.data[cancer.target == label].mean(axis=0),
+                       cancer.data[cancer.target == label].std(axis=0))
+               for label in (0, 1)}
+    return list(cancer.feature_names), moments, cancer.target.mean()
+
+
+def breast_cancer_data(rng, n):
+    """The 30 breast cancer features, sampled per class from the real dataset's moments"""
+    names, moments, positive_rate = _breast_cancer_moments()
+    diagnosis = (rng.random(n) < positive_rate).astype(int)
+    values = np.empty((n, len(names)))
+    for label, (mean, std) in moments.items():
+        rows = diagnosis == label
+        values[rows] = np.abs(rng.normal(mean, std, (rows.sum(), len(names))))
+    df = pd.DataFrame(values, columns=names)
+    df['diagnosis'] = diagnosis
+    return df
+
+
+# Where each script looks for its data; 'paths' rewrites hardcoded locations
+WORKLOADS = {
+    'dataset_analyzer': {
+        'script': 'dataset_analyzer.py', 'data': os.path.join('temp', 'data.csv'),
+        'generate': analyzer_data,
+    },
+    'insurance_graphs': {
+        'script': 'insurance_graphs.py', 'data': os.path.join('uploads', 'insurance.csv'),
+        'generate': insurance_data,
+    },
+    'breast_cancer': {
+        'script': 'debug_breast_cancer_classifier.py', 'data': os.path.join('temp', 'data.csv'),
+        'generate': breast_cancer_data,
+        'paths': {r'C:\Users\dhaar\Brest_Cancer_Classifier\data.csv': 'data.csv'},
+    },
+}
+
+
+def write_dataset(generate, rows, path, seed=42):
+    """Write a synthetic CSV in chunks, so 10M-row datasets never sit in memory at once"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for index, start in enumerate(range(0, rows, CSV_CHUNK_ROWS)):
+        rng = np.random.default_rng([seed, index])
+        chunk = generate(rng, min(CSV_CHUNK_ROWS, rows - start))
+        chunk.to_csv(path, mode='w' if index == 0 else 'a', header=index == 0, index=False)
+    return os.path.getsize(path)
+
+
+def parse_rows(text):
+    """'1k,10k,1M' -> [1000, 10000, 1000000]"""
+    units = {'k': 1_000, 'm': 1_000_000}
+    sizes = []
+    for token in text.split(','):
+        token = token.strip().lower()
+        scale = units.get(token[-1:], 1)
+        sizes.append(int(float(token[:-1] if scale > 1 else token) * scale))
+    return sizes
+
+
+# -----------------------------
+# Kernel side (runs in the child process)
+# -----------------------------
+def current_rss_mb():
+    """Resident set size of this process in MB (peak so far where only that is available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024**2
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return 0.0
+
+
+class PhaseRecorder:
+    """Charges wall time, peak RSS and stdout bytes to the innermost running phase"""
+
+    def __init__(self):
+        self.stats = {phase: {'wall_ms': 0.0, 'peak_rss_mb': 0.0, 'output_bytes': 0, 'calls': 0}
+                      for phase in PHASES}
+        self.stack = ['script']
+        self.mark = time.perf_counter()
+        self._stop = threading.Event()
+
+    def _sample(self):
+        stats = self.stats[self.stack[-1]]
+        stats['peak_rss_mb'] = max(stats['peak_rss_mb'], current_rss_mb())
+
+    def _switch(self):
+        now = time.perf_counter()
+        self.stats[self.stack[-1]]['wall_ms'] += (now - self.mark) * 1000
+        self.mark = now
+        self._sample()
+
+    def wrap(self, phase, func):
+        return _PhaseCall(self, phase, func)
+
+    def call(self, phase, func, args, kwargs):
+        if self.stack[-1] == phase:
+            return func(*args, **kwargs)
+        self._switch()
+        self.stack.append(phase)
+        self.stats[phase]['calls'] += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._switch()
+            self.stack.pop()
+
+    def write(self, text):
+        data = text.encode('utf-8', 'replace') if isinstance(text, str) else text
+        self.stats[self.stack[-1]]['output_bytes'] += len(data)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def start_sampler(self):
+        def sample():
+            while not self._stop.wait(RSS_SAMPLE_SECONDS):
+                self._sample()
+        threading.Thread(target=sample, daemon=True).start()
+
+    def finish(self):
+        self._switch()
+        self._stop.set()
+        return self.stats
+
+
+class _PhaseCall:
+    """A hooked callable; it pickles as the plain function, so process-pool workers never see the recorder"""
+
+    def __init__(self, recorder, phase, func):
+        functools.update_wrapper(self, func)
+        self.recorder, self.phase = recorder, phase
+
+    def __call__(self, *args, **kwargs):
+        return self.recorder.call(self.phase, self.__wrapped__, args, kwargs)
+
+    def __reduce__(self):
+        return copy.copy, (self.__wrapped__,)
+
+
+def install_hooks(recorder, namespace):
+    import importlib
+    for phase, targets in PHASE_HOOKS.items():
+        for target in targets:
+            owner, name = target.split(':')
+            holder = namespace if owner == 'ns' else vars(importlib.import_module(owner))
+            if callable(holder.get(name)):
+                holder[name] = recorder.wrap(phase, holder[name])
+
+
+def run_kernel(script_path, paths, result_path):
+    """Execute ml_template.py + the workload script and write per-phase stats"""
+    with open(TEMPLATE_PATH, encoding='utf-8') as f:
+        template = f.read()
+    with open(script_path, encoding='utf-8') as f:
+        script = f.read()
+    for original, replacement in paths.items():
+        script = script.replace(original, replacement)
+
+    namespace = {'__name__': '__main__', '__builtins__': __builtins__}
+    kernel_stdout = sys.stdout
+    start = time.perf_counter()
+    exec(compile(template, TEMPLATE_PATH, 'exec'), namespace)
+    template_ms = (time.perf_counter() - start) * 1000
+
+    recorder = PhaseRecorder()
+    install_hooks(recorder, namespace)
+    sys.stdout = recorder
+    recorder.start_sampler()
+    error = None
+    try:
+        exec(compile(script, script_path, 'exec'), namespace)
+        # What the kernel's exit hooks would render
+        namespace['render_existing_figures']()
+    except SystemExit as e:
+        error = f'exit({e.code})' if e.code not in (None, 0) else None
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+    stats = recorder.finish()
+    sys.stdout = kernel_stdout
+
+    result = {
+        'template_ms': round(template_ms, 3),
+        'total_wall_ms': round(sum(s['wall_ms'] for s in stats.values()), 3),
+        'max_rss_mb': round(max(s['peak_rss_mb'] for s in stats.values()), 1),
+        'output_bytes': sum(s['output_bytes'] for s in stats.values()),
+        'children_max_rss_mb': None,
+        'phases': {phase: dict(s, wall_ms=round(s['wall_ms'], 3), peak_rss_mb=round(s['peak_rss_mb'], 1))
+                   for phase, s in stats.items()},
+        'error': error,
+    }
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        result['children_max_rss_mb'] = round(peak / 1024**2 if sys.platform == 'darwin' else peak / 1024, 1)
+    except ImportError:
+        pass
+    with open(result_path, 'w') as f:
+        json.dump(result, f)
+
+
+# -----------------------------
+# Harness side
+# -----------------------------
+def run_workload(name, rows, timeout):
+    """Run one workload on a fresh working directory; returns its result dict"""
+    workload = WORKLOADS[name]
+    with tempfile.TemporaryDirectory(prefix='captodebot-workload-') as workdir:
+        temp_dir = os.path.join(workdir, 'temp')
+        os.makedirs(temp_dir)
+        os.makedirs(os.path.join(workdir, 'uploads'), exist_ok=True)
+        start = time.perf_counter()
+        data_bytes = write_dataset(workload['generate'], rows, os.path.join(workdir, workload['data']))
+        generate_ms = (time.perf_counter() - start) * 1000
+
+        result_path = os.path.join(workdir, 'result.json')
+        command = [sys.executable, os.path.abspath(__file__), '--kernel',
+                   os.path.join(ROOT, workload['script']), json.dumps(workload.get('paths', {})), result_path]
+        try:
+            subprocess.run(command, cwd=temp_dir, env=kernel_env(), timeout=timeout,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except subprocess.TimeoutExpired:
+            return {'error': f'timeout after {timeout}s', 'data_bytes': data_bytes}
+        if not os.path.exists(result_path):
+            return {'error': 'kernel crashed before writing results', 'data_bytes': data_bytes}
+        with open(result_path) as f:
+            result = json.load(f)
+    result.update(data_bytes=data_bytes, generate_ms=round(generate_ms, 3))
+    return result
+
+
+def print_scaling(name, runs):
+    """One line per dataset size: wall time per phase, peak RSS and output size"""
+    print(f"\n🧪 {name}")
+    print(f"{'rows':>10}" + ''.join(f"{phase:>12}" for phase in PHASES)
+          + f"{'total ms':>12}{'peak MB':>10}{'output KB':>11}")
+    for rows, samples in runs.items():
+        last = samples[-1]
+        if 'phases' not in last:
+            print(f"{int(rows):>10,}  ❌ {last['error']}")
+            continue
+        walls = [sorted(s['phases'][phase]['wall_ms'] for s in samples if 'phases' in s) for phase in PHASES]
+        medians = [w[len(w) // 2] for w in walls]
+        line = f"{int(rows):>10,}" + ''.join(f"{ms:>12.0f}" for ms in medians)
+        line += f"{sum(medians):>12.0f}{last['max_rss_mb']:>10.0f}{last['output_bytes'] / 1024:>11.0f}"
+        print(line + (f"  ⚠️ {last['error']}" if last['error'] else ''))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--kernel':
+        script_path, paths, result_path = sys.argv[2:5]
+        run_kernel(script_path, json.loads(paths), result_path)
+        return 0
+
+    parser = argparse.ArgumentParser(description='End-to-end workload benchmarks')
+    parser.add_argument('--workloads', default=','.join(WORKLOADS),
+                        help=f"comma-separated subset of {', '.join(WORKLOADS)}")
+    parser.add_argument('--rows', default='1k,10k,100k', help='dataset sizes, e.g. 1k,10k,100k,1M,10M')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per workload and size (default 1)')
+    parser.add_argument('--timeout', type=int, default=1800, help='seconds before a run is abandoned')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed median slowdown as a fraction of the baseline (default 0.25)')
+    parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'macro.json'))
+    parser.add_argument('--baseline', default=os.path.join(RESULTS_DIR, 'macro.baseline.json'))
+    parser.add_argument('--update-baseline', action='store_true', help='store this run as the new baseline')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.workloads.split(',')]
+    unknown = [name for name in names if name not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workload(s): {', '.join(unknown)}")
+    sizes = parse_rows(args.rows)
+
+    print(f"⏱️  Workload benchmarks: {', '.join(names)} at {', '.join(f'{n:,}' for n in sizes)} rows")
+    runs = collections.defaultdict(dict)
+    for name in names:
+        for rows in sizes:
+            runs[name][str(rows)] = [run_workload(name, rows, args.timeout)
+                                     for _ in range(args.repeat)]
+        print_scaling(name, runs[name])
+
+    # Per-phase wall times flattened into stages, so the micro-benchmark comparison applies
+    stages = {}
+    for name, by_rows in runs.items():
+        for rows, samples in by_rows.items():
+            completed = [s for s in samples if 'phases' in s]
+            if not completed:
+                continue
+            for phase in PHASES:
+                stages[f'{name}@{rows}/{phase}'] = summarize([s['phases'][phase]['wall_ms'] for s in completed])
+            stages[f'{name}@{rows}/total'] = summarize([s['total_wall_ms'] for s in completed])
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+            'rows': sizes,
+        },
+        'runs': runs,
+        'stages': stages,
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressed = compare(results, baseline, args.threshold)
+    print(f"\n📄 Results written to {args.output}")
+
+    if args.update_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"📌 Baseline stored at {args.baseline}")
+    elif baseline is None:
+        # Baselines are machine-specific and not committed; never pass without one
+        print(f"❌ No baseline at {args.baseline}, nothing was compared. "
+              f"Run with --update-baseline on this machine first.")
+        return 2
+    elif regressed:
+        print(f"❌ {len(regressed)} stage(s) regressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+        return 1
+    else:
+        print(f"✅ No stage regressed by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
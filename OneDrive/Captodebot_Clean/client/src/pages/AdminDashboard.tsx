@@ -28,10 +28,56 @@ interface GPUStats {
   totalSessions: number;
 }
 
+interface StorageUsage {
+  globalBudgetBytes: number;
+  userBudgetBytes: number;
+  sourceBytes: number;
+  derivedBytes: number;
+  exportBytes: number;
+  modelBytes: number;
+  tempBytes: number;
+  objectCount: number;
+  datasetCount: number;
+  users: Array<{
+    userId: number;
+    email: string | null;
+    datasets: number;
+    sourceBytes: number;
+    derivedBytes: number;
+    totalBytes: number;
+  }>;
+}
+
+interface MemoryUsageRow {
+  bucket: number | string;
+  email: string | null;
+  executions: number;
+  avg_peak_rss_mb: number;
+  p95_peak_rss_mb: number;
+  max_peak_rss_mb: number;
+  max_workers_peak_rss_mb: number | null;
+  largest_objects: Array<{
+    name: string;
+    type: string;
+    size_mb: number;
+  }>;
+}
+
+type MemoryGroup = 'user' | 'dataset';
+
+const formatBytes = (bytes: number) => {
+  if (bytes >= 1024 ** 3) return `${(bytes / 1024 ** 3).toFixed(2)} GB`;
+  if (bytes >= 1024 ** 2) return `${(bytes / 1024 ** 2).toFixed(1)} MB`;
+  return `${(bytes / 1024).toFixed(1)} KB`;
+};
+
 const AdminDashboard: React.FC = () => {
   const { user } = useAuth();
   const [users, setUsers] = useState<UserUsage[]>([]);
   const [gpuStats, setGpuStats] = useState<GPUStats | null>(null);
+  const [storage, setStorage] = useState<StorageUsage | null>(null);
+  const [memoryUsage, setMemoryUsage] = useState<Record<MemoryGroup, MemoryUsageRow[]>>({ user: [], dataset: [] });
+  const [memoryGroup, setMemoryGroup] = useState<MemoryGroup>('user');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [selectedUser, setSelectedUser] = useState<number | null>(null);
@@ -39,6 +85,8 @@ const AdminDashboard: React.FC = () => {
   useEffect(() => {
     fetchUsers();
     fetchGPUStats();
+    fetchStorage();
+    fetchMemoryUsage();
     
     const interval = setInterval(() => {
       fetchGPUStats();
@@ -67,6 +115,37 @@ const AdminDashboard: React.FC = () => {
     }
   };
 
+  const fetchStorage = async () => {
+    try {
+      const response = await axios.get('/api/gpu/admin/storage');
+      setStorage(response.data);
+    } catch (err) {
+      console.error('Error fetching storage usage:', err);
+    }
+  };
+
+  const fetchMemoryUsage = async () => {
+    try {
+      const [byUser, byDataset] = await Promise.all([
+        axios.get('/api/gpu/admin/memory', { params: { groupBy: 'user', days: 7 } }),
+        axios.get('/api/gpu/admin/memory', { params: { groupBy: 'dataset', days: 7 } })
+      ]);
+      setMemoryUsage({ user: byUser.data.rows, dataset: byDataset.data.rows });
+    } catch (err) {
+      console.error('Error fetching memory usage:', err);
+    }
+  };
+
+  const compactStorage = async () => {
+    try {
+      const response = await axios.post('/api/gpu/admin/storage/compact');
+      await fetchStorage();
+      alert(`Compaction freed ${formatBytes(response.data.freedBytes)}`);
+    } catch (err: any) {
+      alert(err.response?.data?.error || 'Failed to compact storage');
+    }
+  };
+
   const resetUserQuota = async (userId: number) => {
     try {
       await axios.post('/api/gpu/admin/quota/reset', { userId });
@@ -168,6 +247,135 @@ const AdminDashboard: React.FC = () => {
           </div>
         )}
 
+        {/* Memory Usage */}
+        <div className="bg-white rounded-lg shadow mb-8">
+          <div className="border-b border-gray-200 px-6 py-4 flex items-center justify-between">
+            <h2 className="text-lg font-medium text-gray-900">Peak Memory (last 7 days)</h2>
+            <div className="flex space-x-4 text-sm">
+              {(['user', 'dataset'] as MemoryGroup[]).map((group) => (
+                <button
+                  key={group}
+                  onClick={() => setMemoryGroup(group)}
+                  className={memoryGroup === group ? 'font-medium text-primary-blue' : 'text-gray-500 hover:text-gray-700'}
+                >
+                  By {group === 'user' ? 'User' : 'Dataset'}
+                </button>
+              ))}
+            </div>
+          </div>
+          <div className="overflow-x-auto">
+            {memoryUsage[memoryGroup].length === 0 ? (
+              <p className="p-6 text-sm text-gray-500">No executions with memory data yet.</p>
+            ) : (
+              <table className="min-w-full divide-y divide-gray-200">
+                <thead className="bg-gray-50">
+                  <tr>
+                    <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                      {memoryGroup === 'user' ? 'User' : 'Dataset'}
+                    </th>
+                    <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Runs</th>
+                    <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Avg Peak</th>
+                    <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">P95 Peak</th>
+                    <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Max Peak</th>
+                    <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Max Worker</th>
+                    <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Largest Objects (heaviest run)</th>
+                  </tr>
+                </thead>
+                <tbody className="bg-white divide-y divide-gray-200">
+                  {memoryUsage[memoryGroup].map((row) => (
+                    <tr key={row.bucket} className="hover:bg-gray-50">
+                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
+                        {memoryGroup === 'user' ? row.email || `User ${row.bucket}` : row.bucket}
+                      </td>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{row.executions}</td>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{formatBytes(row.avg_peak_rss_mb * 1024 ** 2)}</td>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{formatBytes(row.p95_peak_rss_mb * 1024 ** 2)}</td>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-primary-pink">{formatBytes(row.max_peak_rss_mb * 1024 ** 2)}</td>
+                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
+                        {row.max_workers_peak_rss_mb ? formatBytes(row.max_workers_peak_rss_mb * 1024 ** 2) : '-'}
+                      </td>
+                      <td className="px-6 py-4 text-sm text-gray-600">
+                        {row.largest_objects.length > 0
+                          ? row.largest_objects
+                              .map((obj) => `${obj.name} (${obj.type}, ${formatBytes(obj.size_mb * 1024 ** 2)})`)
+                              .join(', ')
+                          : '-'}
+                      </td>
+                    </tr>
+                  ))}
+                </tbody>
+              </table>
+            )}
+          </div>
+        </div>
+
+        {/* Storage Usage */}
+        {storage && (
+          <div className="bg-white rounded-lg shadow mb-8">
+            <div className="border-b border-gray-200 px-6 py-4 flex items-center justify-between">
+              <h2 className="text-lg font-medium text-gray-900">Storage</h2>
+              <button
+                onClick={compactStorage}
+                className="text-sm text-primary-blue hover:text-blue-600"
+              >
+                Compact Now
+              </button>
+            </div>
+            <div className="p-6">
+              <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4 mb-6">
+                <div className="text-center">
+                  <p className="text-2xl font-bold text-primary-blue">
+                    {formatBytes(storage.sourceBytes + storage.derivedBytes + storage.exportBytes + storage.modelBytes + storage.tempBytes)}
+                  </p>
+                  <p className="text-sm text-gray-500">Used of {formatBytes(storage.globalBudgetBytes)}</p>
+                </div>
+                <div className="text-center">
+                  <p className="text-2xl font-bold text-primary-pink">{formatBytes(storage.sourceBytes)}</p>
+                  <p className="text-sm text-gray-500">
+                    Source Data ({storage.objectCount} objects, {storage.datasetCount} datasets)
+                  </p>
+                </div>
+                <div className="text-center">
+                  <p className="text-2xl font-bold text-green-600">{formatBytes(storage.derivedBytes)}</p>
+                  <p className="text-sm text-gray-500">
+                    Derived Caches (+{formatBytes(storage.exportBytes)} exports, +{formatBytes(storage.modelBytes)} models)
+                  </p>
+                </div>
+                <div className="text-center">
+                  <p className="text-2xl font-bold text-gray-900">{formatBytes(storage.tempBytes)}</p>
+                  <p className="text-sm text-gray-500">Temp Files</p>
+                </div>
+              </div>
+              {storage.users.length > 0 && (
+                <table className="min-w-full divide-y divide-gray-200">
+                  <thead className="bg-gray-50">
+                    <tr>
+                      <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">User</th>
+                      <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Datasets</th>
+                      <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Source</th>
+                      <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Derived</th>
+                      <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Budget Used</th>
+                    </tr>
+                  </thead>
+                  <tbody className="bg-white divide-y divide-gray-200">
+                    {storage.users.map((usage) => (
+                      <tr key={usage.userId} className="hover:bg-gray-50">
+                        <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{usage.email || `User ${usage.userId}`}</td>
+                        <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{usage.datasets}</td>
+                        <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{formatBytes(usage.sourceBytes)}</td>
+                        <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{formatBytes(usage.derivedBytes)}</td>
+                        <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
+                          {((usage.totalBytes / storage.userBudgetBytes) * 100).toFixed(0)}%
+                        </td>
+                      </tr>
+                    ))}
+                  </tbody>
+                </table>
+              )}
+            </div>
+          </div>
+        )}
+
         {/* Users Table */}
         <div className="bg-white rounded-lg shadow">
           <div className="border-b border-gray-200 px-6 py-4">
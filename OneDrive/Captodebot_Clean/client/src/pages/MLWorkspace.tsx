@@ -16,6 +16,8 @@ interface Cell {
   content: string;
   output: CellOutput;
   isRunning: boolean;
+  profile?: 'cpu' | 'memory';
+  metrics?: CellMetrics;
 }
 
 interface CellOutput {
@@ -24,6 +26,42 @@ interface CellOutput {
   data?: any;
 }
 
+interface ProfileFunction {
+  function: string;
+  location: string;
+  calls: number;
+  self_ms: number;
+  cumulative_ms: number;
+}
+
+interface ProfileAllocation {
+  location: string;
+  size_kb: number;
+  count: number;
+}
+
+interface CellProfile {
+  mode: 'cpu' | 'memory';
+  total_ms?: number;
+  functions?: ProfileFunction[];
+  peak_mb?: number;
+  current_mb?: number;
+  allocations?: ProfileAllocation[];
+}
+
+// Phase timings reported with each execution result
+interface CellMetrics {
+  startupMs: number | null;
+  packagesMs: number | null;
+  userCodeMs: number | null;
+  renderMs: number | null;
+  finalizeMs: number;
+  outputBytes: number;
+  totalMs: number;
+  peakRssMb?: number | null;
+  profile: CellProfile | null;
+}
+
 interface Dataset {
   id: string;
   name: string;
@@ -136,11 +174,12 @@ print("\\n🎯 Ready for reliable ML experimentation!")`,
     const cell = cells.find(c => c.id === cellId);
     if (!cell || cell.type !== 'code') return;
 
-    updateCell(cellId, { isRunning: true, output: { type: 'text', content: 'Running...' } });
+    updateCell(cellId, { isRunning: true, output: { type: 'text', content: 'Running...' }, metrics: undefined });
 
     try {
       const response = await axios.post('/api/workspace/execute', {
-        code: cell.content
+        code: cell.content,
+        profile: cell.profile
       });
 
       const result = response.data;
@@ -158,7 +197,7 @@ print("\\n🎯 Ready for reliable ML experimentation!")`,
         output = { type: 'error', content: result.error || 'Execution failed' };
       }
 
-      updateCell(cellId, { output, isRunning: false });
+      updateCell(cellId, { output, isRunning: false, metrics: result.metrics });
       await fetchGPUUsage();
     } catch (err: any) {
       updateCell(cellId, { 
@@ -187,8 +226,8 @@ print("\\n🎯 Ready for reliable ML experimentation!")`,
 
   const handleFileUpload = async (event: React.ChangeEvent<HTMLInputElement>) => {
     const file = event.target.files?.[0];
-    if (!file || !file.name.endsWith('.csv')) {
-      setUploadStatus('Please select a valid CSV file');
+    if (!file || !/\.(csv|csv\.gz|csv\.zst|zip)$/i.test(file.name)) {
+      setUploadStatus('Please select a CSV file (.csv, .csv.gz, .csv.zst or .zip)');
       return;
     }
 
@@ -281,6 +320,92 @@ if df is not None:
     URL.revokeObjectURL(url);
   };
 
+  // Files written by export_df() / build_report() are printed as download paths.
+  // They are fetched with the auth header rather than opened as plain links.
+  const exportLinks = (output: string) => Array.from(new Set(output.match(/\/api\/workspace\/exports\/[^\s/]+\/[^\s/]+/g) || []));
+
+  const downloadExport = async (url: string) => {
+    try {
+      const response = await axios.get(url, { responseType: 'blob' });
+      const href = URL.createObjectURL(response.data);
+      const a = document.createElement('a');
+      a.href = href;
+      a.download = decodeURIComponent(url.split('/').pop() || 'export');
+      a.click();
+      URL.revokeObjectURL(href);
+    } catch (err: any) {
+      alert(err.response?.status === 404 ? 'Export not found' : 'Failed to download export');
+    }
+  };
+
+  const formatMs = (ms: number | null) =>
+    ms === null ? null : ms >= 1000 ? `${(ms / 1000).toFixed(2)}s` : `${Math.round(ms)}ms`;
+
+  const formatBytes = (bytes: number) =>
+    bytes >= 1024 * 1024 ? `${(bytes / 1024 / 1024).toFixed(1)} MB` : `${(bytes / 1024).toFixed(1)} KB`;
+
+  const renderMetrics = (metrics: CellMetrics) => {
+    const phases: [string, number | null][] = [
+      ['startup', metrics.startupMs],
+      ['packages', metrics.packagesMs],
+      ['code', metrics.userCodeMs],
+      ['render', metrics.renderMs]
+    ];
+    const profile = metrics.profile;
+    const muted = darkMode ? 'text-gray-400' : 'text-gray-500';
+
+    return (
+      <div className={`mt-2 text-xs ${muted}`}>
+        <div className="flex flex-wrap gap-x-3">
+          {phases.filter(([, ms]) => ms !== null).map(([name, ms]) => (
+            <span key={name}>{name} {formatMs(ms)}</span>
+          ))}
+          <span>output {formatBytes(metrics.outputBytes)}</span>
+          {metrics.peakRssMb != null && <span>peak memory {formatBytes(metrics.peakRssMb * 1024 * 1024)}</span>}
+          <span className="font-medium">total {formatMs(metrics.totalMs)}</span>
+        </div>
+        {profile && (
+          <details className="mt-2">
+            <summary className="cursor-pointer">
+              {profile.mode === 'cpu'
+                ? `CPU profile: top ${profile.functions?.length || 0} functions by cumulative time`
+                : `Memory profile: peak ${profile.peak_mb} MB, top ${profile.allocations?.length || 0} allocation sites`}
+            </summary>
+            <table className="mt-2 w-full font-mono">
+              <thead>
+                {profile.mode === 'cpu' ? (
+                  <tr className="text-left">
+                    <th>function</th><th>location</th><th className="text-right">calls</th>
+                    <th className="text-right">self ms</th><th className="text-right">cumulative ms</th>
+                  </tr>
+                ) : (
+                  <tr className="text-left">
+                    <th>location</th><th className="text-right">KB</th><th className="text-right">blocks</th>
+                  </tr>
+                )}
+              </thead>
+              <tbody>
+                {profile.mode === 'cpu'
+                  ? profile.functions?.map((row, index) => (
+                      <tr key={index}>
+                        <td>{row.function}</td><td>{row.location}</td><td className="text-right">{row.calls}</td>
+                        <td className="text-right">{row.self_ms}</td><td className="text-right">{row.cumulative_ms}</td>
+                      </tr>
+                    ))
+                  : profile.allocations?.map((row, index) => (
+                      <tr key={index}>
+                        <td>{row.location}</td><td className="text-right">{row.size_kb}</td>
+                        <td className="text-right">{row.count}</td>
+                      </tr>
+                    ))}
+              </tbody>
+            </table>
+          </details>
+        )}
+      </div>
+    );
+  };
+
   const renderCell = (cell: Cell) => (
     <div 
       key={cell.id}
@@ -303,6 +428,21 @@ if df is not None:
           </span>
         </div>
         <div className="flex items-center space-x-2">
+          {cell.type === 'code' && (
+            <select
+              value={cell.profile || ''}
+              onClick={(e) => e.stopPropagation()}
+              onChange={(e) => updateCell(cell.id, { profile: (e.target.value || undefined) as Cell['profile'] })}
+              title="Profile the cell's code"
+              className={`px-2 py-1 text-xs rounded border ${
+                darkMode ? 'bg-gray-800 border-gray-600 text-gray-300' : 'bg-white border-gray-300 text-gray-600'
+              }`}
+            >
+              <option value="">No profile</option>
+              <option value="cpu">Profile CPU</option>
+              <option value="memory">Profile memory</option>
+            </select>
+          )}
           {cell.type === 'code' && (
             <button
               onClick={(e) => {
@@ -388,8 +528,22 @@ if df is not None:
                 darkMode ? 'text-gray-300' : 'text-gray-800'
               }`}>{cell.output.content}</pre>
             )}
+            {exportLinks(cell.output.content).length > 0 && (
+              <div className="mt-2 flex flex-wrap gap-2">
+                {exportLinks(cell.output.content).map((url) => (
+                  <button
+                    key={url}
+                    onClick={() => downloadExport(url)}
+                    className="text-sm text-primary-blue hover:text-blue-600"
+                  >
+                    ⬇️ {decodeURIComponent(url.split('/').pop() || '')}
+                  </button>
+                ))}
+              </div>
+            )}
           </div>
         )}
+        {cell.metrics && !cell.isRunning && renderMetrics(cell.metrics)}
       </div>
     </div>
   );
@@ -471,7 +625,7 @@ if df is not None:
             <input
               ref={fileInputRef}
               type="file"
-              accept=".csv"
+              accept=".csv,.gz,.zst,.zip"
               onChange={handleFileUpload}
               className="hidden"
             />
@@ -2,11 +2,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
 
 # Set style for better looking plots
 plt.style.use('seaborn-v0_8')
@@ -83,17 +81,14 @@ categorical_columns = df.select_dtypes(include=['object']).columns.tolist()
 print(f"🔢 Numeric columns: {numeric_columns}")
 print(f"📝 Categorical columns: {categorical_columns}")
 
-# Handle categorical variables
-df_processed = df.copy()
-le = LabelEncoder()
-
-for col in categorical_columns:
-    if col in df_processed.columns:
-        try:
-            df_processed[col] = le.fit_transform(df_processed[col].astype(str))
-            print(f"✅ Encoded {col}")
-        except Exception as e:
-            print(f"⚠️ Could not encode {col}: {e}")
+# Handle categorical variables (fitted encoder is cached; unchanged data skips refitting)
+try:
+    df_processed, preprocessor = preprocess(df, impute=None)
+    for col in df.columns.difference(numeric_columns, sort=False):
+        print(f"✅ Encoded {col}")
+except Exception as e:
+    print(f"⚠️ Could not encode categorical columns: {e}")
+    df_processed = df.copy()
 
 # Prepare features and target
 # Use last column as target, or create one
@@ -124,86 +119,78 @@ except Exception as e:
 # -----------------------------
 print("\n🤖 Training models...")
 
-# Linear Regression
-try:
-    lr_model = LinearRegression()
-    lr_model.fit(X_train, y_train)
-    lr_pred = lr_model.predict(X_test)
-    lr_mse = mean_squared_error(y_test, lr_pred)
-    lr_r2 = r2_score(y_test, lr_pred)
-    print(f"✅ Linear Regression - MSE: {lr_mse:.2f}, R²: {lr_r2:.3f}")
-except Exception as e:
-    print(f"⚠️ Linear Regression failed: {e}")
-    lr_mse, lr_r2 = float('inf'), 0
-
-# Random Forest
-try:
-    rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-    rf_model.fit(X_train, y_train)
-    rf_pred = rf_model.predict(X_test)
-    rf_mse = mean_squared_error(y_test, rf_pred)
-    rf_r2 = r2_score(y_test, rf_pred)
-    print(f"✅ Random Forest - MSE: {rf_mse:.2f}, R²: {rf_r2:.3f}")
-except Exception as e:
-    print(f"⚠️ Random Forest failed: {e}")
-    rf_mse, rf_r2 = float('inf'), 0
+# Add a candidate here to include it in the comparison charts; candidates
+# are fitted in parallel, each stopped after the time budget
+candidate_models = {
+    'Linear Regression': LinearRegression(),
+    'Random Forest': RandomForestRegressor(n_estimators=100, random_state=42),
+}
+results, fitted_models, predictions = compare_models(
+    candidate_models, X_train, y_train, X_test, y_test, time_budget=120
+)
+# Failed or timed-out candidates keep their bar, with no score
+for metric, missing in (('mse', float('inf')), ('r2', 0)):
+    results[metric] = results[metric].fillna(missing) if metric in results else missing
 
 # -----------------------------
 # 6️⃣ Visualization Functions
 # -----------------------------
-def create_data_overview():
-    """Create overview plots of the dataset"""
-    n_cols = len(df_processed.columns)
-    n_rows = (n_cols + 1) // 2
+def create_data_overview(page_size=12):
+    """Create overview plots of the dataset, page_size columns per figure
     
-    fig, axes = plt.subplots(n_rows, 2, figsize=(15, 5*n_rows))
-    fig.suptitle(f'Dataset Overview - {filename}', fontsize=16, fontweight='bold')
+    Bins for every column are computed up front in one vectorized pass and
+    returned with a generator that draws one page at a time, so only the
+    page being shown is held in memory: (bin_data, pages).
+    """
+    bin_data = histogram_data(df_processed, bins=20)
+    columns = list(bin_data)
+    n_pages = (len(columns) + page_size - 1) // page_size
     
-    for i, col in enumerate(df_processed.columns):
-        row = i // 2
-        col_idx = i % 2
+    def draw_page(page):
+        page_columns = columns[page * page_size:(page + 1) * page_size]
+        n_rows = (len(page_columns) + 1) // 2
         
-        if row >= n_rows:
-            break
-            
-        if df_processed[col].dtype in ['int64', 'float64']:
-            axes[row, col_idx].hist(df_processed[col], bins=20, alpha=0.7, color='skyblue')
-            axes[row, col_idx].set_title(f'{col} Distribution')
-            axes[row, col_idx].set_xlabel(col)
-            axes[row, col_idx].set_ylabel('Frequency')
-        else:
-            value_counts = df_processed[col].value_counts()
-            axes[row, col_idx].bar(range(len(value_counts)), value_counts.values)
-            axes[row, col_idx].set_title(f'{col} Distribution')
-            axes[row, col_idx].set_xlabel(col)
-            axes[row, col_idx].set_ylabel('Count')
-            axes[row, col_idx].set_xticks(range(len(value_counts)))
-            axes[row, col_idx].set_xticklabels(value_counts.index, rotation=45)
-    
-    # Hide empty subplots
-    for i in range(n_cols, n_rows * 2):
-        row = i // 2
-        col_idx = i % 2
-        if row < n_rows and col_idx < 2:
-            axes[row, col_idx].set_visible(False)
+        fig, axes = plt.subplots(n_rows, 2, figsize=(15, 5*n_rows), squeeze=False)
+        title = f'Dataset Overview - {filename}'
+        if n_pages > 1:
+            title += f' (page {page + 1}/{n_pages})'
+        fig.suptitle(title, fontsize=16, fontweight='bold')
+        
+        for ax, col in zip(axes.flat, page_columns):
+            data = bin_data[col]
+            if data['kind'] == 'numeric':
+                # One step patch per column instead of a Rectangle per bin
+                ax.stairs(data['counts'], data['edges'], fill=True, alpha=0.7, color='skyblue')
+                ax.set_ylabel('Frequency')
+            else:
+                ax.bar(range(len(data['counts'])), data['counts'])
+                ax.set_ylabel('Count')
+                ax.set_xticks(range(len(data['counts'])))
+                ax.set_xticklabels(data['labels'], rotation=45)
+            ax.set_title(f'{col} Distribution')
+            ax.set_xlabel(col)
+        
+        # Hide empty subplots
+        for ax in axes.flat[len(page_columns):]:
+            ax.set_visible(False)
+        
+        plt.tight_layout()
+        return fig
     
-    plt.tight_layout()
-    return fig
+    return bin_data, (draw_page(page) for page in range(n_pages))
 
 def create_correlation_analysis():
     """Create correlation heatmap"""
-    plt.figure(figsize=(12, 8))
-    
     # Use only numeric columns for correlation
     numeric_df = df_processed.select_dtypes(include=[np.number])
     if len(numeric_df.columns) > 1:
-        correlation_matrix = numeric_df.corr()
-        
-        mask = np.triu(np.ones_like(correlation_matrix, dtype=bool))
-        sns.heatmap(correlation_matrix, mask=mask, annot=True, cmap='coolwarm', 
-                    center=0, square=True, fmt='.2f')
-        plt.title('Feature Correlation Heatmap', fontsize=16, fontweight='bold')
+        # Chunked correlation; wide datasets are limited to the features most
+        # correlated with the target and drawn without per-cell annotations
+        corr = correlation_matrix(numeric_df)
+        plot_correlation_heatmap(corr, title='Feature Correlation Heatmap', top_k=40,
+                                 target=target_column, mask_upper=True)
     else:
+        plt.figure(figsize=(12, 8))
         plt.text(0.5, 0.5, 'Need at least 2 numeric columns\nfor correlation analysis', 
                 ha='center', va='center', fontsize=14, transform=plt.gca().transAxes)
         plt.title('Correlation Analysis', fontsize=16, fontweight='bold')
@@ -213,15 +200,17 @@ def create_correlation_analysis():
 
 def create_model_comparison():
     """Compare model performance"""
-    models = ['Linear Regression', 'Random Forest']
-    mse_values = [lr_mse, rf_mse]
-    r2_values = [lr_r2, rf_r2]
+    models = list(results.index)
+    mse_values = list(results['mse'])
+    r2_values = list(results['r2'])
+    finite_mse = [v for v in mse_values if v != float('inf')] or [0]
     
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
     
     # MSE Comparison
-    colors = ['#3498db', '#e74c3c']
-    bars1 = ax1.bar(models, mse_values, color=colors)
+    colors = ['#3498db', '#e74c3c', '#9b59b6', '#1abc9c', '#34495e']
+    bars1 = ax1.bar(models, [v if v != float('inf') else 0 for v in mse_values],
+                    color=[colors[i % len(colors)] for i in range(len(models))])
     ax1.set_title('Model Comparison - Mean Squared Error', fontsize=14, fontweight='bold')
     ax1.set_ylabel('MSE')
     ax1.grid(True, alpha=0.3)
@@ -229,11 +218,11 @@ def create_model_comparison():
     # Add value labels
     for i, v in enumerate(mse_values):
         if v != float('inf'):
-            ax1.text(i, v + max(mse_values) * 0.01, f'{v:.0f}', 
+            ax1.text(i, v + max(finite_mse) * 0.01, f'{v:.0f}', 
                     ha='center', va='bottom', fontweight='bold')
     
     # R² Comparison
-    bars2 = ax2.bar(models, r2_values, color=['#2ecc71', '#f39c12'])
+    bars2 = ax2.bar(models, r2_values, color=[['#2ecc71', '#f39c12'][i % 2] for i in range(len(models))])
     ax2.set_title('Model Comparison - R² Score', fontsize=14, fontweight='bold')
     ax2.set_ylabel('R²')
     ax2.set_ylim(0, 1)
@@ -250,21 +239,16 @@ def create_model_comparison():
 
 def create_prediction_analysis():
     """Analyze predictions vs actual"""
-    if lr_r2 == 0 and rf_r2 == 0:
+    if not predictions or (results['r2'] == 0).all():
         return None
         
     fig, axes = plt.subplots(1, 2, figsize=(15, 6))
     fig.suptitle('Prediction Analysis', fontsize=16, fontweight='bold')
     
-    # Use the better model
-    if rf_r2 > lr_r2:
-        pred = rf_pred
-        r2 = rf_r2
-        model_name = "Random Forest"
-    else:
-        pred = lr_pred
-        r2 = lr_r2
-        model_name = "Linear Regression"
+    # Use the better model (results are ranked best first)
+    model_name = next(name for name in results.index if name in predictions)
+    pred = predictions[model_name]
+    r2 = results.loc[model_name, 'r2']
     
     # Scatter plot
     axes[0].scatter(y_test, pred, alpha=0.6, color='blue')
@@ -295,10 +279,11 @@ def create_prediction_analysis():
 # -----------------------------
 print("\n📈 Generating visualizations...")
 
-# Graph 1: Data Overview
+# Graph 1: Data Overview (one figure per page of columns)
 print("📊 Creating data overview...")
-fig1 = create_data_overview()
-plt.show()
+overview_bins, overview_pages = create_data_overview()
+for fig1 in overview_pages:
+    plt.show()
 
 # Graph 2: Correlation Analysis
 print("🔥 Creating correlation analysis...")
@@ -326,10 +311,10 @@ print(f"📁 Dataset: {filename}")
 print(f"📈 Shape: {df.shape}")
 print(f"🎯 Target: {target_column}")
 
-if lr_r2 > 0 or rf_r2 > 0:
-    best_model = "Random Forest" if rf_r2 > lr_r2 else "Linear Regression"
-    best_r2 = max(lr_r2, rf_r2)
-    best_mse = min(lr_mse, rf_mse)
+if (results['r2'] > 0).any():
+    best_model = results['r2'].idxmax()
+    best_r2 = results['r2'].max()
+    best_mse = results['mse'].min()
     
     print(f"🏆 Best Model: {best_model}")
     print(f"📈 Best R² Score: {best_r2:.3f}")
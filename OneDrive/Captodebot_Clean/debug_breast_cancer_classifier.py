@@ -0,0 +1,160 @@
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+
+# -----------------------------
+# 1️⃣ Load Dataset (FIXED: Use sample data instead of hardcoded path)
+# -----------------------------
+# Try to load the specific file, fallback to sample data if not found
+try:
+    file_path = r"C:\Users\dhaar\Brest_Cancer_Classifier\data.csv"
+    data = pd.read_csv(file_path)
+    print(f"✅ Successfully loaded data from: {file_path}")
+except FileNotFoundError:
+    print(f"❌ File not found: {file_path}")
+    print("🔄 Creating sample breast cancer dataset for demonstration...")
+    from sklearn.datasets import load_breast_cancer
+    cancer = load_breast_cancer()
+    data = pd.DataFrame(cancer.data, columns=cancer.feature_names)
+    data['diagnosis'] = cancer.target  # 0=benign, 1=malignant
+    print("✅ Using built-in breast cancer dataset")
+
+# -----------------------------
+# 2️⃣ Target + Features (FIXED: Better error handling)
+# -----------------------------
+if "diagnosis" in data.columns:
+    y = data["diagnosis"]
+    X = data.drop("diagnosis", axis=1)
+    print(f"✅ Found 'diagnosis' column - using as target")
+elif "target" in data.columns:
+    y = data["target"]
+    X = data.drop("target", axis=1)
+    print(f"✅ Found 'target' column - using as target")
+else:
+    # Use last column as target if neither exists
+    target_col = data.columns[-1]
+    y = data[target_col]
+    X = data.drop(target_col, axis=1)
+    print(f"⚠️ Target column not found, using last column: {target_col}")
+
+print(f"📊 Dataset shape: {X.shape}")
+print(f"🎯 Target distribution: {y.value_counts().to_dict()}")
+
+# Keep only numeric columns (FIXED: Handle non-numeric properly)
+numeric_cols = X.select_dtypes(include=["number"]).columns
+X = X[numeric_cols]
+print(f"🔢 Numeric features: {len(numeric_cols)}")
+
+# -----------------------------
+# 3️⃣ Check Missing Values (imputed by the preprocessing pipeline in step 5)
+# -----------------------------
+print("\n🔧 Checking missing values...")
+if X.isnull().sum().sum() > 0:
+    print(f"⚠️ Found {X.isnull().sum().sum()} missing values (will be imputed using mean strategy)")
+else:
+    print("✅ No missing values found")
+
+# -----------------------------
+# 4️⃣ Train-Test Split (IMPROVED: Better stratification)
+# -----------------------------
+print("\n📦 Splitting data...")
+try:
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    print(f"✅ Train set: {X_train.shape}, Test set: {X_test.shape}")
+except ValueError as e:
+    print(f"⚠️ Stratification failed: {e}")
+    print("🔄 Using simple split without stratification...")
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+# -----------------------------
+# 5️⃣ Imputation + Feature Scaling (cached pipeline, fitted on the training set only)
+# -----------------------------
+print("\n⚖️ Imputing and scaling features...")
+try:
+    X_train, preprocessor = preprocess(X_train, impute="mean", scale=True)
+    X_test = preprocessor.transform(X_test)
+    print("✅ Features imputed (mean) and scaled using StandardScaler")
+except Exception as e:
+    print(f"⚠️ Preprocessing failed: {e}")
+    print("🔄 Using unscaled data...")
+
+# -----------------------------
+# 6️⃣ Model Training (IMPROVED: Better error handling)
+# -----------------------------
+print("\n🤖 Training Logistic Regression model...")
+try:
+    model = cached_fit(LogisticRegression(max_iter=1000, random_state=42), X_train, y_train)
+    print("✅ Model training completed successfully")
+except Exception as e:
+    print(f"❌ Model training failed: {e}")
+    exit(1)
+
+# A baseline to compare against; the evaluation below handles any number of models
+models = {"Logistic Regression": model}
+try:
+    models["Random Forest"] = cached_fit(RandomForestClassifier(n_estimators=100, random_state=42), X_train, y_train)
+except Exception as e:
+    print(f"⚠️ Random Forest baseline failed: {e}")
+
+# -----------------------------
+# 7️⃣ Evaluation (one confusion matrix per model, ROC/PR curves from one sort)
+# -----------------------------
+print("\n" + "="*50)
+print("📊 Breast Cancer Classifier Metrics")
+print("="*50)
+
+try:
+    summary, details = evaluate_classifiers(
+        models, X_test, y_test,
+        labels=["Benign (0)", "Malignant (1)"],
+        title="ROC / Precision-Recall - Breast Cancer Classifier"
+    )
+    metrics = summary.loc["Logistic Regression"]
+    
+    print(f"\n🎯 Accuracy : {metrics['accuracy']:.4f} ({metrics['accuracy']*100:.2f}%)")
+    print(f"🎯 Precision: {metrics['precision']:.4f}")
+    print(f"🎯 Recall   : {metrics['recall']:.4f}")
+    print(f"🎯 F1 Score : {metrics['f1']:.4f}")
+    if 'roc_auc' in summary:
+        print(f"🎯 ROC-AUC  : {metrics['roc_auc']:.4f}")
+    
+    # -----------------------------
+    # 8️⃣ ROC Curve (drawn by the evaluation with downsampled points)
+    # -----------------------------
+    if 'roc_auc' in summary:
+        print("\n📈 ROC Curve created successfully")
+        plt.show()  # This will display inline in CaptodeBot
+    else:
+        print("⚠️ ROC Curve requires binary classification (2 classes)")
+        print("🔄 Creating simple accuracy plot instead...")
+        
+        # Fallback: Create a simple metrics plot
+        labels = ['Accuracy', 'Precision', 'Recall', 'F1-Score']
+        values = [metrics['accuracy'], metrics['precision'], metrics['recall'], metrics['f1']]
+        
+        plt.figure(figsize=(10, 6))
+        bars = plt.bar(labels, values, color=['#2E86AB', '#A23B72', '#F18F01', '#C73E1D'])
+        plt.title('Model Performance Metrics', fontsize=14, fontweight='bold')
+        plt.ylabel('Score', fontsize=12)
+        plt.ylim(0, 1)
+        
+        # Add value labels on bars
+        for i, v in enumerate(values):
+            plt.text(i, v + 0.01, f'{v:.3f}', ha='center', va='bottom', fontweight='bold')
+        
+        plt.grid(True, alpha=0.3, axis='y')
+        plt.tight_layout()
+        plt.show()
+
+except Exception as e:
+    print(f"❌ Evaluation failed: {e}")
+
+print("\n🎉 Breast Cancer Classification Analysis Complete!")
+print("="*50)
@@ -5,6 +5,8 @@ const sqlite3 = require('sqlite3').verbose();
 const path = require('path');
 
 const MockGPUService = require('./services/mockGPUService');
+const DatasetStore = require('./services/datasetStore');
+const StorageManager = require('./services/storageManager');
 
 // Import routes
 const authRoutes = require('./routes/auth');
@@ -30,9 +32,15 @@ const db = new sqlite3.Database(dbPath, (err) => {
   console.log('Connected to SQLite database.');
 });
 
-// Make database and GPU service available to routes
+// Make database, GPU service, dataset store and storage manager available to routes
 app.locals.db = db;
 app.locals.gpuService = new MockGPUService(db);
+app.locals.datasetStore = new DatasetStore(db);
+// The kernel reads the catalog directly, so bring its schema up to date before any run
+app.locals.datasetStore.ensureSchema()
+  .catch(error => console.error('Error preparing dataset catalog:', error));
+app.locals.storageManager = new StorageManager(db, app.locals.datasetStore);
+app.locals.storageManager.start();
 
 // Routes
 app.use('/api/auth', authRoutes);
@@ -67,8 +75,10 @@ app.listen(PORT, () => {
 });
 
 // Graceful shutdown
-process.on('SIGINT', () => {
+process.on('SIGINT', async () => {
   console.log('\nShutting down gracefully...');
+  // Write buffered execution metrics before the connection goes away
+  await app.locals.gpuService.telemetry.flush();
   db.close((err) => {
     if (err) {
       console.error('Error closing database:', err.message);
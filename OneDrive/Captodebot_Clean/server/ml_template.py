@@ -14,6 +14,236 @@ if sys.platform == 'win32':
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer)
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer)
 
+# ==================== CELL METRICS ====================
+# Phase timings for this run (startup, packages, user code, render) and an
+# opt-in profile of the user code. The server marks the phases with
+# _cell_phase() calls around the user code and strips the metrics line
+# printed at exit from the cell output.
+import time
+import json
+import atexit
+
+_METRICS_MARKER = '__CAPTODEBOT_METRICS__'
+_PROFILE_MODE = os.environ.get('CAPTODEBOT_PROFILE', '').lower()  # 'cpu', 'memory' or ''
+_PROFILE_TOP_N = 15
+_REPORTED_PHASES = ('startup', 'packages', 'user_code')
+
+_cell_phases = {}
+_current_phase = 'startup'
+_render_seconds = 0.0
+_profiler = None
+_profile_summary = None
+_user_code_line = 0
+_metrics_emitted = False
+_cache_stats = {'hits': 0, 'misses': 0}
+_exit_reason = None  # 'exception' or 'interrupted' when the user code does not finish
+_datasets_used = []  # User-facing names of the datasets the cell read, in order
+_template_names = {}  # Globals defined before the user code, by value; not reported as its objects
+_LARGEST_OBJECTS_N = 5
+_DEEP_SIZE_MAX_ROWS = 1_000_000  # Larger frames are sized without inspecting every string
+
+# Startup counts from the server's spawn time when it is known
+try:
+    _phase_started = time.perf_counter() - max(0.0, time.time() - float(os.environ['CAPTODEBOT_SPAWN_TIME']) / 1000)
+except (KeyError, ValueError):
+    _phase_started = time.perf_counter()
+_phase_render_mark = 0.0
+
+def _cell_location(filename, lineno):
+    """'cell:3' for lines of the user code, 'module.py:10' elsewhere"""
+    if filename == '~':
+        return 'built-in'
+    if filename == sys.argv[0]:
+        # The template is prepended to the cell, so its line numbers are unchanged
+        if lineno > _user_code_line:
+            return f'cell:{lineno - _user_code_line}'
+        return f'ml_template.py:{lineno}'
+    return f'{os.path.basename(filename)}:{lineno}'
+
+def _start_profile():
+    global _profiler
+    if _PROFILE_MODE == 'cpu':
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    elif _PROFILE_MODE == 'memory':
+        import tracemalloc
+        tracemalloc.start()
+        _profiler = tracemalloc
+
+def _stop_profile():
+    """Stop the profiler and keep its top-N summary for the metrics line"""
+    global _profiler, _profile_summary
+    if _profiler is None:
+        return
+    if _PROFILE_MODE == 'cpu':
+        import pstats
+        _profiler.disable()
+        stats = pstats.Stats(_profiler).stats
+        rows = sorted(
+            ((key, value) for key, value in stats.items() if key[2] not in ('_cell_phase', '_stop_profile')),
+            key=lambda item: item[1][3], reverse=True
+        )
+        _profile_summary = {
+            'mode': 'cpu',
+            'total_ms': round(sum(value[2] for value in stats.values()) * 1000, 1),
+            'functions': [
+                {'function': func, 'location': _cell_location(filename, lineno),
+                 'calls': calls, 'self_ms': round(tottime * 1000, 2), 'cumulative_ms': round(cumtime * 1000, 2)}
+                for (filename, lineno, func), (_, calls, tottime, cumtime, _) in rows[:_PROFILE_TOP_N]
+            ],
+        }
+    else:
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        tracemalloc.stop()
+        _profile_summary = {
+            'mode': 'memory',
+            'current_mb': round(current / 1024**2, 2),
+            'peak_mb': round(peak / 1024**2, 2),
+            'allocations': [
+                {'location': _cell_location(stat.traceback[0].filename, stat.traceback[0].lineno),
+                 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:_PROFILE_TOP_N]
+            ],
+        }
+    _profiler = None
+
+def _cell_phase(name):
+    """End the running phase and start `name` (None ends the run); figure rendering is timed separately"""
+    global _current_phase, _phase_started, _phase_render_mark, _user_code_line, _template_names
+    now = time.perf_counter()
+    if _current_phase is not None:
+        elapsed = now - _phase_started - (_render_seconds - _phase_render_mark)
+        _cell_phases[_current_phase] = _cell_phases.get(_current_phase, 0.0) + max(0.0, elapsed)
+        if _current_phase == 'user_code':
+            _stop_profile()
+    _current_phase, _phase_started, _phase_render_mark = name, now, _render_seconds
+    if name == 'user_code':
+        _user_code_line = sys._getframe(1).f_lineno
+        _template_names = dict(globals())
+        _start_profile()
+
+def _count_cache(hit):
+    """Count a model or dataset cache lookup for the run's metrics"""
+    _cache_stats['hits' if hit else 'misses'] += 1
+
+_original_excepthook = sys.excepthook
+def _metrics_excepthook(exc_type, exc, tb):
+    global _exit_reason
+    _exit_reason = 'interrupted' if issubclass(exc_type, KeyboardInterrupt) else 'exception'
+    _original_excepthook(exc_type, exc, tb)
+
+sys.excepthook = _metrics_excepthook
+
+def _note_dataset(path_or_name):
+    """Remember a dataset the cell read, under the name the user knows it by"""
+    if not isinstance(path_or_name, (str, os.PathLike)):
+        return
+    path = os.fspath(path_or_name)
+    if uploaded_file_path and os.path.abspath(path) == os.path.abspath(uploaded_file_path):
+        name = uploaded_file_name
+    elif _digest_for_path(path):
+        return  # A resolved object file; the caller notes the requested name
+    else:
+        name = os.path.basename(path)
+    if name and name not in _datasets_used:
+        _datasets_used.append(name)
+
+def _reap_workers():
+    """Shut down joblib's reusable worker pool so its peak RSS counts towards the children"""
+    if 'joblib.externals.loky' not in sys.modules:
+        return
+    try:
+        from joblib.externals.loky import reusable_executor
+        if reusable_executor._executor is not None:
+            reusable_executor._executor.shutdown(wait=True)
+    except Exception:
+        pass
+
+def _resource_usage():
+    """CPU seconds (with finished child processes), peak RSS of this run and of its largest worker"""
+    _reap_workers()
+    times = os.times()
+    usage = {'cpu_seconds': round(times.user + times.system + times.children_user + times.children_system, 3)}
+    try:
+        import resource
+        scale = 1024**2 if sys.platform == 'darwin' else 1024  # ru_maxrss is bytes on macOS, KB on Linux
+        usage['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+        usage['workers_peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    except ImportError:
+        pass  # No getrusage on Windows
+    return usage
+
+def _object_size(obj, depth=2, seen=None):
+    """Estimated bytes held by an object: frames and arrays exactly, containers a few levels deep"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'index'):
+        # pandas DataFrame / Series
+        usage = obj.memory_usage(index=True, deep=len(obj) <= _DEEP_SIZE_MAX_ROWS)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if isinstance(getattr(obj, 'nbytes', None), int):
+        return obj.nbytes  # numpy arrays
+    size = sys.getsizeof(obj)
+    if depth <= 0:
+        return size
+    if isinstance(obj, dict):
+        children = list(obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        children = list(obj)
+    else:
+        # Fitted models keep their arrays in instance attributes
+        children = list(getattr(obj, '__dict__', {}).values())
+    return size + sum(_object_size(child, depth - 1, seen) for child in children[:10_000])
+
+def _largest_objects():
+    """The biggest values the user code left in the namespace"""
+    import types
+    skip = (types.ModuleType, types.FunctionType, types.BuiltinFunctionType, type)
+    sizes = []
+    for name, obj in list(globals().items()):
+        # A template name the user code rebound is the user's object
+        if name.startswith('_') or _template_names.get(name, _template_names) is obj or isinstance(obj, skip):
+            continue
+        try:
+            sizes.append((_object_size(obj), name, type(obj).__name__))
+        except Exception:
+            continue
+    sizes.sort(reverse=True)
+    return [{'name': name, 'type': kind, 'size_mb': round(size / 1024**2, 2)}
+            for size, name, kind in sizes[:_LARGEST_OBJECTS_N]]
+
+def _emit_cell_metrics():
+    """Print the metrics line once, after the user code and the final render"""
+    global _metrics_emitted
+    if _metrics_emitted:
+        return
+    _metrics_emitted = True
+    _cell_phase(None)
+    phases = {name: round(_cell_phases[name] * 1000, 1) for name in _REPORTED_PHASES if name in _cell_phases}
+    phases['render'] = round(_render_seconds * 1000, 1)
+    metrics = {
+        'phases': phases,
+        'run': dict(_resource_usage(), figures=globals().get('_figure_counter', 0),
+                    cache_hits=_cache_stats['hits'], cache_misses=_cache_stats['misses'],
+                    exit_reason=_exit_reason),
+        'memory': {'datasets': _datasets_used, 'largest_objects': _largest_objects()},
+    }
+    if _profile_summary is not None:
+        metrics['profile'] = _profile_summary
+    try:
+        sys.stdout.write(f'\n{_METRICS_MARKER}{json.dumps(metrics)}\n')
+        sys.stdout.flush()
+    except Exception:
+        pass
+
+# Registered first so it runs after the template's exit-time renders
+atexit.register(_emit_cell_metrics)
+
 # ==================== HYBRID ENVIRONMENT SETUP ====================
 # User can choose between inline (Colab-style) and GUI rendering
 
@@ -171,12 +401,13 @@ _figure_counter = 0
 
 def render_existing_figures():
     """Colab-style Figure Rendering - Automatic inline display"""
-    global _figure_counter
-    
+    global _figure_counter, _render_seconds
+
     # Check if any matplotlib/seaborn figures exist after code execution
     if not plt.get_fignums():
         return False
-    
+
+    render_started = time.perf_counter()
     # Render each figure inline (Colab-style)
     for fig_num in plt.get_fignums():
         try:
@@ -202,44 +433,191 @@ def render_existing_figures():
         except Exception as e:
             print(f"Warning: Could not render figure {fig_num}: {e}")
             continue
-    
+
+    _render_seconds += time.perf_counter() - render_started
     return True
 
 # ==================== END MANDATORY SETUP ====================
 
-# Get the latest uploaded file path
+# ==================== CONTENT-ADDRESSED DATASET STORE ====================
+# Uploads are stored once under their SHA-256 digest (../uploads/objects) and
+# dataset names are references to that digest in the server database. Derived
+# caches live under ../uploads/cache/<digest>/ and are shared by every upload
+# of the same bytes.
+
+_UPLOADS_DIR = os.path.join('..', 'uploads')
+_OBJECTS_DIR = os.path.join(_UPLOADS_DIR, 'objects')
+_CACHE_DIR = os.path.join(_UPLOADS_DIR, 'cache')
+_DATABASE_PATH = os.path.join('..', 'database.sqlite')
+_CURRENT_USER_ID = os.environ.get('CAPTODEBOT_USER_ID')
+
+def _catalog_query(sql, params=()):
+    """Run a read-only query against the dataset catalog; None if it is unavailable"""
+    import sqlite3
+    if not os.path.exists(_DATABASE_PATH):
+        return None
+    try:
+        with sqlite3.connect(f'file:{_DATABASE_PATH}?mode=ro', uri=True) as conn:
+            return conn.execute(sql, params).fetchall()
+    except sqlite3.Error:
+        return None
+
+def _latest_upload():
+    """(path, name, digest) of the caller's most recent upload, or None"""
+    if not _CURRENT_USER_ID:
+        return None
+    # Only the caller's own uploads, like _resolve_dataset
+    rows = _catalog_query(
+        'SELECT name, digest FROM datasets WHERE user_id = ? ORDER BY created_at DESC LIMIT 1',
+        (_CURRENT_USER_ID,)
+    )
+    if not rows:
+        return None
+    name, digest = rows[0]
+    path = os.path.join(_OBJECTS_DIR, f'{digest}.csv')
+    return (path, name, digest) if os.path.exists(path) else None
+
 uploaded_file_path = None
-try:
-    # Try to get the latest uploaded file info from the API
-    import urllib.request
-    import json
-    
-    response = urllib.request.urlopen('http://localhost:5000/api/workspace/latest-upload')
-    data = json.loads(response.read().decode('utf-8'))
-    
-    if data['success']:
-        uploaded_file_path = data['file']['tempPath']
-        print(f"📁 Latest uploaded file: {os.path.basename(uploaded_file_path)}")
-    else:
-        print("📁 No files uploaded yet")
-except Exception as e:
-    print("📁 Could not retrieve latest upload info")
+uploaded_file_name = None
+uploaded_file_digest = None
+_latest = _latest_upload()
+if _latest:
+    uploaded_file_path, uploaded_file_name, uploaded_file_digest = _latest
+    print(f"📁 Latest uploaded file: {uploaded_file_name}")
+else:
+    print("📁 No files uploaded yet")
+
+def _dataset_cache_path(digest, name):
+    """Path of a derived artifact cached for the given content digest"""
+    return os.path.join(_CACHE_DIR, digest, name)
+
+def _digest_for_path(path):
+    """Return the content digest for a file in the object store, if known"""
+    if not isinstance(path, (str, os.PathLike)):
+        return None
+    path = os.fspath(path)
+    if uploaded_file_digest and uploaded_file_path and os.path.abspath(path) == os.path.abspath(uploaded_file_path):
+        return uploaded_file_digest
+    if os.path.abspath(os.path.dirname(path)) == os.path.abspath(_OBJECTS_DIR):
+        stem = os.path.basename(path).split('.')[0]
+        if len(stem) == 64:
+            return stem
+    return None
+
+def _resolve_dataset(name):
+    """Resolve a dataset name (or ID) to its object path via the catalog"""
+    # Only the caller's own uploads; other users' datasets are never visible
+    rows = _catalog_query(
+        'SELECT digest FROM datasets WHERE (id = ? OR name = ?) AND user_id = ? '
+        'ORDER BY created_at DESC LIMIT 1',
+        (name, name, _CURRENT_USER_ID)
+    )
+    if not rows:
+        return None
+    path = os.path.join(_OBJECTS_DIR, f'{rows[0][0]}.csv')
+    return path if os.path.exists(path) else None
+
+def _touch(path):
+    """Mark a stored file as recently used; the server's storage manager evicts by mtime"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def _load_columnar_cache(digest):
+    """Load the columnar copy of a dataset, or None if it was never converted"""
+    for name, reader in (('frame.parquet', pd.read_parquet), ('frame.pkl', pd.read_pickle)):
+        path = _dataset_cache_path(digest, name)
+        if os.path.exists(path):
+            try:
+                df = reader(path)
+            except Exception:
+                continue
+            _touch(path)
+            return df
+    return None
+
+def _store_columnar_cache(digest, df):
+    """Persist a columnar copy of a parsed dataset (Parquet if pyarrow is installed)"""
+    try:
+        os.makedirs(os.path.dirname(_dataset_cache_path(digest, 'frame.pkl')), exist_ok=True)
+        try:
+            import pyarrow  # noqa: F401
+            name, writer = 'frame.parquet', df.to_parquet
+        except ImportError:
+            name, writer = 'frame.pkl', df.to_pickle
+        path = _dataset_cache_path(digest, name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        # The cache is an optimisation only; the CSV stays authoritative
+        pass
+
+_COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    (b'PK\x03\x04', 'zip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+)
+
+def _sniff_compression(path):
+    """Detect compressed files by their magic bytes (names like data.csv may still be gzipped)"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(6)
+    except OSError:
+        return 'infer'
+    for magic, compression in _COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+def _read_csv_file(path, **kwargs):
+    """Read a CSV file, decompressing gzip/zstd/zip/bz2/xz input on the fly"""
+    kwargs.setdefault('compression', _sniff_compression(path))
+    try:
+        return original_read_csv(path, **kwargs)
+    except ImportError:
+        if kwargs.get('compression') == 'zstd':
+            print("⚠️  Warning: reading .zst files needs zstandard. Install with: pip install zstandard")
+        raise
+
+def _read_dataset(path):
+    """Read a stored dataset, going through the columnar cache keyed by its digest"""
+    digest = _digest_for_path(path)
+    if digest:
+        _touch(os.path.join(_OBJECTS_DIR, f'{digest}.csv'))
+        df = _load_columnar_cache(digest)
+        _count_cache(df is not None)
+        if df is not None:
+            return df
+    df = _read_csv_file(path)
+    if digest:
+        _store_columnar_cache(digest, df)
+    return df
 
 # Enhanced file loading with better error handling
 def safe_load_csv(filename=None):
-    """Safely load a CSV file with helpful error messages"""
+    """Safely load a CSV file (plain or .gz/.zst/.zip/.bz2/.xz compressed) with helpful error messages"""
+    requested = filename if filename is not None else uploaded_file_path
     if filename is None:
         if uploaded_file_path:
             filename = uploaded_file_path
-            print(f"📁 Using latest uploaded file: {os.path.basename(filename)}")
+            print(f"📁 Using latest uploaded file: {uploaded_file_name}")
         else:
             print("❌ No file specified and no uploaded files available")
             print("💡 Please upload a CSV file first, or specify a filename")
             return None
+    elif not os.path.exists(filename):
+        # Uploaded datasets are addressed by name, not by a file in the working directory
+        filename = _resolve_dataset(os.path.basename(filename)) or filename
     
     try:
-        df = pd.read_csv(filename)
-        print(f"✅ Successfully loaded: {os.path.basename(filename)}")
+        df = _read_dataset(filename)
+        _note_dataset(requested)
+        print(f"✅ Successfully loaded: {uploaded_file_name if filename == uploaded_file_path else os.path.basename(filename)}")
         return df
     except FileNotFoundError:
         print(f"❌ File not found: {filename}")
@@ -266,8 +644,18 @@ original_read_csv = pd.read_csv
 def smart_read_csv(filepath_or_buffer, **kwargs):
     """Smart CSV reader with enhanced error handling"""
     try:
-        return original_read_csv(filepath_or_buffer, **kwargs)
+        df = original_read_csv(filepath_or_buffer, **kwargs)
+        _note_dataset(filepath_or_buffer)
+        return df
     except FileNotFoundError:
+        # Uploaded datasets are stored by digest; resolve the user-facing name
+        if isinstance(filepath_or_buffer, (str, os.PathLike)):
+            resolved = _resolve_dataset(os.path.basename(os.fspath(filepath_or_buffer)))
+            if resolved:
+                df = _read_dataset(resolved) if not kwargs else original_read_csv(resolved, **kwargs)
+                _note_dataset(filepath_or_buffer)
+                return df
+        
         print(f"❌ File not found: {filepath_or_buffer}")
         print("\n🔍 Debugging Information:")
         print(f"Working Directory: {os.getcwd()}")
@@ -320,7 +708,7 @@ except ImportError:
 
 try:
     from sklearn.datasets import load_iris, make_classification, make_regression
-    from sklearn.model_selection import train_test_split
+    from sklearn.model_selection import train_test_split, KFold, StratifiedKFold, cross_validate
     from sklearn.preprocessing import StandardScaler
     from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
     from sklearn.linear_model import LinearRegression, LogisticRegression
@@ -369,8 +757,344 @@ def display_df(df, max_rows=10, max_cols=None):
         print(f"\nShowing {max_cols} columns out of {len(df.columns)}")
 
 # Quick EDA function
-def quick_eda(df, target_col=None):
-    """Perform quick exploratory data analysis"""
+from contextlib import contextmanager
+import time
+
+@contextmanager
+def _timed(timings, step):
+    """Record the wall-clock duration of a step (in seconds) into timings[step]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[step] = timings.get(step, 0.0) + time.perf_counter() - start
+
+def _eda_sample(df, sample, random_state=42):
+    """Resolve quick_eda's sample= argument (row count or fraction) to a row sample"""
+    if sample is None:
+        return df
+    n_rows = len(df)
+    n = int(round(sample * n_rows)) if isinstance(sample, float) and sample <= 1 else int(sample)
+    if n <= 0 or n >= n_rows:
+        return df
+    return df.sample(n=n, random_state=random_state)
+
+def _profile_numeric(values):
+    """Missing counts and describe()-style statistics for a 2-D float array, column-wise"""
+    missing = np.isnan(values).sum(axis=0)
+    count = values.shape[0] - missing
+    stats = np.vstack([
+        count,
+        np.nanmean(values, axis=0),
+        np.nanstd(values, axis=0, ddof=1),
+        np.nanmin(values, axis=0),
+        np.nanpercentile(values, [25, 50, 75], axis=0),
+        np.nanmax(values, axis=0),
+    ])
+    return missing, stats
+
+# Approximate categorical summaries: one hashing pass per column feeds a
+# HyperLogLog distinct count and a Misra-Gries heavy-hitters summary, both
+# mergeable across row chunks
+_SKETCH_CHUNK_ROWS = 100_000
+_HLL_PRECISION = 14
+_HLL_RELATIVE_ERROR = 1.04 / (1 << _HLL_PRECISION) ** 0.5
+_HEAVY_HITTERS = 64
+_ID_LIKE_RATIO = 0.95
+
+class _CategorySketch:
+    """Mergeable distinct-count and top-values sketch over hashed values"""
+    
+    def __init__(self, precision=_HLL_PRECISION, counters=_HEAVY_HITTERS):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+        self.counters = counters
+        # Misra-Gries summary: value hashes with lower-bound counts
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.values = {}   # hash -> original value, for display
+        self.rows = 0
+        self.id_like = False
+        self.scale = 1.0   # extrapolation factor when sketching stopped early
+    
+    def update(self, values):
+        """Add a chunk of non-null values (a Series)"""
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        self.rows += len(hashes)
+        
+        # HyperLogLog: the top bits pick a register, the position of the
+        # highest set bit in the remaining bits is the rank stored in it
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, 64 - p + 1, 64 - p - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        
+        # Exact counts within the chunk (on the hashes, not the strings) are
+        # an exact summary, merged like any other
+        unique, first, counts = np.unique(hashes, return_index=True, return_counts=True)
+        self._combine(unique, counts, lambda h, i=dict(zip(unique.tolist(), first.tolist())): values.iat[i[h]])
+    
+    def _combine(self, keys, counts, value_of):
+        """Add a summary and reduce back to at most `counters` entries"""
+        keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts])).astype(np.int64)
+        if len(keys) > self.counters:
+            floor = np.partition(counts, -self.counters - 1)[-self.counters - 1]
+            keep = counts > floor
+            keys, counts = keys[keep], counts[keep] - floor
+        known = self.values
+        self.values = {h: known[h] if h in known else value_of(h) for h in keys.tolist()}
+        self.keys, self.counts = keys, counts
+    
+    def merge(self, other):
+        """Combine with a sketch built over different rows"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        self._combine(other.keys, other.counts, other.values.__getitem__)
+        self.rows += other.rows
+        return self
+    
+    def distinct(self):
+        """Estimated number of distinct values"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return int(round(min(estimate, self.rows) * self.scale))
+    
+    def top(self, n=3):
+        """Most frequent values with lower-bound counts"""
+        order = np.argsort(self.counts, kind='stable')[::-1][:n]
+        return {self.values[h]: int(c) for h, c in zip(self.keys[order].tolist(), self.counts[order])}
+
+def sketch_column(series, chunk_rows=_SKETCH_CHUNK_ROWS):
+    """Sketch a column chunk by chunk (nulls excluded)
+    
+    When the first chunk is already ID-like the column is not hashed any
+    further: the sketch is flagged id_like and its distinct count is
+    extrapolated from that chunk.
+    """
+    sketch = _CategorySketch()
+    for start in range(0, len(series), chunk_rows):
+        chunk = series.iloc[start:start + chunk_rows].dropna()
+        if len(chunk):
+            sketch.update(chunk)
+        if start == 0 and len(series) > chunk_rows and _is_id_like(sketch.distinct(), sketch.rows):
+            sketch.id_like = True
+            sketch.scale = series.notna().sum() / sketch.rows
+            break
+    return sketch
+
+def _is_id_like(distinct, non_null):
+    """Nearly every value is unique (names, tickets, keys), so top values are noise"""
+    return non_null >= 50 and distinct >= _ID_LIKE_RATIO * non_null
+
+# Correlation views switch strategy with the number of features: annotated
+# cells up to _CORR_ANNOTATE_MAX, a plain heatmap up to _CORR_HEATMAP_MAX and
+# a cluster-ordered single image beyond that (one artist instead of k² texts)
+_CORR_ANNOTATE_MAX = 20
+_CORR_HEATMAP_MAX = 60
+_CORR_CHUNK_ROWS = 100_000
+
+def correlation_matrix(data, chunk_rows=_CORR_CHUNK_ROWS):
+    """Pearson correlation of numeric columns, computed in row chunks with NumPy
+    
+    Accepts a DataFrame (numeric columns are used) or a 2-D array. Missing
+    values are handled pairwise like DataFrame.corr(), but only one chunk of
+    rows is ever converted to float at a time.
+    """
+    if isinstance(data, pd.DataFrame):
+        numeric = data.select_dtypes(include=[np.number])
+        columns = numeric.columns
+        get_chunk = lambda start: numeric.iloc[start:start + chunk_rows].to_numpy(dtype='float64', na_value=np.nan)
+    else:
+        numeric = np.asarray(data)
+        columns = pd.RangeIndex(numeric.shape[1])
+        get_chunk = lambda start: np.asarray(numeric[start:start + chunk_rows], dtype='float64')
+    
+    k = len(columns)
+    n = np.zeros((k, k))
+    sum_x = np.zeros((k, k))
+    sum_xx = np.zeros((k, k))
+    sum_xy = np.zeros((k, k))
+    shift = None
+    for start in range(0, len(numeric), chunk_rows):
+        chunk = get_chunk(start)
+        if shift is None:
+            # Centering on the first chunk's means keeps the sums well conditioned
+            shift = np.nan_to_num(np.nanmean(chunk, axis=0))
+        valid = ~np.isnan(chunk)
+        x = np.where(valid, chunk - shift, 0.0)
+        valid = valid.astype('float64')
+        # Pairwise sums: entry [i, j] only counts rows where both i and j are present
+        n += valid.T @ valid
+        sum_x += x.T @ valid
+        sum_xx += (x * x).T @ valid
+        sum_xy += x.T @ x
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var_i = sum_xx - sum_x ** 2 / n
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr = np.clip(corr, -1.0, 1.0)
+    corr[n < 2] = np.nan
+    np.fill_diagonal(corr, np.where(np.diag(n) >= 2, 1.0, np.nan))
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+def _top_correlated(corr, top_k, target=None):
+    """Columns of the top_k features: strongest with target, or overall"""
+    strength = corr.abs()
+    if target is not None and target in corr.columns:
+        ranking = strength[target].drop(target).sort_values(ascending=False)
+        keep = [target] + list(ranking.index[:top_k - 1])
+    else:
+        strength = strength.where(~np.eye(len(corr), dtype=bool))
+        keep = list(strength.pow(2).sum().sort_values(ascending=False).index[:top_k])
+    return corr.loc[keep, keep]
+
+def _cluster_order(corr):
+    """Order features so correlated groups sit next to each other"""
+    values = np.nan_to_num(corr.to_numpy())
+    try:
+        from scipy.cluster.hierarchy import linkage, leaves_list
+        from scipy.spatial.distance import squareform
+        distance = np.clip(1 - np.abs(values), 0, None)
+        np.fill_diagonal(distance, 0)
+        return leaves_list(linkage(squareform(distance, checks=False), method='average'))
+    except ImportError:
+        # Without scipy, sort by the leading eigenvector (spectral ordering)
+        return np.argsort(np.linalg.eigh(values)[1][:, -1])
+
+def plot_correlation_heatmap(corr, title='Correlation Heatmap', top_k=None, target=None,
+                             mask_upper=False, ax=None):
+    """Draw a correlation matrix with a rendering strategy that scales with its size
+    
+    top_k keeps only the k most correlated features (with target, if given).
+    Small matrices are annotated, medium ones drawn without annotations and
+    large ones cluster-reordered and rendered as a single image.
+    """
+    if top_k is not None and len(corr) > top_k:
+        corr = _top_correlated(corr, top_k, target)
+    k = len(corr)
+    
+    if ax is None:
+        size = min(8 + k * 0.1, 16)
+        ax = plt.figure(figsize=(size * 1.25, size)).gca()
+    
+    if k <= _CORR_HEATMAP_MAX:
+        mask = np.triu(np.ones_like(corr, dtype=bool)) if mask_upper else None
+        annotate = k <= _CORR_ANNOTATE_MAX
+        sns.heatmap(corr, mask=mask, annot=annotate, fmt='.2f', cmap='coolwarm',
+                    center=0, vmin=-1, vmax=1, square=True, ax=ax)
+        ax.set_title(title, fontsize=16, fontweight='bold')
+        return ax
+    
+    order = _cluster_order(corr)
+    corr = corr.iloc[order, order]
+    values = corr.to_numpy(copy=True)
+    if mask_upper:
+        values[np.triu_indices(k)] = np.nan
+    image = ax.imshow(values, cmap='coolwarm', vmin=-1, vmax=1, interpolation='nearest')
+    ax.figure.colorbar(image, ax=ax, fraction=0.046, pad=0.04)
+    if k <= 150:
+        ax.set_xticks(range(k))
+        ax.set_xticklabels(corr.columns, rotation=90, fontsize=6)
+        ax.set_yticks(range(k))
+        ax.set_yticklabels(corr.index, fontsize=6)
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+    ax.grid(False)
+    ax.set_title(f'{title} ({k} features, clustered)', fontsize=16, fontweight='bold')
+    return ax
+
+# Overview histograms: equal-width bins for every numeric column from one
+# vectorized pass (a single bincount per block of about _HIST_CHUNK_CELLS
+# values, all columns at once), plus top-N value counts for the other columns
+_HIST_CHUNK_CELLS = 1_000_000
+
+def histogram_data(df, bins=20, top_n=20):
+    """Histogram bins for every column of df, cheap to cache and redraw
+    
+    Returns a dict of column -> {'kind': 'numeric', 'counts', 'edges',
+    'missing'} (np.histogram-style bins, non-finite values counted as
+    missing) or {'kind': 'categorical', 'labels', 'counts', 'other',
+    'missing'} with the top_n values and the count of the rest.
+    """
+    numeric_cols = [col for col in df.select_dtypes(include=[np.number]).columns
+                    if not pd.api.types.is_bool_dtype(df[col])]
+    result = {}
+    
+    if numeric_cols:
+        values = df[numeric_cols]
+        k = len(numeric_cols)
+        chunk_rows = max(1, _HIST_CHUNK_CELLS // k)
+        lo, hi = np.full(k, np.inf), np.full(k, -np.inf)
+        for start in range(0, len(df), chunk_rows):
+            block = values.iloc[start:start + chunk_rows].to_numpy(dtype=float, na_value=np.nan)
+            lo = np.fmin(lo, np.fmin.reduce(block, axis=0))
+            hi = np.fmax(hi, np.fmax.reduce(block, axis=0))
+        for i in np.flatnonzero(~(np.isfinite(lo) & np.isfinite(hi))):
+            # Infinite values are binned as missing and must not set the range
+            column = values.iloc[:, i].to_numpy(dtype=float, na_value=np.nan)
+            finite = column[np.isfinite(column)]
+            lo[i], hi[i] = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+        # Constant columns get a unit-wide range, as in np.histogram
+        constant = hi <= lo
+        lo, hi = np.where(constant, lo - 0.5, lo), np.where(constant, lo + 0.5, hi)
+        width = (hi - lo) / bins
+        scale = 1.0 / width
+        # Each column gets bins + 1 slots; the extra one counts missing values
+        offsets = np.arange(k) * (bins + 1)
+        counts = np.zeros(k * (bins + 1), dtype=np.int64)
+        for start in range(0, len(df), chunk_rows):
+            block = values.iloc[start:start + chunk_rows].to_numpy(dtype=float, na_value=np.nan, copy=True)
+            block -= lo
+            block *= scale
+            np.floor(block, out=block)
+            invalid = ~np.isfinite(block)
+            # The maximum lands exactly on the last edge and belongs to the last bin
+            np.clip(block, 0, bins - 1, out=block)
+            block[invalid] = bins
+            index = block.astype(np.intp)
+            index += offsets
+            counts += np.bincount(index.ravel(), minlength=counts.size)
+        counts = counts.reshape(k, bins + 1)
+        for i, col in enumerate(numeric_cols):
+            result[col] = {'kind': 'numeric', 'counts': counts[i, :bins],
+                           'edges': lo[i] + width[i] * np.arange(bins + 1), 'missing': int(counts[i, bins])}
+    
+    for col in df.columns:
+        if col in result:
+            continue
+        value_counts = df[col].value_counts()
+        result[col] = {'kind': 'categorical', 'labels': [str(v) for v in value_counts.index[:top_n]],
+                       'counts': value_counts.to_numpy()[:top_n], 'other': int(value_counts.iloc[top_n:].sum()),
+                       'missing': int(df[col].isna().sum())}
+    return {col: result[col] for col in df.columns}
+
+def quick_eda(df, target_col=None, sample=None, random_state=42, top_k=None, approx=None):
+    """Perform quick exploratory data analysis in a single fused profiling pass
+    
+    sample: profile a random subset instead of every row, either a row count
+    (sample=100_000) or a fraction (sample=0.1). Sampled estimates are printed
+    with their 95% margin of error. A per-step timing breakdown is printed at
+    the end and the collected profile is returned as a dict.
+    
+    top_k: keep at most top_k features in the correlation heatmap (default:
+    all). With a numeric target_col these are the target plus the features
+    most correlated with it; otherwise the features with the largest summed
+    squared correlations. Large heatmaps are clustered and drawn as an image.
+    
+    approx: summarize categorical columns with HyperLogLog distinct counts
+    and a heavy-hitters sketch instead of exact value counts (default: only
+    above 100,000 rows). ID-like columns are detected and their top values
+    skipped in either mode.
+    """
     if not PANDAS_AVAILABLE:
         print("❌ Error: pandas is not available. Cannot perform EDA.")
         return
@@ -379,49 +1103,637 @@ def quick_eda(df, target_col=None):
         print("❌ Error: numpy is not available. Cannot perform EDA.")
         return
     
+    timings = {}
+    n_total = len(df)
+    
+    with _timed(timings, 'sample'):
+        data = _eda_sample(df, sample, random_state)
+    n = len(data)
+    sampled = n < n_total
+    if approx is None:
+        approx = n > _SKETCH_CHUNK_ROWS
+    # 95% margins with finite population correction
+    fpc = np.sqrt((n_total - n) / (n_total - 1)) if sampled and n_total > 1 else 0.0
+    z = 1.96
+    
     print("=== EXPLORATORY DATA ANALYSIS ===")
     print(f"Dataset Shape: {df.shape}")
-    print(f"Memory Usage: {df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
+    if sampled:
+        print(f"Profiled a random sample of {n:,} of {n_total:,} rows (random_state={random_state})")
+    
+    with _timed(timings, 'memory'):
+        # Deep sizing walks every string; in approximate mode one chunk is enough
+        measured = data.iloc[:_SKETCH_CHUNK_ROWS] if approx else data
+        memory = measured.memory_usage(deep=True).sum() * (n_total / len(measured) if len(measured) else 1)
+    estimated = sampled or len(measured) < n_total
+    print(f"Memory Usage: {memory / 1024**2:.2f} MB{' (estimated)' if estimated else ''}")
     
     print("\n=== DATA TYPES ===")
     print(df.dtypes)
     
+    numeric_cols = data.select_dtypes(include=[np.number]).columns
+    categorical_cols = data.select_dtypes(include=['object']).columns
+    other_cols = data.columns.difference(numeric_cols.append(categorical_cols), sort=False)
+    
+    # One pass per column: numeric columns share a single float matrix for
+    # missing counts and statistics; each categorical column is hashed once,
+    # either into exact counts or into a sketch.
+    with _timed(timings, 'numeric profile'):
+        missing = pd.Series(0, index=data.columns, dtype='int64')
+        numeric_summary = None
+        if len(numeric_cols) > 0:
+            values = data[numeric_cols].to_numpy(dtype='float64', na_value=np.nan)
+            numeric_missing, stats = _profile_numeric(values)
+            missing[numeric_cols] = numeric_missing
+            numeric_summary = pd.DataFrame(
+                stats, columns=numeric_cols,
+                index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+            )
+            if sampled:
+                numeric_summary.loc['mean ±95%'] = z * numeric_summary.loc['std'] / np.sqrt(numeric_summary.loc['count']) * fpc
+    
+    with _timed(timings, 'categorical profile'):
+        categorical_summary = {}
+        for col in categorical_cols:
+            if approx:
+                missing[col] = int(data[col].isna().sum())
+                sketch = sketch_column(data[col])
+                unique, top = sketch.distinct(), sketch.top(3)
+                if sketch.id_like:
+                    unique = min(unique, n - missing[col])
+            else:
+                counts = data[col].value_counts(dropna=False)
+                na_mask = counts.index.isna()
+                missing[col] = int(counts[na_mask].sum())
+                counts = counts[~na_mask]
+                unique, top = len(counts), counts.head(3).to_dict()
+            id_like = _is_id_like(unique, n - missing[col])
+            categorical_summary[col] = {
+                'unique': unique,
+                'top': None if id_like else top,
+                'id_like': id_like,
+            }
+        if len(other_cols) > 0:
+            missing[other_cols] = data[other_cols].isna().sum()
+    
     print("\n=== MISSING VALUES ===")
-    missing = df.isnull().sum()
-    missing_pct = (missing / len(df) * 100).round(2)
+    missing_pct = missing / n * 100 if n else missing * 0.0
     missing_df = pd.DataFrame({
-        'Missing Count': missing,
-        'Missing %': missing_pct
+        'Missing Count': (missing * (n_total / n)).round().astype('int64') if sampled and n else missing,
+        'Missing %': missing_pct.round(2)
     })
+    if sampled:
+        p_hat = missing_pct / 100
+        missing_df['±95% (pp)'] = (z * np.sqrt(p_hat * (1 - p_hat) / n) * fpc * 100).round(2)
     print(missing_df[missing_df['Missing Count'] > 0])
     
     print("\n=== NUMERICAL COLUMNS SUMMARY ===")
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    if len(numeric_cols) > 0:
-        print(df[numeric_cols].describe())
+    if numeric_summary is not None:
+        print(numeric_summary)
     
     print("\n=== CATEGORICAL COLUMNS SUMMARY ===")
-    categorical_cols = df.select_dtypes(include=['object']).columns
-    for col in categorical_cols:
+    for col, summary in categorical_summary.items():
         print(f"\n{col}:")
-        print(f"  Unique values: {df[col].nunique()}")
-        print(f"  Most common: {df[col].value_counts().head(3).to_dict()}")
+        if approx:
+            unique = f"~{summary['unique']:,} (±{_HLL_RELATIVE_ERROR * 100:.1f}%)"
+        else:
+            unique = f"{summary['unique']:,}"
+        print(f"  Unique values: {unique}{' (in sample)' if sampled else ''}")
+        if summary['id_like']:
+            print("  ID-like column (nearly all values unique), top values skipped")
+        else:
+            print(f"  Most common{' (approx.)' if approx else ''}: {summary['top']}")
+    
+    corr = None
+    if len(numeric_cols) > 1:
+        with _timed(timings, 'correlation'):
+            # Reuses the float matrix from the numeric profile
+            corr = correlation_matrix(values)
+            corr.index = corr.columns = numeric_cols
     
     # Create correlation heatmap for numerical columns
-    if len(numeric_cols) > 1 and MATPLOTLIB_AVAILABLE and SEABORN_AVAILABLE:
-        plt.figure(figsize=(12, 8))
-        correlation_matrix = df[numeric_cols].corr()
-        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0, 
-                   square=True, fmt='.2f')
-        plt.title('Correlation Heatmap')
-        plt.tight_layout()
-        save_plot('correlation_heatmap.png')
-    elif len(numeric_cols) > 1:
+    if corr is not None and MATPLOTLIB_AVAILABLE and SEABORN_AVAILABLE:
+        with _timed(timings, 'heatmap'):
+            plot_correlation_heatmap(corr, top_k=top_k, target=target_col)
+            plt.tight_layout()
+            save_plot('correlation_heatmap.png')
+    elif corr is not None:
         print("⚠️  Warning: matplotlib or seaborn not available. Skipping correlation heatmap.")
+    
+    total = sum(timings.values())
+    print("\n=== TIMING ===")
+    for step, seconds in timings.items():
+        share = seconds / total * 100 if total else 0.0
+        print(f"  {step:<20} {seconds * 1000:9.1f} ms  {share:5.1f}%")
+    print(f"  {'total':<20} {total * 1000:9.1f} ms")
+    
+    return {
+        'shape': df.shape,
+        'sample_rows': n if sampled else None,
+        'memory_bytes': memory,
+        'missing': missing_df,
+        'numeric': numeric_summary,
+        'categorical': categorical_summary,
+        'correlation': corr,
+        'timings': timings,
+    }
+
+# Trained-model cache: fitted estimators are stored per user under
+# ../uploads/models/<owner>/<key>.joblib, keyed by a fingerprint of the
+# training data, the estimator parameters and the library versions. Arrays
+# are stored uncompressed so joblib can memory-map them back.
+_MODELS_DIR = os.path.join(_UPLOADS_DIR, 'models')
+_MODEL_CACHE_BYTES = int(os.environ.get('CAPTODEBOT_MODEL_CACHE_MB', 256)) * 1024 * 1024
+# Parameters that change how a fit runs, not what it produces
+_RUNTIME_PARAMS = {'n_jobs', 'verbose', 'warm_start', 'copy_X'}
+
+def _fingerprint(hasher, data):
+    """Feed the content, shape and labels of a frame or array into a hash"""
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        if data.ndim == 2:
+            labels, dtypes = list(data.columns), [str(t) for t in data.dtypes]
+        else:
+            labels, dtypes = [data.name], [str(data.dtype)]
+        hasher.update(repr((type(data).__name__, data.shape, labels, dtypes)).encode())
+        hasher.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    else:
+        array = np.ascontiguousarray(data)
+        hasher.update(repr((array.shape, str(array.dtype))).encode())
+        if array.dtype == object:
+            hasher.update(pd.util.hash_array(array.ravel()).tobytes())
+        else:
+            hasher.update(array.tobytes())
+
+def model_cache_key(estimator, X, y=None):
+    """Cache key: hash of training data, estimator parameters and library versions"""
+    import hashlib
+    import sklearn
+    
+    hasher = hashlib.sha256()
+    params = {k: v for k, v in estimator.get_params(deep=True).items()
+              if k.split('__')[-1] not in _RUNTIME_PARAMS}
+    hasher.update(repr((type(estimator).__module__, type(estimator).__qualname__,
+                        sorted((k, repr(v)) for k, v in params.items()),
+                        sklearn.__version__, np.__version__)).encode())
+    _fingerprint(hasher, X)
+    if y is not None:
+        _fingerprint(hasher, y)
+    return hasher.hexdigest()
+
+def _evict_model_cache(model_dir, keep):
+    """Drop least recently used models until the owner is within budget"""
+    entries = []
+    for entry in os.scandir(model_dir):
+        if entry.is_file() and entry.name.endswith('.joblib'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= _MODEL_CACHE_BYTES:
+            break
+        if os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def _remove_orphaned_tmp(model_dir):
+    """Delete <key>.<pid>.tmp files left behind by processes that no longer exist"""
+    try:
+        entries = list(os.scandir(model_dir))
+    except OSError:
+        return
+    for entry in entries:
+        parts = entry.name.rsplit('.', 2)
+        if len(parts) != 3 or parts[2] != 'tmp' or not parts[1].isdigit():
+            continue
+        try:
+            os.kill(int(parts[1]), 0)
+            continue
+        except ProcessLookupError:
+            pass
+        except OSError:
+            continue
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def cached_fit(estimator, X, y=None, **fit_params):
+    """Fit an estimator, or load an identical fit from the per-user model cache
+    
+    The cache key covers X, y, the estimator parameters and the scikit-learn
+    and numpy versions. Estimators with random_state=None, at the top level or
+    inside a pipeline or meta-estimator, are always refitted.
+    """
+    return _cached_fit(estimator, X, y, **fit_params)[0]
+
+def _cached_fit(estimator, X, y=None, **fit_params):
+    """cached_fit that also returns whether the model came from the cache"""
+    # Nested estimators count too: a pipeline around an unseeded forest is random
+    unseeded = any(value is None for key, value in estimator.get_params(deep=True).items()
+                   if key == 'random_state' or key.endswith('__random_state'))
+    try:
+        import joblib
+    except ImportError:
+        joblib = None
+    if joblib is None or unseeded or fit_params:
+        return estimator.fit(X, y, **fit_params), False
+    
+    name = type(estimator).__name__
+    key = model_cache_key(estimator, X, y)
+    model_dir = os.path.join(_MODELS_DIR, _CURRENT_USER_ID or 'shared')
+    path = os.path.join(model_dir, f"{key}.joblib")
+    
+    start = time.perf_counter()
+    if os.path.exists(path):
+        try:
+            model = joblib.load(path, mmap_mode='r')
+            _touch(path)
+            _count_cache(True)
+            print(f"♻️  Loaded cached {name} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+            return model, True
+        except Exception as e:
+            print(f"⚠️  Warning: ignoring unreadable cached model: {str(e)}")
+    
+    _count_cache(False)
+    model = estimator.fit(X, y)
+    fit_time = time.perf_counter() - start
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(model_dir, exist_ok=True)
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+        _evict_model_cache(model_dir, keep=path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"⚠️  Warning: could not cache {name}: {str(e)}")
+    else:
+        print(f"💾 Fitted {name} in {fit_time:.2f}s and cached it")
+    return model, False
+
+# Categorical encoding: every non-numeric column is encoded at once through
+# pandas category codes (hash tables, no string copies); the fitted mapping
+# is kept on the encoder and can be saved under uploads/encoders/<user>, out
+# of reach of the model cache eviction
+_ENCODER_MAX_CATEGORIES = 1000
+_ENCODER_HASH_BUCKETS = 4096
+_ENCODERS_DIR = os.path.join(_UPLOADS_DIR, 'encoders')
+
+if SKLEARN_AVAILABLE:
+    from sklearn.base import BaseEstimator, TransformerMixin
+    _ENCODER_BASES = (TransformerMixin, BaseEstimator)
+else:
+    _ENCODER_BASES = (object,)
+
+class CategoricalEncoder(*_ENCODER_BASES):
+    """Frame-level ordinal encoder with a reusable fitted mapping
+    
+    Non-numeric columns (or `columns`) become int32 category codes in sorted
+    category order; other columns pass through. Values not seen during fit
+    become unknown_value (handle_unknown='value') or raise a ValueError
+    (handle_unknown='error'); missing values become missing_value. Columns
+    with more than max_categories distinct values are hashed into
+    hash_buckets codes instead, so no per-value mapping is kept for them.
+    """
+    
+    def __init__(self, columns=None, handle_unknown='value', unknown_value=-1, missing_value=-2,
+                 max_categories=_ENCODER_MAX_CATEGORIES, hash_buckets=_ENCODER_HASH_BUCKETS):
+        self.columns = columns
+        self.handle_unknown = handle_unknown
+        self.unknown_value = unknown_value
+        self.missing_value = missing_value
+        self.max_categories = max_categories
+        self.hash_buckets = hash_buckets
+    
+    def fit(self, X, y=None):
+        X = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X)
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+        columns = self.columns if self.columns is not None else [
+            col for col in X.columns if not pd.api.types.is_numeric_dtype(X[col])]
+        self.categories_ = {}
+        self.hashed_ = []
+        for col in columns:
+            categories = pd.Categorical(X[col]).categories
+            if self.max_categories is not None and len(categories) > self.max_categories:
+                self.hashed_.append(col)
+            else:
+                self.categories_[col] = categories
+        return self
+    
+    def transform(self, X):
+        X = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X, columns=self.feature_names_in_)
+        encoded = {}
+        for col, categories in self.categories_.items():
+            codes = pd.Categorical(X[col], categories=categories).codes.astype(np.int32)
+            missing = X[col].isna().to_numpy()
+            unknown = (codes == -1) & ~missing
+            if unknown.any():
+                if self.handle_unknown == 'error':
+                    examples = list(pd.unique(X[col][unknown])[:5])
+                    raise ValueError(f"Column {col!r} has {int(unknown.sum())} value(s) not seen during fit, "
+                                     f"e.g. {examples}")
+                codes[unknown] = self.unknown_value
+            codes[missing] = self.missing_value
+            encoded[col] = codes
+        for col in self.hashed_:
+            hashes = pd.util.hash_pandas_object(X[col], index=False).to_numpy()
+            codes = (hashes % np.uint64(self.hash_buckets)).astype(np.int32)
+            codes[X[col].isna().to_numpy()] = self.missing_value
+            encoded[col] = codes
+        X = X.copy(deep=False)
+        for col, codes in encoded.items():
+            X[col] = codes
+        return X
+    
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_in_, dtype=object)
+    
+    def mapping(self, col):
+        """Category -> code for an ordinal-encoded column"""
+        return {value: code for code, value in enumerate(self.categories_[col])}
+    
+    def save(self, name):
+        """Persist the fitted encoder for reuse in later runs; returns the file path"""
+        import joblib
+        encoder_dir = os.path.join(_ENCODERS_DIR, _CURRENT_USER_ID or 'shared')
+        os.makedirs(encoder_dir, exist_ok=True)
+        path = os.path.join(encoder_dir, f"{name}.joblib")
+        joblib.dump(self, path)
+        print(f"💾 Saved encoder '{name}' ({len(self.categories_)} mapped, {len(self.hashed_)} hashed column(s))")
+        return path
+    
+    @classmethod
+    def load(cls, name):
+        """Load an encoder saved with save(name)"""
+        import joblib
+        return joblib.load(os.path.join(_ENCODERS_DIR, _CURRENT_USER_ID or 'shared', f"{name}.joblib"))
+
+# Preprocessing pipelines: imputation, scaling and categorical encoding as
+# one ColumnTransformer whose fitted state is memoized on disk, so unchanged
+# data and steps go straight to modeling
+_PIPELINE_CACHE_BYTES = _MODEL_CACHE_BYTES // 4
+
+def build_pipeline(X, model=None, impute='mean', scale=False, encode='ordinal', cache=True):
+    """Preprocessing pipeline for the columns of X, optionally ending in a model
+    
+    Numeric columns are imputed (impute='mean'/'median'/None) and optionally
+    standardized; other columns are encoded with CategoricalEncoder
+    (encode='ordinal': category codes, unknown values -1, missing -2, hashed
+    codes above 1,000 categories) or as one-hot columns with a 'missing'
+    category for nulls (encode='onehot'). With a model the transformers are
+    memoized on disk (sklearn Pipeline memory), so fitting several models on
+    the same data fits the preprocessing once.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+    
+    numeric_cols = list(X.select_dtypes(include=[np.number]).columns)
+    categorical_cols = [col for col in X.columns if col not in numeric_cols]
+    
+    numeric_steps = []
+    if impute:
+        numeric_steps.append(('impute', SimpleImputer(strategy=impute)))
+    if scale:
+        numeric_steps.append(('scale', StandardScaler()))
+    if encode == 'onehot':
+        encoder = Pipeline([
+            ('fill', SimpleImputer(strategy='constant', fill_value='missing')),
+            ('encode', OneHotEncoder(handle_unknown='ignore', sparse_output=False)),
+        ])
+    else:
+        encoder = CategoricalEncoder(columns=categorical_cols)
+    
+    transformers = []
+    if numeric_cols:
+        transformers.append(('numeric', Pipeline(numeric_steps) if numeric_steps else 'passthrough', numeric_cols))
+    if categorical_cols:
+        transformers.append(('categorical', encoder, categorical_cols))
+    preprocessor = ColumnTransformer(transformers, verbose_feature_names_out=False)
+    preprocessor.set_output(transform='pandas')
+    
+    if model is None:
+        return preprocessor
+    
+    memory = None
+    if cache:
+        try:
+            import joblib
+            memory = joblib.Memory(os.path.join(_MODELS_DIR, _CURRENT_USER_ID or 'shared', 'pipelines'), verbose=0)
+            memory.reduce_size(bytes_limit=_PIPELINE_CACHE_BYTES)
+        except (ImportError, TypeError, OSError):
+            memory = None
+    return Pipeline([('preprocess', preprocessor), ('model', model)], memory=memory)
+
+def preprocess(X, impute='mean', scale=False, encode='ordinal'):
+    """Fit build_pipeline's preprocessing on X (or load the fit from the model cache)
+    
+    Returns (transformed DataFrame, fitted transformer). With ordinal encoding
+    the columns keep their original order; reuse the transformer on new data
+    with transformer.transform(...).
+    """
+    transformer = cached_fit(build_pipeline(X, impute=impute, scale=scale, encode=encode), X)
+    transformed = transformer.transform(X)
+    if encode != 'onehot':
+        transformed = transformed[list(X.columns)]
+    return transformed, transformer
+
+# CPU allotment for parallel helpers: CAPTODEBOT_CPUS (set by the server),
+# then the process affinity mask and cgroup quota, then the machine count
+def available_cpus():
+    """Number of CPUs this kernel may use"""
+    override = os.environ.get('CAPTODEBOT_CPUS')
+    if override:
+        try:
+            return max(1, int(override))
+        except ValueError:
+            pass
+    
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+def _resolve_n_jobs(n_jobs=None):
+    """Clamp an n_jobs request (None/-1 = all) to the CPU allotment"""
+    cpus = available_cpus()
+    if n_jobs is None or n_jobs < 0:
+        return cpus
+    return max(1, min(int(n_jobs), cpus))
+
+# Size-aware model selection for model_type='auto': from this many rows on,
+# histogram gradient boosting (features binned once, early stopping) replaces
+# RandomForest, whose fit cost grows much faster with the row count
+_HGB_MIN_ROWS = 10_000
+_CLASSIFICATION_MAX_CLASSES = 20
+
+def _infer_task(y):
+    """'classification' for labels (non-numeric, bool or few integer values), else 'regression'"""
+    y = pd.Series(np.asarray(y).ravel()) if not isinstance(y, pd.Series) else y
+    if not pd.api.types.is_numeric_dtype(y) or pd.api.types.is_bool_dtype(y):
+        return 'classification'
+    if pd.api.types.is_integer_dtype(y) or np.all(np.mod(y.dropna(), 1) == 0):
+        if y.nunique() <= _CLASSIFICATION_MAX_CLASSES:
+            return 'classification'
+    return 'regression'
+
+def _select_model(X, y, model_type, random_state, n_jobs):
+    """Resolve model_type to (task, unfitted estimator, strategy description)"""
+    task = _infer_task(y) if model_type == 'auto' else model_type
+    n_rows, n_features = X.shape[0], (X.shape[1] if len(X.shape) > 1 else 1)
+    
+    if model_type == 'auto' and n_rows >= _HGB_MIN_ROWS:
+        from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+        estimator = (HistGradientBoostingClassifier if task == 'classification' else HistGradientBoostingRegressor)(
+            max_iter=500, max_bins=255, early_stopping=True, validation_fraction=0.1,
+            n_iter_no_change=10, random_state=random_state)
+        strategy = 'histogram gradient boosting (255 bins, early stopping)'
+    else:
+        estimator = (RandomForestClassifier if task == 'classification' else RandomForestRegressor)(
+            n_estimators=100, random_state=random_state, n_jobs=n_jobs)
+        strategy = 'random forest (100 trees)'
+    
+    if model_type == 'auto':
+        print(f"🧭 Auto model selection: {task} on {n_rows:,} rows × {n_features} features "
+              f"→ {type(estimator).__name__}, {strategy}")
+    return task, estimator, strategy
+
+def _log_fit(model, fit_time):
+    details = f", {model.n_iter_} boosting iterations" if hasattr(model, 'n_iter_') else ''
+    print(f"⏱️  {type(model).__name__} fit in {fit_time:.2f}s{details}")
+
+# Permutation importance: one baseline prediction, features permuted in
+# parallel, evaluated on at most _PERMUTATION_MAX_SAMPLES rows by default
+_PERMUTATION_MAX_SAMPLES = 10_000
+
+def _permutation_scores(model, X, y, columns, n_repeats, metric, seed):
+    """Metric after permuting each of `columns` n_repeats times (one worker's share)"""
+    rng = np.random.RandomState(seed)
+    X = X.copy()
+    scores = {}
+    for col in columns:
+        original = X[col].to_numpy(copy=True)
+        scores[col] = []
+        for _ in range(n_repeats):
+            X[col] = original[rng.permutation(len(original))]
+            scores[col].append(metric(y, model.predict(X)))
+        X[col] = original
+    return scores
+
+def permutation_importances(model, X, y, n_repeats=5, max_samples=_PERMUTATION_MAX_SAMPLES,
+                            n_jobs=None, baseline_pred=None, random_state=42):
+    """Permutation importance for any fitted model, computed in parallel across features
+    
+    The baseline score comes from one prediction (pass baseline_pred to reuse
+    predictions already made on X). max_samples (rows or a fraction) bounds
+    the evaluation set. Returns a DataFrame of mean/std score drops per feature.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.base import is_classifier
+    from sklearn.metrics import r2_score
+    
+    start = time.perf_counter()
+    n_jobs = _resolve_n_jobs(n_jobs)
+    X = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X)
+    y = np.asarray(y)
+    
+    if max_samples is not None:
+        n = int(max_samples * len(X)) if isinstance(max_samples, float) else int(max_samples)
+        if n < len(X):
+            rows = np.sort(np.random.RandomState(random_state).choice(len(X), n, replace=False))
+            X, y = X.iloc[rows], y[rows]
+            baseline_pred = None if baseline_pred is None else np.asarray(baseline_pred)[rows]
+    
+    metric = accuracy_score if is_classifier(model) else r2_score
+    baseline = metric(y, model.predict(X) if baseline_pred is None else baseline_pred)
+    
+    columns = list(X.columns)
+    groups = [columns[i::n_jobs] for i in range(min(n_jobs, len(columns)))]
+    shares = Parallel(n_jobs=len(groups))(
+        delayed(_permutation_scores)(model, X, y, group, n_repeats, metric, random_state + i)
+        for i, group in enumerate(groups)
+    )
+    drops = {col: baseline - np.array(scores) for share in shares for col, scores in share.items()}
+    
+    result = pd.DataFrame({
+        'importance_mean': {col: drops[col].mean() for col in columns},
+        'importance_std': {col: drops[col].std() for col in columns},
+    }).sort_values('importance_mean', ascending=False)
+    result.index.name = 'feature'
+    print(f"🔀 Permutation importance: {len(columns)} features × {n_repeats} repeats on {len(X):,} rows, "
+          f"{n_jobs} worker(s), {time.perf_counter() - start:.2f}s (baseline {metric.__name__} {baseline:.4f})")
+    return result
+
+def _report_importance(model, task, X_test, y_test, y_pred, importance, n_jobs, random_state):
+    """Feature importance chart(s) for train_model"""
+    has_impurity = hasattr(model, 'feature_importances_')
+    if importance is None:
+        # Default: the impurity chart for classifiers that have one, nothing else
+        kinds = ['impurity'] if has_impurity and task == 'classification' else []
+    elif importance == 'auto':
+        kinds = ['impurity'] if has_impurity else ['permutation']
+    elif importance == 'both':
+        kinds = ['impurity', 'permutation'] if has_impurity else ['permutation']
+    elif importance in ('impurity', 'permutation'):
+        kinds = [importance] if importance != 'impurity' or has_impurity else []
+    else:
+        kinds = []
+    if not kinds:
+        return
+    if not MATPLOTLIB_AVAILABLE:
+        print("⚠️  Warning: matplotlib not available. Skipping feature importance plot.")
+        return
+    
+    columns = X_test.columns if hasattr(X_test, 'columns') else range(np.shape(X_test)[1])
+    if 'impurity' in kinds:
+        plt.figure(figsize=(10, 6))
+        feature_importance = pd.Series(model.feature_importances_, index=columns)
+        feature_importance.sort_values(ascending=True).plot(kind='barh')
+        plt.title('Feature Importance')
+        plt.xlabel('Importance')
+        plt.tight_layout()
+        save_plot('feature_importance.png')
+    if 'permutation' in kinds:
+        result = permutation_importances(model, X_test, y_test, n_jobs=n_jobs,
+                                         baseline_pred=y_pred, random_state=random_state)
+        result = result.iloc[::-1]
+        plt.figure(figsize=(10, 6))
+        plt.barh([str(c) for c in result.index], result['importance_mean'], xerr=result['importance_std'])
+        plt.title('Permutation Importance')
+        plt.xlabel('Drop in score when the feature is shuffled')
+        plt.tight_layout()
+        save_plot('permutation_importance.png')
 
 # Model training helper
-def train_model(X, y, model_type='classification', test_size=0.2, random_state=42):
-    """Train a simple ML model and return metrics"""
+def train_model(X, y, model_type='classification', test_size=0.2, random_state=42,
+                n_jobs=None, importance=None):
+    """Train a simple ML model and return metrics
+    
+    model_type is 'classification', 'regression' or 'auto'. 'auto' infers the
+    task from y and switches from RandomForest to histogram gradient boosting
+    with early stopping from 10,000 rows on; the choice and fit time are logged.
+    
+    importance selects the feature importance chart for the hold-out split.
+    By default only classifiers with impurity importances get a chart. Pass
+    'impurity' (tree models), 'permutation' (any model; one prediction per
+    feature and repeat), 'both', 'auto' for impurity when the model has it
+    and permutation otherwise, or False for no chart.
+    The random forest trains in a single process unless n_jobs is given
+    (capped at the CPUs allotted to this kernel). For k-fold evaluation use
+    cross_validate_model().
+    Returns (model, X_train, X_test, y_train, y_test).
+    """
     if not SKLEARN_AVAILABLE:
         print("❌ Error: scikit-learn is not available. Cannot train model.")
         return None, None, None, None, None
@@ -430,13 +1742,23 @@ def train_model(X, y, model_type='classification', test_size=0.2, random_state=4
         print("❌ Error: pandas or numpy not available. Cannot train model.")
         return None, None, None, None, None
     
+    if n_jobs is not None:
+        n_jobs = _resolve_n_jobs(n_jobs)
+    task, estimator, _ = _select_model(X, y, model_type, random_state, n_jobs)
+    
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=test_size, random_state=random_state
     )
     
-    if model_type == 'classification':
-        model = RandomForestClassifier(n_estimators=100, random_state=random_state)
-        model.fit(X_train, y_train)
+    from threadpoolctl import threadpool_limits
+    
+    start = time.perf_counter()
+    # Keeps histogram gradient boosting's OpenMP threads within the CPU allotment
+    with threadpool_limits(_resolve_n_jobs(n_jobs)):
+        model = cached_fit(estimator, X_train, y_train)
+    _log_fit(model, time.perf_counter() - start)
+    
+    if task == 'classification':
         y_pred = model.predict(X_test)
         
         accuracy = accuracy_score(y_test, y_pred)
@@ -444,21 +1766,7 @@ def train_model(X, y, model_type='classification', test_size=0.2, random_state=4
         print("\nClassification Report:")
         print(classification_report(y_test, y_pred))
         
-        # Feature importance plot
-        if hasattr(model, 'feature_importances_') and MATPLOTLIB_AVAILABLE:
-            plt.figure(figsize=(10, 6))
-            feature_importance = pd.Series(model.feature_importances_, index=X.columns)
-            feature_importance.sort_values(ascending=True).plot(kind='barh')
-            plt.title('Feature Importance')
-            plt.xlabel('Importance')
-            plt.tight_layout()
-            save_plot('feature_importance.png')
-        elif hasattr(model, 'feature_importances_'):
-            print("⚠️  Warning: matplotlib not available. Skipping feature importance plot.")
-        
     else:  # regression
-        model = RandomForestRegressor(n_estimators=100, random_state=random_state)
-        model.fit(X_train, y_train)
         y_pred = model.predict(X_test)
         
         mse = mean_squared_error(y_test, y_pred)
@@ -478,8 +1786,714 @@ def train_model(X, y, model_type='classification', test_size=0.2, random_state=4
         else:
             print("⚠️  Warning: matplotlib not available. Skipping actual vs predicted plot.")
     
+    _report_importance(model, task, X_test, y_test, y_pred, importance, n_jobs, random_state)
+    
     return model, X_train, X_test, y_train, y_test
 
+def cross_validate_model(X, y, model_type='classification', cv=5, random_state=42, n_jobs=None):
+    """Evaluate train_model's model with k-fold cross-validation, folds fitted in parallel
+    
+    model_type is chosen as in train_model. Folds are stratified for
+    classification. n_jobs caps the worker processes (default: every CPU
+    allotted to this kernel). Returns (model, cv_results), where model is
+    refitted on all rows and cv_results holds per-fold metrics and timings.
+    """
+    if not SKLEARN_AVAILABLE:
+        print("❌ Error: scikit-learn is not available. Cannot train model.")
+        return None, None
+    
+    if not PANDAS_AVAILABLE or not NUMPY_AVAILABLE:
+        print("❌ Error: pandas or numpy not available. Cannot train model.")
+        return None, None
+    
+    from sklearn.base import clone
+    from threadpoolctl import threadpool_limits
+    try:
+        from joblib import parallel_config
+    except ImportError:  # joblib < 1.3
+        from joblib import parallel_backend as parallel_config
+    
+    n_jobs = _resolve_n_jobs(n_jobs)
+    task, estimator, _ = _select_model(X, y, model_type, random_state, n_jobs)
+    folds = int(cv)
+    
+    if task == 'classification':
+        splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+        scoring = {'accuracy': 'accuracy', 'f1_macro': 'f1_macro'}
+    else:
+        splitter = KFold(n_splits=folds, shuffle=True, random_state=random_state)
+        scoring = {'rmse': 'neg_root_mean_squared_error', 'r2': 'r2'}
+    threaded = 'n_jobs' in estimator.get_params()
+    
+    # Folds run in parallel; CPUs left over when there are fewer folds than
+    # CPUs go to the trees inside each fold
+    fold_jobs = min(folds, n_jobs)
+    tree_jobs = max(1, n_jobs // fold_jobs)
+    print(f"🔁 {folds}-fold cross-validation on {fold_jobs} worker(s) × {tree_jobs} thread(s) "
+          f"({n_jobs} CPU(s) available)")
+    
+    start = time.perf_counter()
+    fold_estimator = clone(estimator).set_params(n_jobs=tree_jobs) if threaded else clone(estimator)
+    # Histogram gradient boosting has no n_jobs and sizes its OpenMP pool to
+    # the machine; cap it (and BLAS) per fold, in workers and in-process alike
+    with parallel_config('loky', inner_max_num_threads=tree_jobs), threadpool_limits(tree_jobs):
+        scores = cross_validate(fold_estimator, X, y, cv=splitter, scoring=scoring, n_jobs=fold_jobs)
+    cv_time = time.perf_counter() - start
+    
+    per_fold = pd.DataFrame({
+        name: -scores[f'test_{name}'] if scorer.startswith('neg_') else scores[f'test_{name}']
+        for name, scorer in scoring.items()
+    })
+    per_fold['fit_time'] = scores['fit_time']
+    per_fold['score_time'] = scores['score_time']
+    per_fold.index = pd.RangeIndex(1, folds + 1, name='fold')
+    
+    print("\nPer-fold metrics:")
+    print(per_fold.round(4))
+    for name in scoring:
+        print(f"Mean {name}: {per_fold[name].mean():.4f} ± {per_fold[name].std():.4f}")
+    
+    start = time.perf_counter()
+    with threadpool_limits(n_jobs):
+        model = cached_fit(estimator, X, y)
+    refit_time = time.perf_counter() - start
+    _log_fit(model, refit_time)
+    
+    sequential = per_fold['fit_time'].sum() + per_fold['score_time'].sum()
+    print(f"\n⏱️  Cross-validation: {cv_time:.2f}s wall ({sequential:.2f}s of fold work, "
+          f"{sequential / cv_time if cv_time else 1:.1f}x parallel speedup); refit on all rows: {refit_time:.2f}s")
+    
+    cv_results = {
+        'folds': per_fold,
+        'mean': per_fold[list(scoring)].mean().to_dict(),
+        'std': per_fold[list(scoring)].std().to_dict(),
+        'cv_time': cv_time,
+        'refit_time': refit_time,
+        'total_time': cv_time + refit_time,
+        'n_jobs': n_jobs,
+    }
+    return model, cv_results
+
+# Budgeted hyperparameter search
+def _fit_and_score(key, estimator, params, X, y, train, test, scorer):
+    """Fit one candidate on one fold; returns (key, score, fit seconds, training rows)"""
+    from sklearn.base import clone
+    
+    model = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    model.fit(X.iloc[train] if hasattr(X, 'iloc') else X[train],
+              y.iloc[train] if hasattr(y, 'iloc') else y[train])
+    fit_time = time.perf_counter() - start
+    score = scorer(model, X.iloc[test] if hasattr(X, 'iloc') else X[test],
+                   y.iloc[test] if hasattr(y, 'iloc') else y[test])
+    return key, score, fit_time, len(train)
+
+def tune_model(X, y, space, model_type='classification', estimator=None, time_budget=60,
+               n_candidates=None, cv=3, factor=3, min_rows=None, n_jobs=None, random_state=42):
+    """Search hyperparameters with successive halving under a time budget
+    
+    space maps parameter names to lists of values or scipy.stats
+    distributions. Every round evaluates the surviving candidates with
+    cv-fold cross-validation on a growing row subsample (candidates and folds
+    run in parallel) and keeps the best 1/factor of them. A round is only
+    started when its projected cost fits in the remaining time_budget
+    (seconds), keeping back the projected time of the final refit on all
+    rows (at most a quarter of the budget). The given estimator is cloned, never modified. Returns
+    (best_model, leaderboard, spent), where best_model is refitted on all
+    rows and spent reports wall time, fit CPU time and fits.
+    """
+    if not SKLEARN_AVAILABLE:
+        print("❌ Error: scikit-learn is not available. Cannot tune model.")
+        return None, None, None
+    
+    from joblib import Parallel, delayed
+    from sklearn.base import clone
+    from sklearn.metrics import get_scorer
+    from sklearn.model_selection import ParameterGrid, ParameterSampler
+    
+    start = time.perf_counter()
+    n_jobs = _resolve_n_jobs(n_jobs)
+    if estimator is None:
+        estimator = (RandomForestClassifier if model_type == 'classification' else RandomForestRegressor)(
+            n_estimators=100, random_state=random_state)
+    else:
+        estimator = clone(estimator)
+    if 'n_jobs' in estimator.get_params():
+        # Parallelism comes from evaluating candidates side by side
+        estimator = estimator.set_params(n_jobs=1)
+    unknown = set(space) - set(estimator.get_params())
+    if unknown:
+        print(f"❌ Error: {type(estimator).__name__} has no parameter(s) {sorted(unknown)}")
+        return None, None, None
+    
+    # Candidates: the full grid when it is small enough, random draws otherwise
+    if n_candidates is None:
+        n_candidates = factor ** 4
+    if all(isinstance(values, (list, tuple)) for values in space.values()) and len(ParameterGrid(space)) <= n_candidates:
+        candidates = list(ParameterGrid(space))
+    else:
+        sampled = ParameterSampler(space, n_iter=n_candidates, random_state=random_state)
+        # Narrow distributions repeat draws; each distinct candidate is evaluated once
+        candidates = list({repr(sorted(c.items())): c for c in sampled}.values())
+    
+    metric = 'accuracy' if model_type == 'classification' else 'neg_root_mean_squared_error'
+    scorer = get_scorer(metric)
+    splitter = (StratifiedKFold if model_type == 'classification' else KFold)(
+        n_splits=cv, shuffle=True, random_state=random_state)
+    
+    # Rows per round grow by `factor` while candidates shrink by `factor`
+    n_rows = len(X)
+    rounds = max(1, int(np.ceil(np.log(len(candidates)) / np.log(factor))) + 1)
+    if min_rows is None:
+        min_rows = max(cv * 20, n_rows // factor ** (rounds - 1))
+    order = np.random.RandomState(random_state).permutation(n_rows)
+    
+    print(f"🎛️  Tuning {type(estimator).__name__}: {len(candidates)} candidates, up to {rounds} rounds, "
+          f"{cv}-fold CV, budget {time_budget}s on {n_jobs} CPU(s)")
+    
+    alive = list(range(len(candidates)))
+    results = {i: {'round': 0, 'rows': 0, 'score': np.nan, 'std': np.nan} for i in alive}
+    fit_seconds = 0.0
+    fits = 0
+    rows_fitted = 0
+    last_round_time = None
+    last_rows = None
+    stopped_early = False
+    
+    def refit_reserve():
+        # Projected final refit: fit seconds per training row seen so far, scaled to
+        # all rows. Small subsamples are dominated by fixed per-fit overhead, so the
+        # projection is capped at a quarter of the budget.
+        if not rows_fitted:
+            return 0.0
+        return min(fit_seconds / rows_fitted * n_rows, time_budget / 4)
+    
+    for round_no in range(1, rounds + 1):
+        rows = n_rows if round_no == rounds else min(n_rows, int(min_rows * factor ** (round_no - 1)))
+        remaining = time_budget - (time.perf_counter() - start) - refit_reserve()
+        if last_round_time is not None:
+            # Cost ~ candidates × rows
+            projected = last_round_time * (rows / last_rows) * (len(alive) / last_alive)
+            if projected > remaining:
+                stopped_early = True
+                print(f"⏱️  Stopping before round {round_no}: needs ~{projected:.1f}s, {max(remaining, 0):.1f}s left "
+                      f"after ~{refit_reserve():.1f}s kept for the final refit")
+                break
+        
+        round_start = time.perf_counter()
+        subset = np.sort(order[:rows])
+        X_round = X.iloc[subset] if hasattr(X, 'iloc') else X[subset]
+        y_round = y.iloc[subset] if hasattr(y, 'iloc') else y[subset]
+        folds = list(splitter.split(X_round, y_round))
+        jobs = [(i, fold) for i in alive for fold in folds]
+        scores = Parallel(n_jobs=min(n_jobs, len(jobs)), return_as='generator_unordered')(
+            delayed(_fit_and_score)(i, estimator, candidates[i], X_round, y_round, train, test, scorer)
+            for i, (train, test) in jobs
+        )
+        
+        by_candidate = {}
+        for i, score, fit_time, n_train in scores:
+            by_candidate.setdefault(i, []).append(score)
+            fit_seconds += fit_time
+            rows_fitted += n_train
+            fits += 1
+            if time.perf_counter() - start + refit_reserve() > time_budget:
+                # Out of time mid-round (the refit's share included): pending
+                # fits are cancelled and candidates are ranked on the folds that finished
+                stopped_early = True
+                break
+        del scores
+        for i, candidate_scores in by_candidate.items():
+            results[i] = {'round': round_no, 'rows': rows,
+                          'score': float(np.mean(candidate_scores)), 'std': float(np.std(candidate_scores))}
+        
+        last_round_time = time.perf_counter() - round_start
+        last_rows, last_alive = rows, len(alive)
+        print(f"  Round {round_no}: {len(by_candidate)} candidate(s) on {rows:,} rows in {last_round_time:.1f}s, "
+              f"best {metric} {max(results[i]['score'] for i in by_candidate):.4f}")
+        
+        if stopped_early:
+            print(f"⏱️  Time budget reached during round {round_no}")
+            break
+        if round_no == rounds or len(alive) == 1:
+            break
+        keep = max(1, len(alive) // factor)
+        alive = sorted(alive, key=lambda i: results[i]['score'], reverse=True)[:keep]
+    
+    leaderboard = pd.DataFrame([
+        {**{f'param_{k}': v for k, v in candidates[i].items()}, **results[i]} for i in results
+    ]).sort_values(['round', 'score'], ascending=[False, False]).reset_index(drop=True)
+    leaderboard.index.name = 'rank'
+    leaderboard = leaderboard.rename(columns={'score': metric})
+    scored = [i for i in results if results[i]['round'] > 0]
+    best_params = candidates[max(scored, key=lambda i: (results[i]['round'], results[i]['score']))]
+    
+    refit_start = time.perf_counter()
+    if 'n_jobs' in estimator.get_params():
+        best = clone(estimator).set_params(**best_params, n_jobs=n_jobs)
+    else:
+        best = clone(estimator).set_params(**best_params)
+    best_model = cached_fit(best, X, y)
+    refit_time = time.perf_counter() - refit_start
+    
+    # A full grid search fits every candidate on (cv-1)/cv of all rows per fold
+    full_grid_rows = len(candidates) * cv * n_rows * (cv - 1) / cv
+    spent = {
+        'wall_time': time.perf_counter() - start,
+        'fit_cpu_time': fit_seconds,
+        'refit_time': refit_time,
+        'fits': fits,
+        'rows_fitted': rows_fitted,
+        'full_grid_fraction': rows_fitted / full_grid_rows,
+        'candidates': len(candidates),
+        'rounds': int(leaderboard['round'].max()),
+        'stopped_early': stopped_early,
+    }
+    
+    print("\n🏆 Leaderboard (top 10):")
+    print(leaderboard.head(10))
+    print(f"\nBest parameters: {best_params}")
+    print(f"⏱️  Spent {spent['wall_time']:.1f}s wall, {fit_seconds:.1f}s of fitting across {fits} fits "
+          f"({spent['full_grid_fraction']:.0%} of the rows a full {cv}-fold search would fit)")
+    return best_model, leaderboard, spent
+
+# Model comparison: candidates are fitted side by side in worker processes,
+# each under its own time budget, and scored on the same hold-out split
+def _fit_candidate(estimator, X_train, y_train, X_test):
+    """Fit and predict one candidate in a worker; returns the model, predictions and costs"""
+    import contextlib
+    import tracemalloc
+    
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model, cached = _cached_fit(estimator, X_train, y_train)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    pred = model.predict(X_test)
+    predict_time = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'model': model,
+        'pred': pred,
+        'fit_time': fit_time,
+        'predict_time': predict_time,
+        'peak_memory_mb': peak / 1024 / 1024,
+        'cached': cached,
+    }
+
+def _candidate_metrics(estimator, y_true, pred):
+    from sklearn.base import is_classifier
+    from sklearn.metrics import f1_score, mean_absolute_error, r2_score
+    
+    if is_classifier(estimator):
+        return {'accuracy': accuracy_score(y_true, pred),
+                'f1': f1_score(y_true, pred, average='weighted', zero_division=0)}
+    mse = mean_squared_error(y_true, pred)
+    return {'r2': r2_score(y_true, pred), 'mse': mse, 'rmse': float(np.sqrt(mse)),
+            'mae': mean_absolute_error(y_true, pred)}
+
+def compare_models(models, X_train, y_train, X_test, y_test, time_budget=120, n_jobs=None):
+    """Fit several estimators concurrently and score them on one hold-out split
+    
+    models is a dict of name -> estimator (or a list of estimators, named by
+    class). Candidates run in parallel worker processes, at most n_jobs at a
+    time; a candidate still fitting after time_budget seconds is stopped and
+    reported as 'timeout'. Fits go through the model cache, so an unchanged
+    candidate is loaded instead of refitted (cached=True in the table).
+    Returns (results, fitted, predictions): results is a DataFrame indexed by
+    name with the metrics (r2/mse/rmse/mae or accuracy/f1), fit_time,
+    predict_time, peak_memory_mb (Python-tracked allocations during fit and
+    predict) and model_size_mb, best first; fitted and predictions map names
+    to fitted models and test-set predictions for the candidates that finished.
+    """
+    if not SKLEARN_AVAILABLE:
+        print("❌ Error: scikit-learn is not available. Cannot compare models.")
+        return None, {}, {}
+    
+    import pickle
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from sklearn.base import clone
+    
+    if not isinstance(models, dict):
+        names = [type(estimator).__name__ for estimator in models]
+        models = {(f"{name} #{i + 1}" if names.count(name) > 1 else name): estimator
+                  for i, (name, estimator) in enumerate(zip(names, models))}
+    n_workers = min(_resolve_n_jobs(n_jobs), len(models))
+    candidates = {}
+    for name, estimator in models.items():
+        estimator = clone(estimator)
+        if n_workers > 1 and 'n_jobs' in estimator.get_params():
+            # Parallelism comes from fitting candidates side by side
+            estimator.set_params(n_jobs=1)
+        candidates[name] = estimator
+    
+    try:
+        from joblib.externals.loky import ProcessPoolExecutor
+    except ImportError:
+        ProcessPoolExecutor = None
+        print("⚠️  Warning: joblib not available. Fitting candidates one by one without time budgets.")
+    
+    start = time.perf_counter()
+    print(f"🏁 Comparing {len(candidates)} model(s) on {len(X_train):,} training rows: "
+          f"{n_workers} worker(s), {time_budget}s budget per model")
+    
+    outcomes = {}
+    
+    def record(name, result=None, status='ok'):
+        outcomes[name] = (result, status)
+        if result is None:
+            print(f"⚠️  {name}: {status}")
+            return
+        metrics = _candidate_metrics(candidates[name], y_test, result['pred'])
+        result['metrics'] = metrics
+        if ProcessPoolExecutor is not None:
+            # Worker-side cache lookups are not counted in this process
+            _count_cache(result['cached'])
+        headline = ', '.join(f"{k} {v:.4g}" for k, v in list(metrics.items())[:2])
+        print(f"✅ {name}: {headline}, fit {result['fit_time']:.2f}s"
+              f"{' (cached)' if result['cached'] else ''}, predict {result['predict_time']:.3f}s")
+    
+    queue = list(candidates)
+    if ProcessPoolExecutor is None:
+        for name in queue:
+            try:
+                record(name, _fit_candidate(candidates[name], X_train, y_train, X_test))
+            except Exception as e:
+                record(name, status=f"error: {e}")
+        queue = []
+    
+    executor = None
+    running = {}
+    while queue or running:
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=n_workers)
+            # Worker start-up and imports are not charged to any candidate's budget
+            warmup = next(iter(candidates.values()))
+            wait([executor.submit(clone, warmup) for _ in range(n_workers)])
+        # Only as many candidates as workers are submitted, so a candidate's
+        # clock starts when a worker actually picks it up
+        while queue and len(running) < n_workers:
+            name = queue.pop(0)
+            future = executor.submit(_fit_candidate, candidates[name], X_train, y_train, X_test)
+            running[future] = (name, time.perf_counter())
+        
+        next_deadline = min(started + time_budget for _, started in running.values())
+        done, _ = wait(running, timeout=max(0.0, next_deadline - time.perf_counter()),
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            name, _ = running.pop(future)
+            try:
+                record(name, future.result())
+            except Exception as e:
+                record(name, status=f"error: {e}")
+        
+        now = time.perf_counter()
+        expired = [future for future, (_, started) in running.items() if now - started >= time_budget]
+        if expired:
+            # A fit can only be interrupted by stopping its process: the pool is
+            # torn down and candidates that were still within budget start over
+            for future, (name, _) in list(running.items()):
+                if future in expired:
+                    record(name, status='timeout')
+                else:
+                    queue.insert(0, name)
+            running = {}
+            executor.shutdown(wait=True, kill_workers=True)
+            executor = None
+            # Killed workers never get to rename or remove their partial cache files
+            _remove_orphaned_tmp(os.path.join(_MODELS_DIR, _CURRENT_USER_ID or 'shared'))
+    if executor is not None:
+        executor.shutdown(wait=True)
+    
+    rows = []
+    fitted, predictions = {}, {}
+    for name in candidates:
+        result, status = outcomes[name]
+        row = {'model': name, 'estimator': type(candidates[name]).__name__, 'status': status}
+        if result is not None:
+            fitted[name], predictions[name] = result['model'], result['pred']
+            row.update(result['metrics'])
+            row.update({k: result[k] for k in ('fit_time', 'predict_time', 'peak_memory_mb', 'cached')})
+            row['model_size_mb'] = len(pickle.dumps(result['model'])) / 1024 / 1024
+        rows.append(row)
+    results = pd.DataFrame(rows).set_index('model')
+    
+    primary = 'r2' if 'r2' in results else ('accuracy' if 'accuracy' in results else None)
+    if primary:
+        results = results.sort_values(primary, ascending=False, na_position='last')
+    print(f"\n📋 Model comparison ({time.perf_counter() - start:.1f}s):")
+    print(results.drop(columns=['estimator']).round(4).to_string())
+    return results, fitted, predictions
+
+# Classifier evaluation: the confusion matrices of all models come from one
+# bincount and every threshold metric is derived from them; ROC and PR curves
+# come from one argsort of the score matrix, downsampled for plotting
+_CURVE_PLOT_POINTS = 200
+
+def _downsample_curve(x, y, max_points=_CURVE_PLOT_POINTS):
+    """Keep about max_points points spread evenly along the curve's length, endpoints included"""
+    if len(x) <= max_points:
+        return x, y
+    length = np.concatenate([[0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))])
+    keep = np.searchsorted(length, np.linspace(0, length[-1], max_points))
+    keep = np.unique(np.concatenate([[0], np.minimum(keep, len(x) - 1), [len(x) - 1]]))
+    return x[keep], y[keep]
+
+def _positive_scores(model, X, classes):
+    """Score for the positive class (classes[1]) from predict_proba or decision_function"""
+    if hasattr(model, 'predict_proba'):
+        proba = model.predict_proba(X)
+        return proba[:, list(model.classes_).index(classes[1])]
+    if hasattr(model, 'decision_function'):
+        scores = np.asarray(model.decision_function(X), dtype=float)
+        return scores if model.classes_[-1] == classes[1] else -scores
+    return None
+
+def evaluate_classifiers(models, X_test, y_test, labels=None, max_curve_points=_CURVE_PLOT_POINTS,
+                         plot=True, title='Classifier Evaluation'):
+    """Evaluate fitted classifiers side by side on one test set
+    
+    models is a dict of name -> fitted classifier (or a single classifier).
+    Accuracy, precision, recall, F1 (positive class for binary problems,
+    macro average otherwise), specificity, balanced accuracy and MCC all come
+    from one confusion matrix per model; binary problems also get ROC-AUC and
+    average precision from a single score sort. labels names the classes in
+    the per-class reports. With plot=True ROC and precision-recall curves of
+    all models are drawn on shared axes, at most max_curve_points per curve.
+    Returns (summary, details): summary is a DataFrame indexed by model name;
+    details[name] holds 'confusion_matrix', 'report' (per-class DataFrame),
+    'roc' (fpr, tpr) and 'pr' (recall, precision), curves already downsampled.
+    """
+    if not isinstance(models, dict):
+        models = {type(models).__name__: models}
+    names = list(models)
+    y_true = np.asarray(y_test)
+    n, m = len(y_true), len(names)
+    
+    preds = np.vstack([np.asarray(models[name].predict(X_test)) for name in names])
+    classes = np.unique(np.concatenate([y_true, preds.ravel()]))
+    k = len(classes)
+    true_idx = np.searchsorted(classes, y_true)
+    pred_idx = np.searchsorted(classes, preds)
+    
+    # One bincount fills the (model, true, predicted) cube
+    flat = (np.arange(m)[:, None] * k + true_idx[None, :]) * k + pred_idx
+    cms = np.bincount(flat.ravel(), minlength=m * k * k).reshape(m, k, k)
+    
+    tp = np.diagonal(cms, axis1=1, axis2=2).astype(float)
+    support = cms.sum(axis=2).astype(float)
+    predicted = cms.sum(axis=1).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        covariance = tp.sum(axis=1) * n - (predicted * support).sum(axis=1)
+        mcc = covariance / np.sqrt((n ** 2 - (predicted ** 2).sum(axis=1)) * (n ** 2 - (support ** 2).sum(axis=1)))
+    binary = k == 2
+    present = support[0] > 0
+    summary = pd.DataFrame({
+        'accuracy': tp.sum(axis=1) / n,
+        'precision': precision[:, 1] if binary else precision[:, present].mean(axis=1),
+        'recall': recall[:, 1] if binary else recall[:, present].mean(axis=1),
+        'f1': f1[:, 1] if binary else f1[:, present].mean(axis=1),
+        'balanced_accuracy': recall[:, present].mean(axis=1),
+        'mcc': np.nan_to_num(mcc),
+    }, index=pd.Index(names, name='model'))
+    if binary:
+        summary.insert(4, 'specificity', recall[:, 0])
+    
+    label_names = list(labels) if labels is not None and len(labels) == k else [str(c) for c in classes]
+    details = {name: {
+        'confusion_matrix': pd.DataFrame(cms[i], index=label_names, columns=label_names),
+        'report': pd.DataFrame({'precision': precision[i], 'recall': recall[i], 'f1': f1[i],
+                                'support': support[i].astype(int)}, index=label_names),
+        'roc': None, 'pr': None,
+    } for i, name in enumerate(names)}
+    
+    if binary:
+        scored = [(name, _positive_scores(models[name], X_test, classes)) for name in names]
+        scored = [(name, scores) for name, scores in scored if scores is not None]
+        if scored:
+            scores = np.vstack([scores for _, scores in scored])
+            order = np.argsort(-scores, axis=1, kind='stable')
+            sorted_scores = np.take_along_axis(scores, order, axis=1)
+            positives = true_idx == 1
+            tps = np.cumsum(positives[order], axis=1)
+            fps = np.arange(1, n + 1) - tps
+            n_pos = positives.sum()
+            n_neg = n - n_pos
+            # Only the last row of each run of tied scores is an operating point
+            distinct = np.ones_like(sorted_scores, dtype=bool)
+            distinct[:, :-1] = sorted_scores[:, 1:] != sorted_scores[:, :-1]
+            auc, ap = {}, {}
+            for i, (name, _) in enumerate(scored):
+                tp_i, fp_i = tps[i, distinct[i]], fps[i, distinct[i]]
+                if n_pos == 0 or n_neg == 0:
+                    auc[name] = ap[name] = np.nan
+                    continue
+                tpr = np.concatenate([[0.0], tp_i / n_pos])
+                fpr = np.concatenate([[0.0], fp_i / n_neg])
+                curve_precision = tp_i / (tp_i + fp_i)
+                curve_recall = tp_i / n_pos
+                auc[name] = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+                ap[name] = float(np.sum(np.diff(np.concatenate([[0.0], curve_recall])) * curve_precision))
+                details[name]['roc'] = _downsample_curve(fpr, tpr, max_curve_points)
+                details[name]['pr'] = _downsample_curve(curve_recall, curve_precision, max_curve_points)
+            summary['roc_auc'] = pd.Series(auc)
+            summary['average_precision'] = pd.Series(ap)
+    
+    print(f"\n📊 {title}: {m} model(s) on {n:,} test rows, {k} classes")
+    print(summary.round(4).to_string())
+    for name in names:
+        print(f"\n📋 {name} - confusion matrix (rows: actual, columns: predicted):")
+        print(details[name]['confusion_matrix'].to_string())
+        print(details[name]['report'].round(4).to_string())
+    
+    curves = [name for name in names if details[name]['roc'] is not None]
+    if plot and curves and MATPLOTLIB_AVAILABLE:
+        fig, (ax_roc, ax_pr) = plt.subplots(1, 2, figsize=(16, 7))
+        for name in curves:
+            fpr, tpr = details[name]['roc']
+            ax_roc.plot(fpr, tpr, lw=2, label=f"{name} (AUC = {summary.loc[name, 'roc_auc']:.3f})")
+            rec, prec = details[name]['pr']
+            ax_pr.plot(rec, prec, lw=2, label=f"{name} (AP = {summary.loc[name, 'average_precision']:.3f})")
+        ax_roc.plot([0, 1], [0, 1], color='red', lw=2, linestyle='--', label='Random Classifier')
+        ax_roc.set_xlabel('False Positive Rate', fontsize=12)
+        ax_roc.set_ylabel('True Positive Rate', fontsize=12)
+        ax_roc.set_title('ROC Curve', fontsize=14, fontweight='bold')
+        ax_roc.legend(loc='lower right', fontsize=10)
+        ax_pr.axhline(n_pos / n, color='red', lw=2, linestyle='--', label='Random Classifier')
+        ax_pr.set_xlabel('Recall', fontsize=12)
+        ax_pr.set_ylabel('Precision', fontsize=12)
+        ax_pr.set_title('Precision-Recall Curve', fontsize=14, fontweight='bold')
+        ax_pr.legend(loc='lower left', fontsize=10)
+        for ax in (ax_roc, ax_pr):
+            ax.grid(True, alpha=0.3)
+        fig.suptitle(title, fontsize=16, fontweight='bold')
+        plt.tight_layout()
+    return summary, details
+
+# Batched inference
+def _prediction_batches(source, batch_size):
+    """Yield DataFrame batches from a DataFrame, a CSV path/dataset name or a chunk iterator"""
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), batch_size):
+            yield source.iloc[start:start + batch_size]
+    elif isinstance(source, (str, os.PathLike)):
+        path = source if os.path.exists(source) else _resolve_dataset(os.path.basename(str(source)))
+        if path is None:
+            raise FileNotFoundError(f"Dataset '{source}' not found")
+        yield from _read_csv_file(path, chunksize=batch_size)
+    else:
+        yield from source
+
+def _write_predictions(writer, path, frame, parquet):
+    """Append one batch of predictions to a CSV or Parquet file; returns the writer state"""
+    if parquet:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        writer = writer or pq.ParquetWriter(path, table.schema)
+        writer.write_table(table)
+        return writer
+    frame.to_csv(path, mode='a' if writer else 'w', header=not writer, index=False)
+    return True
+
+def predict_in_batches(model, source, batch_size=50_000, n_jobs=None, output=None,
+                       method='predict', columns=None):
+    """Score a large frame or CSV in batches with bounded memory
+    
+    source is a DataFrame, a CSV path or dataset name (read in chunks), or any
+    iterator of DataFrames such as pd.read_csv(..., chunksize=...). Batches
+    are predicted on a thread pool (n_jobs threads, capped by the CPU
+    allotment) with at most two batches per thread in flight, and results are
+    written in input order. With output=None the predictions are returned as
+    an array; with a .csv or .parquet path they are streamed to that file and
+    the path is returned. columns selects the feature columns (default: the
+    model's feature_names_in_, if known).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from collections import deque
+    
+    n_jobs = _resolve_n_jobs(n_jobs)
+    predict = getattr(model, method)
+    if columns is None and hasattr(model, 'feature_names_in_'):
+        columns = list(model.feature_names_in_)
+    output = str(output) if output is not None else None
+    if output is not None and not output.endswith(('.csv', '.parquet')):
+        print("❌ Error: output must be a .csv or .parquet path (or None for an array)")
+        return None
+    parquet = output is not None and output.endswith('.parquet')
+    if parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("❌ Error: Parquet output needs pyarrow. Install with: pip install pyarrow")
+            return None
+    
+    def score(batch):
+        features = batch[columns] if columns is not None else batch
+        return np.asarray(predict(features))
+    
+    results = []
+    writer = None
+    rows = 0
+    batches = 0
+    tmp_path = f"{output}.{os.getpid()}.tmp" if output else None
+    start = time.perf_counter()
+    
+    def collect(predictions):
+        nonlocal writer, rows, batches
+        rows += len(predictions)
+        batches += 1
+        if output is None:
+            results.append(predictions)
+        else:
+            frame = pd.DataFrame(predictions.reshape(len(predictions), -1))
+            frame.columns = ['prediction'] if frame.shape[1] == 1 else [
+                f'{method}_{label}' for label in getattr(model, 'classes_', range(frame.shape[1]))]
+            writer = _write_predictions(writer, tmp_path, frame, parquet)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            # Bounded window: reading ahead stops once 2 × n_jobs batches are pending
+            pending = deque()
+            for batch in _prediction_batches(source, batch_size):
+                pending.append(pool.submit(score, batch))
+                if len(pending) >= 2 * n_jobs:
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+        if output is not None:
+            if writer not in (None, True):
+                writer.close()
+            if writer is None and parquet:
+                # No rows: an empty table that still carries the prediction schema
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                pq.write_table(pa.table({'prediction': pa.array([], type=pa.float64())}), tmp_path)
+            elif writer is None:
+                pd.DataFrame(columns=['prediction']).to_csv(tmp_path, index=False)
+            os.replace(tmp_path, output)
+    except Exception as e:
+        if tmp_path:
+            if writer not in (None, True):
+                writer.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        print(f"❌ Error during batched prediction: {str(e)}")
+        return None
+    
+    elapsed = time.perf_counter() - start
+    print(f"✅ Predicted {rows:,} rows in {batches} batch(es) of up to {batch_size:,} on {n_jobs} thread(s) "
+          f"in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+    if output is not None:
+        print(f"💾 Predictions written to {output}")
+        return output
+    return np.concatenate(results) if results else np.empty(0)
+
 # Sample dataset generators
 def generate_sample_data(data_type='classification', n_samples=1000, n_features=10):
     """Generate sample ML datasets"""
@@ -539,9 +2553,10 @@ def load_dataset(filename):
         print("❌ Error: pandas is not available. Cannot load dataset.")
         return None
     
-    file_path = os.path.join('..', 'uploads', filename)
+    file_path = _resolve_dataset(filename) or os.path.join(_UPLOADS_DIR, filename)
     try:
-        df = pd.read_csv(file_path)
+        df = _read_dataset(file_path)
+        _note_dataset(filename)
         print(f"✅ Successfully loaded {filename}")
         return df
     except FileNotFoundError:
@@ -554,28 +2569,342 @@ def load_dataset(filename):
 
 # Helper function to list available datasets
 def list_datasets():
-    """List all available CSV files in the uploads directory"""
-    uploads_dir = os.path.join('..', 'uploads')
+    """List uploaded datasets from the catalog (no dataset files are opened)"""
+    if _CURRENT_USER_ID is not None:
+        rows = _catalog_query(
+            'SELECT name, row_count, column_count, size_bytes, created_at FROM datasets '
+            'WHERE user_id = ? ORDER BY created_at DESC',
+            (_CURRENT_USER_ID,)
+        )
+    else:
+        rows = _catalog_query(
+            'SELECT name, row_count, column_count, size_bytes, created_at FROM datasets '
+            'ORDER BY created_at DESC'
+        )
+    
+    if rows is None:
+        print("📁 Dataset catalog not available")
+    elif rows:
+        print("📁 Available datasets:")
+        for name, row_count, column_count, size_bytes, created_at in rows:
+            size_mb = (size_bytes or 0) / 1024**2
+            print(f"   - {name} ({row_count} rows, {column_count} columns, {size_mb:.2f} MB, uploaded {created_at})")
+    else:
+        print("📁 No datasets uploaded yet")
+
+# Server-side export of DataFrames straight into the uploads store
+_EXPORTS_DIR = os.path.join(_UPLOADS_DIR, 'exports')
+_EXPORT_FORMATS = {'parquet': 'parquet', 'csv.gz': 'csv.gz', 'csv': 'csv.gz', 'gzip': 'csv.gz'}
+
+def export_df(df, name, format='parquet', index=False):
+    """Write a DataFrame to the uploads store as Parquet or gzip-CSV and print its download URL
+    
+    The data is written from the kernel directly (no JSON round-trip through the
+    browser). The download endpoint supports HTTP range requests.
+    """
+    if not PANDAS_AVAILABLE:
+        print("❌ Error: pandas is not available. Cannot export DataFrame.")
+        return None
+    
+    fmt = _EXPORT_FORMATS.get(str(format).lower())
+    if fmt is None:
+        print(f"❌ Error: unsupported export format '{format}'. Use 'parquet' or 'csv.gz'.")
+        return None
+    
+    safe_name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(name)).strip('._') or 'export'
+    for suffix in ('.parquet', '.csv.gz', '.csv', '.gz'):
+        if safe_name.lower().endswith(suffix):
+            safe_name = safe_name[:-len(suffix)]
+    owner = _CURRENT_USER_ID or 'shared'
+    filename = f"{safe_name}.{fmt}"
+    export_dir = os.path.join(_EXPORTS_DIR, owner)
+    path = os.path.join(export_dir, filename)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    
     try:
-        if os.path.exists(uploads_dir):
-            files = [f for f in os.listdir(uploads_dir) if f.endswith('.csv')]
-            if files:
-                print("📁 Available datasets:")
-                for file in files:
-                    file_path = os.path.join(uploads_dir, file)
-                    if os.path.exists(file_path):
-                        # Try to get basic info about the dataset
-                        try:
-                            df = pd.read_csv(file_path, nrows=1)
-                            print(f"   - {file} ({len(df.columns)} columns)")
-                        except:
-                            print(f"   - {file} (unable to read)")
-            else:
-                print("📁 No CSV files found in uploads directory")
+        os.makedirs(export_dir, exist_ok=True)
+        if fmt == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                print("❌ Error: Parquet export needs pyarrow. Install with: pip install pyarrow")
+                print("💡 Or use export_df(df, name, format='csv.gz')")
+                return None
+            df.to_parquet(tmp_path, index=index)
         else:
-            print("📁 Uploads directory not found")
+            # Chunked writes keep memory flat; level 6 is a good speed/size trade-off
+            df.to_csv(tmp_path, index=index, chunksize=100_000,
+                      compression={'method': 'gzip', 'compresslevel': 6})
+        os.replace(tmp_path, path)
     except Exception as e:
-        print(f"❌ Error listing datasets: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"❌ Error exporting DataFrame: {str(e)}")
+        return None
+    
+    size_mb = os.path.getsize(path) / 1024**2
+    print(f"✅ Exported {len(df)} rows to {filename} ({size_mb:.2f} MB)")
+    print(f"📦 Download: /api/workspace/exports/{owner}/{filename}")
+    return path
+
+# Report engine: a spec lists the report's pages; the aggregates they draw
+# from (bins, correlations, a row sample, box statistics, model results) are
+# computed once, pages are rasterized in parallel worker processes without
+# pyplot, and everything is written as one HTML or PDF file under exports
+_REPORT_SAMPLE_ROWS = 5_000
+_REPORT_DPI = 110
+_REPORT_COLORS = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6', '#1abc9c']
+
+def _report_grid(fig, n_panels, ncols, panel_size=(6, 4.5)):
+    """Axes for n_panels panels on a grid ncols wide; spare axes are hidden"""
+    nrows = max(1, -(-n_panels // ncols))
+    fig.set_size_inches(panel_size[0] * ncols, panel_size[1] * nrows)
+    axes = fig.subplots(nrows, ncols, squeeze=False).ravel()
+    for ax in axes[n_panels:]:
+        ax.set_visible(False)
+    return axes[:n_panels]
+
+def _draw_distributions(fig, page, data):
+    for ax, (col, bins) in zip(_report_grid(fig, len(data['bins']), page.get('ncols', 3)), data['bins'].items()):
+        if bins['kind'] == 'numeric':
+            ax.stairs(bins['counts'], bins['edges'], fill=True, alpha=0.7, color=_REPORT_COLORS[0])
+            ax.set_ylabel('Frequency')
+        else:
+            ax.bar(range(len(bins['counts'])), bins['counts'], color=_REPORT_COLORS[:len(bins['counts'])])
+            ax.set_xticks(range(len(bins['counts'])))
+            ax.set_xticklabels(bins['labels'], rotation=45 if len(bins['labels']) > 4 else 0)
+            ax.set_ylabel('Count')
+        ax.set_title(f'{col} Distribution')
+        ax.set_xlabel(col)
+
+def _draw_correlation(fig, page, data):
+    k = len(data['corr'])
+    size = min(8 + k * 0.1, 16)
+    fig.set_size_inches(size * 1.25, size)
+    plot_correlation_heatmap(data['corr'], title=page.get('title', 'Feature Correlation Heatmap'),
+                             top_k=page.get('top_k', 40), target=data['target'],
+                             mask_upper=page.get('mask_upper', True), ax=fig.subplots())
+
+def _draw_scatter(fig, page, data):
+    sample, target = data['sample'], data['target']
+    axes = _report_grid(fig, len(page['x']) + (1 if data['boxes'] else 0), page.get('ncols', 2), (7.5, 6))
+    for i, (ax, col) in enumerate(zip(axes, page['x'])):
+        ax.scatter(sample[col], sample[target], alpha=0.6, s=12, color=_REPORT_COLORS[i % len(_REPORT_COLORS)])
+        ax.set_title(f'{col} vs {target}')
+        ax.set_xlabel(col)
+        ax.set_ylabel(target)
+        ax.grid(True, alpha=0.3)
+    if data['boxes']:
+        ax = axes[-1]
+        ax.bxp(data['boxes'], showfliers=False)
+        ax.set_title(f"{target} by {page['by']}")
+        ax.set_xlabel(page['by'])
+        ax.set_ylabel(target)
+
+def _draw_models(fig, page, data):
+    results = data['results']
+    metrics = [m for m in page.get('metrics', ['mse', 'r2', 'accuracy', 'f1', 'fit_time']) if m in results]
+    for ax, metric in zip(_report_grid(fig, len(metrics), len(metrics), (7.5, 6)), metrics):
+        values = results[metric].fillna(0)
+        ax.bar([str(name) for name in results.index], values,
+               color=[_REPORT_COLORS[i % len(_REPORT_COLORS)] for i in range(len(values))])
+        ax.set_title(f'Model Comparison - {metric}', fontsize=14, fontweight='bold')
+        ax.set_ylabel(metric)
+        ax.grid(True, alpha=0.3)
+        for i, v in enumerate(values):
+            ax.text(i, v, f'{v:.3g}', ha='center', va='bottom', fontweight='bold')
+
+def _draw_predictions(fig, page, data):
+    y_true = data['y_true']
+    lo, hi = float(np.min(y_true)), float(np.max(y_true))
+    for i, (ax, (name, pred)) in enumerate(zip(_report_grid(fig, len(data['predictions']), page.get('ncols', 2), (7.5, 6)),
+                                               data['predictions'].items())):
+        ax.scatter(y_true, pred, alpha=0.6, s=12, color=_REPORT_COLORS[i % len(_REPORT_COLORS)])
+        ax.plot([lo, hi], [lo, hi], 'r--', lw=2, label='Perfect Prediction')
+        score = data['scores'].get(name)
+        ax.set_title(name if score is None else f'{name} ({score})')
+        ax.set_xlabel('Actual')
+        ax.set_ylabel('Predicted')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+
+_REPORT_PAGES = {
+    'distributions': _draw_distributions,
+    'correlation': _draw_correlation,
+    'scatter': _draw_scatter,
+    'models': _draw_models,
+    'predictions': _draw_predictions,
+}
+
+def _rasterize_page(page, data, style, dpi):
+    """Draw one report page on a pyplot-free Figure and return it as PNG bytes"""
+    import matplotlib.style
+    from matplotlib.figure import Figure
+    
+    with matplotlib.style.context(style or 'default'):
+        fig = Figure(layout='constrained')
+        _REPORT_PAGES[page['type']](fig, page, data)
+        if page.get('title') and page['type'] != 'correlation':
+            fig.suptitle(page['title'], fontsize=16, fontweight='bold')
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', facecolor='white')
+    return buf.getvalue()
+
+def _report_aggregates(df, spec):
+    """Everything the spec's pages draw from, computed once; returns (per-page data, shared)"""
+    target = spec.get('target')
+    pages = spec['pages']
+    kinds = {page['type'] for page in pages}
+    shared = {}
+    
+    if kinds & {'correlation', 'models', 'predictions'}:
+        shared['encoded'], _ = preprocess(df, impute=None)
+    if 'distributions' in kinds:
+        columns = list(dict.fromkeys(col for page in pages if page['type'] == 'distributions'
+                                     for col in page.get('columns', df.columns)))
+        shared['bins'] = histogram_data(df[columns])
+    if 'correlation' in kinds:
+        shared['corr'] = correlation_matrix(shared['encoded'].select_dtypes(include=[np.number]))
+    if 'scatter' in kinds:
+        columns = list(dict.fromkeys([target] + [col for page in pages if page['type'] == 'scatter'
+                                                  for col in page['x']]))
+        n = min(len(df), spec.get('sample_rows', _REPORT_SAMPLE_ROWS))
+        shared['sample'] = df[columns].sample(n=n, random_state=42) if n < len(df) else df[columns]
+    if kinds & {'models', 'predictions'}:
+        encoded = shared['encoded']
+        X_train, X_test, y_train, y_test = train_test_split(
+            encoded.drop(columns=[target]), encoded[target],
+            test_size=spec.get('test_size', 0.2), random_state=42)
+        results, _, predictions = compare_models(spec['models'], X_train, y_train, X_test, y_test,
+                                                 time_budget=spec.get('time_budget', 120))
+        shared['results'] = results
+        keep = np.arange(len(y_test))
+        if len(keep) > _REPORT_SAMPLE_ROWS:
+            keep = np.sort(np.random.RandomState(42).choice(len(keep), _REPORT_SAMPLE_ROWS, replace=False))
+        primary = 'r2' if 'r2' in results else 'accuracy'
+        shared['predictions'] = {
+            'y_true': np.asarray(y_test)[keep],
+            'predictions': {name: np.asarray(pred)[keep] for name, pred in predictions.items()},
+            'scores': {name: f"{primary} = {results.loc[name, primary]:.3f}" for name in predictions},
+        }
+    
+    per_page = []
+    for page in pages:
+        kind = page['type']
+        if kind not in _REPORT_PAGES:
+            raise ValueError(f"Unknown report page type {kind!r}; use one of {sorted(_REPORT_PAGES)}")
+        if kind == 'distributions':
+            data = {'bins': {col: shared['bins'][col] for col in page.get('columns', df.columns)}}
+        elif kind == 'correlation':
+            data = {'corr': shared['corr'], 'target': target}
+        elif kind == 'scatter':
+            boxes = []
+            if page.get('by'):
+                from matplotlib.cbook import boxplot_stats
+                for label, values in df.groupby(page['by'], sort=True)[target]:
+                    boxes.append(boxplot_stats(values.dropna().to_numpy(), labels=[str(label)])[0])
+            data = {'sample': shared['sample'], 'target': target, 'boxes': boxes}
+        elif kind == 'models':
+            data = {'results': shared['results'].drop(columns=['estimator', 'status', 'cached'], errors='ignore')}
+        else:
+            data = shared['predictions']
+        per_page.append(data)
+    return per_page, shared
+
+def _write_report(path, title, pages, images, fmt, dpi):
+    if fmt == 'pdf':
+        from matplotlib.backends.backend_pdf import PdfPages
+        from matplotlib.figure import Figure
+        from matplotlib.image import imread
+        with PdfPages(path) as pdf:
+            for image in images:
+                pixels = imread(io.BytesIO(image), format='png')
+                fig = Figure(figsize=(pixels.shape[1] / dpi, pixels.shape[0] / dpi))
+                fig.figimage(pixels)
+                pdf.savefig(fig, dpi=dpi)
+        return
+    
+    import html
+    sections = [
+        f'<section class="page"><h2>{html.escape(page.get("title", page["type"].title()))}</h2>'
+        f'<img src="data:image/png;base64,{base64.b64encode(image).decode("ascii")}" '
+        f'alt="{html.escape(page["type"])}"></section>'
+        for page, image in zip(pages, images)
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(
+            '<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>{html.escape(title)}</title><style>'
+            'body{font-family:sans-serif;margin:24px;background:#fafafa}'
+            '.page{background:#fff;border:1px solid #ddd;border-radius:4px;padding:16px;margin:0 0 24px;'
+            'page-break-after:always}img{max-width:100%;height:auto}'
+            f'</style></head><body><h1>{html.escape(title)}</h1>'
+            f'<p>Generated {time.strftime("%Y-%m-%d %H:%M")}</p>{"".join(sections)}</body></html>'
+        )
+
+def build_report(df, spec, output='report.html', n_jobs=None, show=True):
+    """Render a multi-page report for df from a report spec into one HTML or PDF file
+    
+    spec is a dict with 'title', 'target', optional 'style' (a matplotlib
+    style), 'models' (name -> estimator, for 'models'/'predictions' pages),
+    'test_size', 'time_budget' and 'pages': a list of
+    {'type': 'distributions', 'columns': [...]}, {'type': 'correlation'},
+    {'type': 'scatter', 'x': [...], 'by': col}, {'type': 'models'} and
+    {'type': 'predictions'} entries, each with an optional 'title'. Shared
+    aggregates are computed once, pages are rasterized in parallel (n_jobs)
+    and the file is written to the exports store (.html or .pdf, from
+    output's extension). With show=True the pages are also displayed inline.
+    Returns (path, aggregates); aggregates['results'] holds the model table.
+    """
+    if not (PANDAS_AVAILABLE and MATPLOTLIB_AVAILABLE):
+        print("❌ Error: pandas and matplotlib are needed to build a report.")
+        return None, None
+    
+    from joblib import Parallel, delayed
+    
+    timings = {}
+    name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(output)).strip('._') or 'report.html'
+    fmt = 'pdf' if name.lower().endswith('.pdf') else 'html'
+    if not name.lower().endswith(f'.{fmt}'):
+        name = f'{name}.{fmt}'
+    title = spec.get('title', 'Report')
+    pages = spec['pages']
+    
+    with _timed(timings, 'aggregates'):
+        per_page, shared = _report_aggregates(df, spec)
+    
+    n_jobs = min(_resolve_n_jobs(n_jobs), len(pages))
+    with _timed(timings, 'rasterize'):
+        images = Parallel(n_jobs=n_jobs)(
+            delayed(_rasterize_page)(page, data, spec.get('style'), _REPORT_DPI)
+            for page, data in zip(pages, per_page)
+        )
+    
+    owner = _CURRENT_USER_ID or 'shared'
+    report_dir = os.path.join(_EXPORTS_DIR, owner)
+    path = os.path.join(report_dir, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with _timed(timings, 'write'):
+        try:
+            os.makedirs(report_dir, exist_ok=True)
+            _write_report(tmp_path, title, pages, images, fmt, _REPORT_DPI)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"❌ Error writing report: {str(e)}")
+            return None, shared
+    
+    if show:
+        for i, image in enumerate(images, start=1):
+            print(f'<img src="data:image/png;base64,{base64.b64encode(image).decode("ascii")}" alt="Report page {i}" '
+                  'style="max-width: 100%; height: auto; border: 1px solid #ddd; border-radius: 4px; margin: 10px 0;">')
+    
+    size_mb = os.path.getsize(path) / 1024**2
+    print(f"📄 {title}: {len(pages)} page(s) → {name} ({size_mb:.2f} MB) — aggregates {timings['aggregates']:.2f}s, "
+          f"rasterized in {timings['rasterize']:.2f}s on {n_jobs} worker(s), written in {timings['write']:.2f}s")
+    print(f"📦 Download: /api/workspace/exports/{owner}/{name}")
+    return path, shared
 
 print("Robust ML Execution Environment initialized successfully!")
 print("🔧 Server-based Python and Machine Learning Execution")
@@ -600,7 +2929,7 @@ print("- ✅ Automatic figure rendering to images")
 print("\n📁 File Loading Options:")
 if uploaded_file_path:
     print(f"- ✅ uploaded_file_path = '{uploaded_file_path}'")
-    print(f"- 📁 Latest file: {os.path.basename(uploaded_file_path)}")
+    print(f"- 📁 Latest file: {uploaded_file_name}")
 else:
     print("- ❌ No files uploaded yet")
 
@@ -632,6 +2961,7 @@ render_existing_figures()
 # Make render_figure available in the global namespace
 # This ensures it's available for user code execution
 import sys
+render_figure = render_existing_figures
 sys.modules['__main__'].render_figure = render_figure
 sys.modules['builtins'].render_figure = render_figure
 
@@ -47,7 +47,7 @@ router.post('/execute/stop', authenticateToken, async (req, res) => {
 // Execute Python code
 router.post('/execute/code', authenticateToken, async (req, res) => {
   try {
-    const { code, sessionId } = req.body;
+    const { code, sessionId, profile } = req.body;
     const userId = req.user.userId;
     
     if (!code || !sessionId) {
@@ -55,7 +55,7 @@ router.post('/execute/code', authenticateToken, async (req, res) => {
     }
 
     const gpuService = req.app.locals.gpuService;
-    const result = await gpuService.executeCodeWithInputSupport(userId, sessionId, code);
+    const result = await gpuService.executeCodeWithInputSupport(userId, sessionId, code, { profile });
     
     res.json(result);
   } catch (error) {
@@ -140,6 +140,73 @@ router.get('/admin/usage/all', authenticateToken, requireAdmin, async (req, res)
   }
 });
 
+// Admin: Storage usage across uploads, temp and derived caches
+router.get('/admin/storage', authenticateToken, requireAdmin, async (req, res) => {
+  try {
+    const storageManager = req.app.locals.storageManager;
+    const usage = await storageManager.getUsage();
+    
+    res.json(usage);
+  } catch (error) {
+    console.error('Get storage usage error:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// Admin: Execution metrics rolled up by hour, day, user, dataset or exit reason
+router.get('/admin/executions/rollup', authenticateToken, requireAdmin, async (req, res) => {
+  try {
+    const { groupBy = 'day', days = 7, userId } = req.query;
+    const telemetry = req.app.locals.gpuService.telemetry;
+    if (!telemetry.constructor.ROLLUP_GROUPS.includes(groupBy)) {
+      return res.status(400).json({ error: `groupBy must be one of: ${telemetry.constructor.ROLLUP_GROUPS.join(', ')}` });
+    }
+
+    const rows = await telemetry.rollup({
+      groupBy,
+      days: Math.min(Math.max(parseFloat(days) || 7, 0), 366),
+      userId: userId !== undefined ? parseInt(userId) : null
+    });
+    res.json({ groupBy, rows });
+  } catch (error) {
+    console.error('Execution rollup error:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// Admin: Peak memory per user or per dataset, with the largest objects of the heaviest run
+router.get('/admin/memory', authenticateToken, requireAdmin, async (req, res) => {
+  try {
+    const { groupBy = 'user', days = 7 } = req.query;
+    const telemetry = req.app.locals.gpuService.telemetry;
+    if (!telemetry.constructor.MEMORY_GROUPS.includes(groupBy)) {
+      return res.status(400).json({ error: `groupBy must be one of: ${telemetry.constructor.MEMORY_GROUPS.join(', ')}` });
+    }
+
+    const rows = await telemetry.memoryUsage({
+      groupBy,
+      days: Math.min(Math.max(parseFloat(days) || 7, 0), 366)
+    });
+    res.json({ groupBy, rows });
+  } catch (error) {
+    console.error('Memory usage error:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// Admin: Run storage compaction now
+router.post('/admin/storage/compact', authenticateToken, requireAdmin, async (req, res) => {
+  try {
+    const storageManager = req.app.locals.storageManager;
+    const result = await storageManager.compact();
+    
+    res.json({ success: true, ...result });
+  } catch (error) {
+    console.error('Storage compaction error:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
 // Admin: Reset user's daily quota
 router.post('/admin/quota/reset', authenticateToken, requireAdmin, async (req, res) => {
   try {
@@ -5,97 +5,82 @@ const fs = require('fs').promises;
 const csv = require('csv-parser');
 const createCsvWriter = require('csv-writer').createObjectCsvWriter;
 const { authenticateToken } = require('../middleware/auth');
+const { validateUploadName, datasetNameFor } = require('../services/compression');
 
 const router = express.Router();
 
-// Store the latest uploaded file info
-let latestUploadedFile = null;
-
-// Configure multer for file uploads
-const storage = multer.diskStorage({
-  destination: async (req, file, cb) => {
-    const uploadsDir = path.join(__dirname, '../uploads');
-    try {
-      await fs.mkdir(uploadsDir, { recursive: true });
-      cb(null, uploadsDir);
-    } catch (error) {
-      cb(error);
-    }
-  },
-  filename: (req, file, cb) => {
-    const uniqueSuffix = Date.now() + '-' + Math.round(Math.random() * 1E9);
-    cb(null, uniqueSuffix + '-' + file.originalname);
-  }
-});
+// Configure multer to stream uploads straight into the content-addressed store
+const storage = {
+  _handleFile: (req, file, cb) => req.app.locals.datasetStore.handleUpload(file, cb),
+  _removeFile: (req, file, cb) => req.app.locals.datasetStore.removeUpload(file, cb)
+};
 
 const upload = multer({ 
   storage: storage,
   fileFilter: (req, file, cb) => {
-    if (file.mimetype === 'text/csv' || file.originalname.endsWith('.csv')) {
+    // Plain, gzip, zstd and zip CSVs; compressed ones are decompressed while streaming
+    const error = validateUploadName(file.originalname);
+    if (!error) {
       cb(null, true);
     } else {
-      cb(new Error('Only CSV files are allowed'), false);
+      cb(new Error(error), false);
     }
   },
   limits: {
-    fileSize: 10 * 1024 * 1024 // 10MB limit
+    fileSize: 10 * 1024 * 1024 // 10MB limit (compressed size for compressed uploads)
   }
 });
 
-// Upload CSV file
-router.post('/upload', upload.single('file'), async (req, res) => {
+// Upload CSV file (optionally gzip/zstd/zip compressed)
+router.post('/upload', authenticateToken, upload.single('file'), async (req, res) => {
   try {
     if (!req.file) {
       return res.status(400).json({ error: 'No file uploaded' });
     }
 
-    const filePath = req.file.path;
-    const fileName = req.file.originalname;
-    
-    // Copy file to temp directory for execution
-    const tempDir = path.join(__dirname, '../temp');
-    await fs.mkdir(tempDir, { recursive: true });
-    
-    // Create a clean filename for the temp directory
-    const tempFileName = fileName;
-    const tempFilePath = path.join(tempDir, tempFileName);
-    
-    // Copy the uploaded file to temp directory
-    await fs.copyFile(filePath, tempFilePath);
-    
-    // Store the latest uploaded file info
-    latestUploadedFile = {
-      originalName: fileName,
-      tempPath: tempFilePath,
-      uploadPath: filePath
-    };
-    
-    // Read and parse CSV
-    const results = [];
-    const columns = [];
-    
-    await new Promise((resolve, reject) => {
-      require('fs').createReadStream(filePath)
-        .pipe(csv())
-        .on('headers', (headers) => {
-          columns.push(...headers);
-        })
-        .on('data', (data) => {
-          results.push(data);
-        })
-        .on('end', resolve)
-        .on('error', reject);
+    const store = req.app.locals.datasetStore;
+    const storageManager = req.app.locals.storageManager;
+    const { digest, path: filePath, size, deduplicated } = req.file;
+    const fileName = datasetNameFor(req.file.originalname);
+
+    // A dataset larger than the whole per-user budget could never be kept
+    if (size > storageManager.USER_BUDGET_BYTES) {
+      await storageManager.removeObjectIfUnreferenced(digest, await storageManager.getReferences());
+      return res.status(413).json({
+        error: `Dataset is ${(size / (1024 * 1024)).toFixed(0)}MB after decompression; ` +
+          `the per-user storage budget is ${storageManager.USER_BUDGET_BYTES / (1024 * 1024)}MB`
+      });
+    }
+
+    // Columns, row count, schema and preview are cached per digest
+    const rowIndex = await store.getRowIndex(digest);
+    const { columns, rowCount, preview } = rowIndex;
+
+    // The user-facing name is only a catalog reference to the stored digest
+    const datasetId = await store.addReference({
+      userId: req.user.userId,
+      name: fileName,
+      digest,
+      size,
+      rowIndex
     });
 
+    // Keep the uploader within their storage budget (evicts LRU data in the background,
+    // never the dataset just uploaded)
+    storageManager.enforceUserBudget(req.user.userId, { keepDigest: digest })
+      .catch(error => console.error('Error enforcing storage budget:', error));
+
     // Create dataset info
     const dataset = {
-      id: req.file.filename,
+      id: datasetId,
       name: fileName,
+      digest,
+      deduplicated,
       columns: columns,
-      shape: [results.length, columns.length],
-      preview: results.slice(0, 5),
+      shape: [rowCount, columns.length],
+      preview: preview.slice(0, 5),
       filePath: filePath,
-      tempPath: tempFilePath
+      tempPath: filePath
     };
 
     res.json(dataset);
@@ -105,13 +90,22 @@ router.post('/upload', upload.single('file'), async (req, res) => {
   }
 });
 
-// Get latest uploaded file info
-router.get('/latest-upload', (req, res) => {
+// Get the caller's latest uploaded file info (the kernel reads the same catalog row)
+router.get('/latest-upload', authenticateToken, async (req, res) => {
   try {
-    if (latestUploadedFile) {
+    const store = req.app.locals.datasetStore;
+    const [latest] = await store.listReferences(req.user.userId);
+    if (latest) {
+      const filePath = store.objectPath(latest.digest);
       res.json({
         success: true,
-        file: latestUploadedFile
+        file: {
+          originalName: latest.name,
+          tempPath: filePath,
+          uploadPath: filePath,
+          digest: latest.digest,
+          datasetId: latest.id
+        }
       });
     } else {
       res.json({
@@ -126,17 +120,16 @@ router.get('/latest-upload', (req, res) => {
 });
 
 // Get dataset info
-router.get('/datasets/:id', async (req, res) => {
+router.get('/datasets/:id', authenticateToken, async (req, res) => {
   try {
     const datasetId = req.params.id;
-    const filePath = path.join(__dirname, '../uploads', datasetId);
+    const ref = await req.app.locals.datasetStore.resolve(datasetId, req.user.userId);
     
-    // Check if file exists
-    try {
-      await fs.access(filePath);
-    } catch {
+    // Check if dataset exists
+    if (!ref) {
       return res.status(404).json({ error: 'Dataset not found' });
     }
+    const filePath = ref.path;
 
     // Read and parse CSV
     const results = [];
@@ -157,7 +150,8 @@ router.get('/datasets/:id', async (req, res) => {
 
     const dataset = {
       id: datasetId,
-      name: datasetId,
+      name: ref.name,
+      digest: ref.digest,
       columns: columns,
       shape: [results.length, columns.length],
       preview: results.slice(0, 10),
@@ -172,17 +166,23 @@ router.get('/datasets/:id', async (req, res) => {
 });
 
 // Generate EDA (Exploratory Data Analysis) for a dataset
-router.post('/eda/:id', async (req, res) => {
+router.post('/eda/:id', authenticateToken, async (req, res) => {
   try {
     const datasetId = req.params.id;
-    const filePath = path.join(__dirname, '../uploads', datasetId);
+    const store = req.app.locals.datasetStore;
+    const ref = await store.resolve(datasetId, req.user.userId);
     
-    // Check if file exists
-    try {
-      await fs.access(filePath);
-    } catch {
+    // Check if dataset exists
+    if (!ref) {
       return res.status(404).json({ error: 'Dataset not found' });
     }
+    const filePath = ref.path;
+
+    // The profile depends only on content, so identical uploads share it
+    const cachedEda = await store.readCache(ref.digest, 'eda.json');
+    if (cachedEda) {
+      return res.json(cachedEda);
+    }
 
     // Read and parse CSV
     const results = [];
@@ -246,6 +246,7 @@ router.post('/eda/:id', async (req, res) => {
       }
     });
 
+    await store.writeCache(ref.digest, 'eda.json', eda);
     res.json(eda);
   } catch (error) {
     console.error('Error generating EDA:', error);
@@ -256,7 +257,7 @@ router.post('/eda/:id', async (req, res) => {
 // Execute Python code
 router.post('/execute', authenticateToken, async (req, res) => {
   try {
-    const { code } = req.body;
+    const { code, profile } = req.body;
     const userId = req.user.userId;
     
     if (!code) {
@@ -266,8 +267,8 @@ router.post('/execute', authenticateToken, async (req, res) => {
     const gpuService = req.app.locals.gpuService;
     const sessionId = `workspace-${Date.now()}`;
     
-    // Execute the code
-    const result = await gpuService.executeCode(userId, sessionId, code);
+    // Execute the code ('cpu' or 'memory' profile opts in to a profile of the user code)
+    const result = await gpuService.executeCode(userId, sessionId, code, { profile });
     
     res.json(result);
   } catch (error) {
@@ -276,7 +277,8 @@ router.post('/execute', authenticateToken, async (req, res) => {
   }
 });
 
-// Export processed data
+// Export processed data sent back by the client as JSON rows.
+// Kernel code should prefer export_df(), which writes from the kernel directly.
 router.post('/export/:id', async (req, res) => {
   try {
     const datasetId = req.params.id;
@@ -329,25 +331,66 @@ router.get('/download/:filename', async (req, res) => {
   }
 });
 
-// List all uploaded datasets
-router.get('/datasets', async (req, res) => {
+// Content types for kernel exports: export_df() data and build_report() reports
+const EXPORT_CONTENT_TYPES = {
+  '.parquet': 'application/vnd.apache.parquet',
+  '.gz': 'application/gzip',
+  '.html': 'text/html; charset=utf-8',
+  '.pdf': 'application/pdf'
+};
+
+// Download a DataFrame exported from the kernel with export_df(), or a
+// report written by build_report(). Only the owner (or an admin) can
+// download; anyone else gets a 404 so export names are not disclosed.
+// Streams the file and honours Range requests for resumable downloads.
+router.get('/exports/:owner/:filename', authenticateToken, async (req, res) => {
   try {
-    const uploadsDir = path.join(__dirname, '../uploads');
-    
+    const exportsDir = path.join(__dirname, '../uploads/exports');
+    const owner = path.basename(req.params.owner);
+    const filename = path.basename(req.params.filename);
+
+    if (String(req.user.userId) !== owner && req.user.role !== 'admin') {
+      return res.status(404).json({ error: 'File not found' });
+    }
+    const filePath = path.join(exportsDir, owner, filename);
+
+    // Check if file exists
     try {
-      const files = await fs.readdir(uploadsDir);
-      const datasets = files
-        .filter(file => file.endsWith('.csv'))
-        .map(file => ({
-          id: file,
-          name: file,
-          uploadDate: new Date().toISOString() // This is a placeholder
-        }));
-      
-      res.json(datasets);
+      await fs.access(filePath);
     } catch {
-      res.json([]); // Directory doesn't exist yet
+      return res.status(404).json({ error: 'File not found' });
     }
+
+    const contentType = EXPORT_CONTENT_TYPES[path.extname(filename).toLowerCase()] || 'application/gzip';
+    res.download(filePath, filename, {
+      acceptRanges: true,
+      headers: { 'Content-Type': contentType }
+    }, (error) => {
+      if (error && !res.headersSent) {
+        res.status(500).json({ error: 'Failed to download file' });
+      }
+    });
+  } catch (error) {
+    console.error('Error downloading export:', error);
+    res.status(500).json({ error: 'Failed to download file' });
+  }
+});
+
+// List the current user's uploaded datasets from the catalog
+router.get('/datasets', authenticateToken, async (req, res) => {
+  try {
+    const references = await req.app.locals.datasetStore.listReferences(req.user.userId);
+    const datasets = references.map(ref => ({
+      id: ref.id,
+      name: ref.name,
+      digest: ref.digest,
+      size: ref.size_bytes,
+      shape: [ref.row_count, ref.column_count],
+      schema: ref.schema,
+      uploadDate: ref.uploaded_at
+    }));
+
+    res.json(datasets);
   } catch (error) {
     console.error('Error listing datasets:', error);
     res.status(500).json({ error: 'Failed to list datasets' });
@@ -1,6 +1,8 @@
 const sqlite3 = require('sqlite3').verbose();
 const bcrypt = require('bcryptjs');
 const path = require('path');
+const ExecutionTelemetry = require('../services/executionTelemetry');
+const DatasetStore = require('../services/datasetStore');
 
 const dbPath = path.join(__dirname, '..', 'database.sqlite');
 
@@ -68,6 +70,13 @@ db.serialize(() => {
     )
   `);
 
+  // Per-run execution metrics, written in batches by the GPU service
+  ExecutionTelemetry.SCHEMA.forEach((sql) => db.run(sql));
+
+  // Dataset catalog: user-facing names referencing content-addressed objects,
+  // with metadata captured at upload so listing never opens the files
+  DatasetStore.SCHEMA.forEach((sql) => db.run(sql));
+
   // Insert default admin user
   const adminEmail = 'admin@example.com';
   const adminPassword = 'admin123';
@@ -0,0 +1,103 @@
+const sqlite3 = require('sqlite3').verbose();
+const path = require('path');
+const fs = require('fs');
+const DatasetStore = require('../services/datasetStore');
+
+// Moves pre-dedup uploads (uploads/<timestamp>-<random>-<name>.csv) into the
+// content-addressed store and drops the per-upload copies left in temp/.
+// Legacy uploads carry no owner and datasets are only visible to their
+// owner, so pass the user ID to assign them to:
+//
+//   npm run migrate-uploads -- <userId>
+
+const dbPath = path.join(__dirname, '..', 'database.sqlite');
+const uploadsDir = path.join(__dirname, '..', 'uploads');
+const tempDir = path.join(__dirname, '..', 'temp');
+
+const db = new sqlite3.Database(dbPath, (err) => {
+  if (err) {
+    console.error('Error opening database:', err.message);
+    process.exit(1);
+  }
+  console.log('Connected to SQLite database.');
+});
+
+const store = new DatasetStore(db, uploadsDir);
+const ownerId = process.argv[2] ? parseInt(process.argv[2], 10) : null;
+
+const listCsvFiles = async (dir) => {
+  try {
+    const entries = await fs.promises.readdir(dir, { withFileTypes: true });
+    return entries.filter(entry => entry.isFile() && entry.name.endsWith('.csv')).map(entry => entry.name);
+  } catch {
+    return [];
+  }
+};
+
+const migrate = async () => {
+  let migrated = 0;
+  let duplicates = 0;
+  let savedBytes = 0;
+
+  if (ownerId === null) {
+    console.warn('No owner given: migrated datasets stay hidden until their user_id is set');
+  }
+
+  for (const file of await listCsvFiles(uploadsDir)) {
+    const legacyPath = path.join(uploadsDir, file);
+    const match = file.match(/^(\d+)-\d+-(.+)$/);
+    const name = match ? match[2] : file;
+    const uploadedAt = new Date(match ? parseInt(match[1], 10) : (await fs.promises.stat(legacyPath)).mtimeMs);
+
+    const stored = await store.ingest(fs.createReadStream(legacyPath));
+    await store.addReference({
+      // Keep the old file name as the ID so existing links keep resolving
+      id: file,
+      userId: ownerId,
+      name,
+      digest: stored.digest,
+      size: stored.size,
+      rowIndex: await store.getRowIndex(stored.digest),
+      createdAt: uploadedAt.toISOString().replace('T', ' ').slice(0, 19)
+    });
+    await fs.promises.rm(legacyPath);
+
+    migrated++;
+    if (stored.deduplicated) {
+      duplicates++;
+      savedBytes += stored.size;
+    }
+  }
+
+  // temp/ used to receive a full copy of every upload
+  for (const file of await listCsvFiles(tempDir)) {
+    const tempPath = path.join(tempDir, file);
+    const { incomingPath, digest } = await store.stage(fs.createReadStream(tempPath));
+    await fs.promises.rm(incomingPath, { force: true });
+    try {
+      await fs.promises.access(store.objectPath(digest));
+      savedBytes += (await fs.promises.stat(tempPath)).size;
+      await fs.promises.rm(tempPath);
+      console.log(`Removed upload copy temp/${file}`);
+    } catch {
+      // Not an upload copy; leave it alone
+    }
+  }
+
+  console.log(`Migrated ${migrated} uploads (${duplicates} duplicates, ${(savedBytes / 1024).toFixed(1)} KB reclaimed)`);
+};
+
+migrate()
+  .catch((error) => {
+    console.error('Error migrating uploads:', error);
+    process.exitCode = 1;
+  })
+  .finally(() => {
+    db.close((err) => {
+      if (err) {
+        console.error('Error closing database:', err.message);
+      } else {
+        console.log('Database connection closed.');
+      }
+    });
+  });
@@ -0,0 +1,160 @@
+const zlib = require('zlib');
+const { Transform } = require('stream');
+
+/**
+ * Streaming decompression for compressed dataset uploads.
+ * Supported containers: .csv.gz, .csv.zst (Node.js with zstd support) and
+ * single-entry .zip archives. Everything is decompressed while the upload
+ * streams in, so the store only ever holds plain CSV.
+ */
+
+const ZIP_LOCAL_HEADER_SIGNATURE = 0x04034b50;
+const ZIP_LOCAL_HEADER_SIZE = 30;
+const ZIP_METHOD_STORED = 0;
+const ZIP_METHOD_DEFLATE = 8;
+const ZIP_FLAG_DATA_DESCRIPTOR = 0x08;
+
+const zstdSupported = typeof zlib.createZstdDecompress === 'function';
+
+const compressionFor = (filename) => {
+  const name = filename.toLowerCase();
+  if (name.endsWith('.csv.gz')) return 'gzip';
+  if (name.endsWith('.csv.zst')) return 'zstd';
+  if (name.endsWith('.zip')) return 'zip';
+  if (name.endsWith('.csv')) return null;
+  return undefined;
+};
+
+/**
+ * Check an upload name; returns an error message or null when accepted.
+ */
+const validateUploadName = (filename) => {
+  const compression = compressionFor(filename);
+  if (compression === undefined) {
+    return 'Only CSV files (.csv, .csv.gz, .csv.zst, .zip) are allowed';
+  }
+  if (compression === 'zstd' && !zstdSupported) {
+    return 'Zstandard uploads are not supported by this server; use .csv.gz or .zip';
+  }
+  return null;
+};
+
+/**
+ * User-facing dataset name for an upload (the decompressed CSV's name).
+ */
+const datasetNameFor = (filename) => {
+  if (compressionFor(filename) === 'zip') {
+    return filename.replace(/\.zip$/i, '.csv');
+  }
+  return filename.replace(/\.(gz|zst)$/i, '');
+};
+
+/**
+ * Extracts the first entry of a zip archive from a stream. Only the local
+ * file header is needed, so no seeking to the central directory happens.
+ */
+class ZipEntryExtractor extends Transform {
+  constructor() {
+    super();
+    this.header = Buffer.alloc(0);
+    this.inflater = null;
+    this.remaining = null; // bytes left for stored entries
+    this.done = false;
+  }
+
+  _transform(chunk, encoding, callback) {
+    if (this.done) {
+      // Central directory and any further entries are ignored
+      return callback();
+    }
+    if (this.inflater) {
+      return this.forward(chunk, callback);
+    }
+
+    this.header = Buffer.concat([this.header, chunk]);
+    if (this.header.length < ZIP_LOCAL_HEADER_SIZE) {
+      return callback();
+    }
+    if (this.header.readUInt32LE(0) !== ZIP_LOCAL_HEADER_SIGNATURE) {
+      return callback(new Error('Not a zip archive'));
+    }
+
+    const flags = this.header.readUInt16LE(6);
+    const method = this.header.readUInt16LE(8);
+    const compressedSize = this.header.readUInt32LE(18);
+    const dataStart = ZIP_LOCAL_HEADER_SIZE + this.header.readUInt16LE(26) + this.header.readUInt16LE(28);
+    if (this.header.length < dataStart) {
+      return callback();
+    }
+
+    if (method === ZIP_METHOD_DEFLATE) {
+      this.inflater = zlib.createInflateRaw();
+      this.inflater.on('data', (data) => this.push(data));
+    } else if (method === ZIP_METHOD_STORED && !(flags & ZIP_FLAG_DATA_DESCRIPTOR)) {
+      this.inflater = 'stored';
+      this.remaining = compressedSize;
+    } else {
+      return callback(new Error('Unsupported zip entry (use deflate or store compression)'));
+    }
+
+    const rest = this.header.subarray(dataStart);
+    this.header = null;
+    return this.forward(rest, callback);
+  }
+
+  forward(chunk, callback) {
+    if (this.inflater === 'stored') {
+      const data = chunk.subarray(0, this.remaining);
+      this.remaining -= data.length;
+      this.done = this.remaining === 0;
+      this.push(data);
+      return callback();
+    }
+
+    this.inflater.write(chunk, (err) => {
+      if (err) {
+        return callback(err);
+      }
+      // The deflate stream ends before the archive does
+      this.done = this.inflater.writableEnded || this.inflater.readableEnded;
+      callback();
+    });
+  }
+
+  _flush(callback) {
+    if (!this.inflater) {
+      return callback(new Error('Zip archive is empty or truncated'));
+    }
+    if (this.inflater === 'stored') {
+      return callback(this.remaining === 0 ? null : new Error('Zip entry is truncated'));
+    }
+    if (this.inflater.readableEnded) {
+      return callback();
+    }
+    this.inflater.once('end', () => callback());
+    this.inflater.once('error', callback);
+    this.inflater.end();
+  }
+}
+
+/**
+ * Decompressing transform for an upload, or null for plain CSV.
+ */
+const createDecompressor = (filename) => {
+  switch (compressionFor(filename)) {
+    case 'gzip':
+      return zlib.createGunzip();
+    case 'zstd':
+      return zlib.createZstdDecompress();
+    case 'zip':
+      return new ZipEntryExtractor();
+    default:
+      return null;
+  }
+};
+
+module.exports = {
+  validateUploadName,
+  datasetNameFor,
+  createDecompressor
+};
@@ -0,0 +1,345 @@
+const crypto = require('crypto');
+const path = require('path');
+const fs = require('fs');
+const { Transform } = require('stream');
+const { pipeline } = require('stream/promises');
+const csv = require('csv-parser');
+const { v4: uuidv4 } = require('uuid');
+const { createDecompressor } = require('./compression');
+
+const SCHEMA = [
+  `CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER,
+    name TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size_bytes INTEGER,
+    row_count INTEGER,
+    column_count INTEGER,
+    schema TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+  )`,
+  'CREATE INDEX IF NOT EXISTS idx_datasets_digest ON datasets (digest)',
+  'CREATE INDEX IF NOT EXISTS idx_datasets_name ON datasets (name, created_at)'
+];
+
+// Catalog metadata added after the table was first created; ensureSchema adds it to older databases
+const ADDED_COLUMNS = {
+  user_id: 'INTEGER',
+  size_bytes: 'INTEGER',
+  row_count: 'INTEGER',
+  column_count: 'INTEGER',
+  schema: 'TEXT'
+};
+
+// Indexes on added columns, created once the columns exist
+const MIGRATED_INDEXES = [
+  'CREATE INDEX IF NOT EXISTS idx_datasets_owner ON datasets (user_id, created_at)'
+];
+
+/**
+ * Content-addressed dataset store and catalog.
+ * Uploads are hashed while they stream to disk and stored once under their
+ * SHA-256 digest (uploads/objects/<digest>.csv). User-facing dataset names
+ * are rows in the `datasets` catalog table that reference a digest together
+ * with cached metadata, and every derived cache lives under
+ * uploads/cache/<digest>/ so identical uploads share it immediately.
+ */
+class DatasetStore {
+  constructor(db, rootDir = path.join(__dirname, '..', 'uploads')) {
+    this.db = db;
+    this.rootDir = rootDir;
+    this.objectsDir = path.join(rootDir, 'objects');
+    this.cacheDir = path.join(rootDir, 'cache');
+    this.incomingDir = path.join(rootDir, 'incoming');
+    this.PREVIEW_ROWS = 10;
+    // Guards against compressed uploads that expand far beyond the upload limit
+    this.MAX_DECOMPRESSED_BYTES = (parseInt(process.env.UPLOAD_MAX_DECOMPRESSED_MB) || 200) * 1024 * 1024;
+    this.schemaReady = null;
+  }
+
+  query(method, sql, params = []) {
+    return new Promise((resolve, reject) => {
+      this.db[method](sql, params, (err, result) => (err ? reject(err) : resolve(result)));
+    });
+  }
+
+  /**
+   * Create the catalog, or bring a table created before the metadata
+   * columns existed up to date.
+   */
+  ensureSchema() {
+    if (!this.schemaReady) {
+      this.schemaReady = (async () => {
+        for (const sql of SCHEMA) {
+          await this.query('run', sql);
+        }
+        const existing = new Set((await this.query('all', 'PRAGMA table_info(datasets)')).map((column) => column.name));
+        for (const [column, type] of Object.entries(ADDED_COLUMNS)) {
+          if (!existing.has(column)) {
+            await this.query('run', `ALTER TABLE datasets ADD COLUMN ${column} ${type}`);
+          }
+        }
+        for (const sql of MIGRATED_INDEXES) {
+          await this.query('run', sql);
+        }
+      })();
+      this.schemaReady.catch(() => {
+        this.schemaReady = null;
+      });
+    }
+    return this.schemaReady;
+  }
+
+  objectPath(digest) {
+    return path.join(this.objectsDir, `${digest}.csv`);
+  }
+
+  cachePath(digest, ...parts) {
+    return path.join(this.cacheDir, digest, ...parts);
+  }
+
+  /**
+   * Stream bytes into the incoming area while hashing them. Compressed
+   * sources are decompressed on the way, so the digest (and therefore
+   * deduplication) covers the CSV content rather than the container.
+   * @param {stream.Readable} source - Upload stream
+   * @param {stream.Transform|null} decompressor - Optional decompressing transform
+   * @returns {Promise<Object>} Staged file ({ incomingPath, digest, size })
+   */
+  async stage(source, decompressor = null) {
+    await fs.promises.mkdir(this.incomingDir, { recursive: true });
+
+    const incomingPath = path.join(this.incomingDir, `${Date.now()}-${uuidv4()}`);
+    const hash = crypto.createHash('sha256');
+    const maxBytes = this.MAX_DECOMPRESSED_BYTES;
+    let size = 0;
+
+    const hasher = new Transform({
+      transform(chunk, encoding, callback) {
+        hash.update(chunk);
+        size += chunk.length;
+        if (size > maxBytes) {
+          return callback(new Error(`Dataset exceeds ${maxBytes / (1024 * 1024)}MB after decompression`));
+        }
+        callback(null, chunk);
+      }
+    });
+
+    const stages = decompressor ? [source, decompressor, hasher] : [source, hasher];
+    try {
+      await pipeline(...stages, fs.createWriteStream(incomingPath));
+    } catch (error) {
+      await fs.promises.rm(incomingPath, { force: true });
+      throw error;
+    }
+
+    return { incomingPath, digest: hash.digest('hex'), size };
+  }
+
+  /**
+   * Move a staged file to its content address, or drop it if the same
+   * bytes are already stored.
+   * @param {Object} staged - Result of stage()
+   * @returns {Promise<Object>} Stored object ({ digest, size, path, deduplicated })
+   */
+  async commit(staged) {
+    const { incomingPath, digest, size } = staged;
+    const objectPath = this.objectPath(digest);
+    await fs.promises.mkdir(this.objectsDir, { recursive: true });
+
+    let deduplicated = false;
+    try {
+      await fs.promises.access(objectPath);
+      deduplicated = true;
+      await fs.promises.rm(incomingPath, { force: true });
+      await this.touch(digest);
+    } catch {
+      await fs.promises.rename(incomingPath, objectPath);
+      // Objects are shared between references, so user code must not rewrite them in place
+      await fs.promises.chmod(objectPath, 0o444);
+    }
+
+    return { digest, size, path: objectPath, deduplicated };
+  }
+
+  /**
+   * Mark an object as recently used (the storage manager evicts by mtime).
+   */
+  async touch(digest) {
+    const now = new Date();
+    await fs.promises.utimes(this.objectPath(digest), now, now).catch(() => {});
+  }
+
+  async ingest(source) {
+    return this.commit(await this.stage(source));
+  }
+
+  /**
+   * Multer storage engine hook: store an uploaded file by content.
+   */
+  handleUpload(file, cb) {
+    this.stage(file.stream, createDecompressor(file.originalname))
+      .then(async (staged) => {
+        // Size-limited uploads arrive truncated; never give them a content address
+        if (file.stream.truncated) {
+          await fs.promises.rm(staged.incomingPath, { force: true });
+          return { size: staged.size };
+        }
+        return this.commit(staged);
+      })
+      .then((info) => cb(null, info), cb);
+  }
+
+  /**
+   * Multer storage engine hook for aborted requests. Objects may already be
+   * shared with other references, so nothing is deleted here.
+   */
+  removeUpload(file, cb) {
+    cb(null);
+  }
+
+  /**
+   * Register a user-facing name for a stored object in the catalog.
+   * Size, row/column counts and schema are written once here so listing
+   * never has to open the underlying files.
+   * @returns {Promise<string>} Dataset ID
+   */
+  async addReference({ id = uuidv4(), userId = null, name, digest, size, rowIndex, createdAt = null }) {
+    const { columns, rowCount, schema } = rowIndex;
+    await this.ensureSchema();
+
+    await this.query(
+      'run',
+      `INSERT OR IGNORE INTO datasets
+         (id, user_id, name, digest, size_bytes, row_count, column_count, schema, created_at)
+       VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))`,
+      [id, userId, name, digest, size, rowCount, columns.length, JSON.stringify(schema), createdAt]
+    );
+    return id;
+  }
+
+  /**
+   * Look up a catalog entry owned by the given user.
+   * @returns {Promise<Object|null>} { id, user_id, name, digest, created_at }
+   */
+  async getReference(id, userId) {
+    await this.ensureSchema();
+    const row = await this.query(
+      'get',
+      'SELECT id, user_id, name, digest, created_at FROM datasets WHERE id = ? AND user_id = ?',
+      [id, userId]
+    );
+    return row || null;
+  }
+
+  /**
+   * List catalog entries, newest first.
+   * @param {number|null} userId - Owner to filter by (all owners when null)
+   */
+  async listReferences(userId = null) {
+    const where = userId === null ? '' : 'WHERE user_id = ?';
+    const params = userId === null ? [] : [userId];
+    await this.ensureSchema();
+
+    // Served by idx_datasets_owner: one indexed query, no file access
+    const rows = await this.query(
+      'all',
+      `SELECT id, user_id, name, digest, size_bytes, row_count, column_count, schema,
+              strftime('%Y-%m-%dT%H:%M:%SZ', created_at) AS uploaded_at
+       FROM datasets
+       ${where}
+       ORDER BY created_at DESC`,
+      params
+    );
+    return rows.map(row => ({ ...row, schema: JSON.parse(row.schema || '[]') }));
+  }
+
+  /**
+   * Resolve one of the user's dataset IDs to the file holding its bytes.
+   * Files in the pre-dedup layout have no owner; `npm run migrate-uploads`
+   * moves them into the catalog.
+   * @returns {Promise<Object|null>} { id, name, digest, path }
+   */
+  async resolve(id, userId) {
+    const ref = await this.getReference(id, userId);
+    if (!ref) {
+      return null;
+    }
+    await this.touch(ref.digest);
+    return { ...ref, path: this.objectPath(ref.digest) };
+  }
+
+  async readCache(digest, name) {
+    if (!digest) {
+      return null;
+    }
+    try {
+      return JSON.parse(await fs.promises.readFile(this.cachePath(digest, name), 'utf8'));
+    } catch {
+      return null;
+    }
+  }
+
+  async writeCache(digest, name, value) {
+    if (!digest) {
+      return;
+    }
+    const cachePath = this.cachePath(digest, name);
+    await fs.promises.mkdir(path.dirname(cachePath), { recursive: true });
+    // Write-then-rename so concurrent readers never see a partial file
+    const tmpPath = `${cachePath}.${uuidv4()}.tmp`;
+    await fs.promises.writeFile(tmpPath, JSON.stringify(value));
+    await fs.promises.rename(tmpPath, cachePath);
+  }
+
+  /**
+   * Row index for an object: columns, row count, preview rows and a
+   * numeric/string schema. Computed with one streaming pass and cached by
+   * digest.
+   */
+  async getRowIndex(digest, filePath = this.objectPath(digest)) {
+    const cached = await this.readCache(digest, 'rows.json');
+    if (cached && cached.schema) {
+      return cached;
+    }
+
+    const columns = [];
+    const preview = [];
+    const numeric = {};
+    let rowCount = 0;
+
+    await new Promise((resolve, reject) => {
+      fs.createReadStream(filePath)
+        .pipe(csv())
+        .on('headers', (headers) => {
+          columns.push(...headers);
+          headers.forEach(header => { numeric[header] = true; });
+        })
+        .on('data', (data) => {
+          if (rowCount < this.PREVIEW_ROWS) {
+            preview.push(data);
+          }
+          for (const column of columns) {
+            const value = data[column];
+            if (numeric[column] && value !== '' && value !== undefined && isNaN(Number(value))) {
+              numeric[column] = false;
+            }
+          }
+          rowCount++;
+        })
+        .on('end', resolve)
+        .on('error', reject);
+    });
+
+    const schema = columns.map(column => ({ name: column, type: numeric[column] ? 'numeric' : 'string' }));
+    const rowIndex = { columns, rowCount, preview, schema };
+    await this.writeCache(digest, 'rows.json', rowIndex);
+    return rowIndex;
+  }
+}
+
+DatasetStore.SCHEMA = SCHEMA;
+
+module.exports = DatasetStore;
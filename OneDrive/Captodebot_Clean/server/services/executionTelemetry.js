@@ -0,0 +1,275 @@
+// Columns written per execution, in insert order
+const COLUMNS = [
+  'user_id', 'session_id', 'created_at', 'exit_code', 'exit_reason', 'profile',
+  'queue_wait_ms', 'startup_ms', 'packages_ms', 'user_code_ms', 'render_ms', 'finalize_ms', 'total_ms',
+  'cpu_seconds', 'peak_rss_mb', 'output_bytes', 'figure_count', 'cache_hits', 'cache_misses',
+  'workers_peak_rss_mb', 'dataset', 'largest_objects'
+];
+
+// Columns added after the table was first created; ensureSchema adds them to older databases
+const ADDED_COLUMNS = {
+  workers_peak_rss_mb: 'REAL',
+  dataset: 'TEXT',
+  largest_objects: 'TEXT'
+};
+
+const SCHEMA = [
+  `CREATE TABLE IF NOT EXISTS execution_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    session_id TEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    exit_code INTEGER,
+    exit_reason TEXT NOT NULL,
+    profile TEXT,
+    queue_wait_ms INTEGER,
+    startup_ms REAL,
+    packages_ms REAL,
+    user_code_ms REAL,
+    render_ms REAL,
+    finalize_ms INTEGER,
+    total_ms INTEGER,
+    cpu_seconds REAL,
+    peak_rss_mb REAL,
+    output_bytes INTEGER,
+    figure_count INTEGER,
+    cache_hits INTEGER,
+    cache_misses INTEGER,
+    workers_peak_rss_mb REAL,
+    dataset TEXT,
+    largest_objects TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+  )`,
+  'CREATE INDEX IF NOT EXISTS idx_execution_metrics_created ON execution_metrics (created_at)',
+  'CREATE INDEX IF NOT EXISTS idx_execution_metrics_user ON execution_metrics (user_id, created_at)'
+];
+
+// Indexes on added columns, created once the columns exist
+const MIGRATED_INDEXES = [
+  'CREATE INDEX IF NOT EXISTS idx_execution_metrics_dataset ON execution_metrics (dataset, created_at)'
+];
+
+// SQLite's default limit is 999 bound parameters per statement
+const ROWS_PER_INSERT = Math.floor(999 / COLUMNS.length);
+
+// Rollup buckets: SQL expression for the group key
+const ROLLUP_GROUPS = {
+  hour: "strftime('%Y-%m-%d %H:00', m.created_at)",
+  day: 'date(m.created_at)',
+  user: 'm.user_id',
+  dataset: 'm.dataset',
+  exit_reason: 'm.exit_reason'
+};
+
+// Memory usage breakdowns: SQL expression for the group key
+const MEMORY_GROUPS = {
+  user: 'm.user_id',
+  dataset: 'm.dataset'
+};
+
+/**
+ * Per-run execution telemetry.
+ * Every finished cell run produces one `execution_metrics` row (phase
+ * timings, CPU time, peak RSS of the kernel and its workers, the dataset it
+ * read, its largest objects, output size, figures, cache hits and the
+ * exit reason). Rows are buffered in memory and written as multi-row
+ * inserts, so a busy server does not pay a write per execution; rollups for
+ * the admin dashboard aggregate them in SQL.
+ */
+class ExecutionTelemetry {
+  constructor(db) {
+    this.db = db;
+    this.BATCH_SIZE = parseInt(process.env.TELEMETRY_BATCH_SIZE) || 50;
+    this.FLUSH_INTERVAL_MS = (parseInt(process.env.TELEMETRY_FLUSH_SECONDS) || 10) * 1000;
+    this.buffer = [];
+    this.timer = null;
+    this.flushing = Promise.resolve();
+    this.schemaReady = null;
+  }
+
+  query(method, sql, params = []) {
+    return new Promise((resolve, reject) => {
+      this.db[method](sql, params, (err, result) => (err ? reject(err) : resolve(result)));
+    });
+  }
+
+  ensureSchema() {
+    if (!this.schemaReady) {
+      this.schemaReady = (async () => {
+        for (const sql of SCHEMA) {
+          await this.query('run', sql);
+        }
+        const existing = new Set((await this.query('all', 'PRAGMA table_info(execution_metrics)')).map((column) => column.name));
+        for (const [column, type] of Object.entries(ADDED_COLUMNS)) {
+          if (!existing.has(column)) {
+            await this.query('run', `ALTER TABLE execution_metrics ADD COLUMN ${column} ${type}`);
+          }
+        }
+        for (const sql of MIGRATED_INDEXES) {
+          await this.query('run', sql);
+        }
+      })();
+      this.schemaReady.catch(() => {
+        this.schemaReady = null;
+      });
+    }
+    return this.schemaReady;
+  }
+
+  /**
+   * Queue one execution's metrics; written with the next batch.
+   * @param {Object} row - Values keyed by execution_metrics column
+   */
+  record(row) {
+    this.buffer.push(row);
+    if (this.buffer.length >= this.BATCH_SIZE) {
+      this.flush();
+    } else if (!this.timer) {
+      this.timer = setTimeout(() => this.flush(), this.FLUSH_INTERVAL_MS);
+      this.timer.unref();
+    }
+  }
+
+  /**
+   * Write everything buffered so far. Batches are written one at a time.
+   * @returns {Promise<void>} Resolves once the buffered rows are stored (or dropped on error)
+   */
+  flush() {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    this.flushing = this.flushing.then(() => this.writeBatch(this.buffer.splice(0)));
+    return this.flushing;
+  }
+
+  async writeBatch(rows) {
+    if (rows.length === 0) {
+      return;
+    }
+    const placeholders = `(${COLUMNS.map(() => '?').join(', ')})`;
+    try {
+      await this.ensureSchema();
+      // One multi-row INSERT per chunk: atomic, and within SQLite's bound-parameter limit
+      for (let offset = 0; offset < rows.length; offset += ROWS_PER_INSERT) {
+        const chunk = rows.slice(offset, offset + ROWS_PER_INSERT);
+        const params = chunk.flatMap((row) => COLUMNS.map((column) => row[column] ?? null));
+        await this.query(
+          'run',
+          `INSERT INTO execution_metrics (${COLUMNS.join(', ')}) VALUES ${chunk.map(() => placeholders).join(', ')}`,
+          params
+        );
+      }
+    } catch (error) {
+      // Telemetry is best effort; a failed batch never fails an execution
+      console.error(`Dropped ${rows.length} execution metrics row(s):`, error.message);
+    }
+  }
+
+  /**
+   * Aggregate execution metrics for the admin dashboard.
+   * @param {Object} [options]
+   * @param {string} [options.groupBy] - 'hour', 'day', 'user', 'dataset' or 'exit_reason'
+   * @param {number} [options.days] - How many days back to include
+   * @param {number} [options.userId] - Restrict to one user
+   * @returns {Promise<Object[]>} One row per bucket
+   */
+  async rollup({ groupBy = 'day', days = 7, userId = null } = {}) {
+    const key = ROLLUP_GROUPS[groupBy];
+    if (!key) {
+      throw new Error(`groupBy must be one of: ${Object.keys(ROLLUP_GROUPS).join(', ')}`);
+    }
+    await this.flush();
+    await this.ensureSchema();
+
+    const params = [since(days)];
+    let where = 'm.created_at >= ?';
+    if (userId !== null) {
+      where += ' AND m.user_id = ?';
+      params.push(userId);
+    }
+
+    const sql = `
+      SELECT ${key} AS bucket,
+             ${groupBy === 'user' ? 'MAX(u.email)' : 'NULL'} AS email,
+             COUNT(*) AS executions,
+             SUM(m.exit_reason != 'success') AS failures,
+             AVG(m.total_ms) AS avg_total_ms,
+             MAX(m.total_ms) AS max_total_ms,
+             AVG(m.queue_wait_ms) AS avg_queue_wait_ms,
+             AVG(m.startup_ms) AS avg_startup_ms,
+             AVG(m.user_code_ms) AS avg_user_code_ms,
+             AVG(m.render_ms) AS avg_render_ms,
+             SUM(m.cpu_seconds) AS cpu_seconds,
+             AVG(m.peak_rss_mb) AS avg_peak_rss_mb,
+             MAX(m.peak_rss_mb) AS max_peak_rss_mb,
+             SUM(m.output_bytes) AS output_bytes,
+             SUM(m.figure_count) AS figures,
+             SUM(m.cache_hits) AS cache_hits,
+             SUM(m.cache_misses) AS cache_misses
+      FROM execution_metrics m
+      LEFT JOIN users u ON u.id = m.user_id
+      WHERE ${where}
+      GROUP BY bucket
+      ORDER BY ${groupBy === 'hour' || groupBy === 'day' ? 'bucket' : 'executions DESC'}
+    `;
+
+    return this.query('all', sql, params);
+  }
+
+  /**
+   * Peak memory per user or per dataset, for sizing worker memory limits.
+   * Each row carries the largest objects left behind by its heaviest run.
+   * @param {Object} [options]
+   * @param {string} [options.groupBy] - 'user' or 'dataset'
+   * @param {number} [options.days] - How many days back to include
+   * @returns {Promise<Object[]>} One row per user or dataset, heaviest first
+   */
+  async memoryUsage({ groupBy = 'user', days = 7 } = {}) {
+    const key = MEMORY_GROUPS[groupBy];
+    if (!key) {
+      throw new Error(`groupBy must be one of: ${Object.keys(MEMORY_GROUPS).join(', ')}`);
+    }
+    await this.flush();
+    await this.ensureSchema();
+
+    // p95 is the smallest peak whose cumulative share of the bucket's runs reaches 95%
+    const sql = `
+      WITH ranked AS (
+        SELECT ${key} AS bucket,
+               m.peak_rss_mb,
+               m.workers_peak_rss_mb,
+               m.largest_objects,
+               CUME_DIST() OVER (PARTITION BY ${key} ORDER BY m.peak_rss_mb) AS rss_share,
+               ROW_NUMBER() OVER (PARTITION BY ${key} ORDER BY m.peak_rss_mb DESC) AS heaviest
+        FROM execution_metrics m
+        WHERE m.created_at >= ? AND m.peak_rss_mb IS NOT NULL AND ${key} IS NOT NULL
+      )
+      SELECT r.bucket,
+             ${groupBy === 'user' ? 'MAX(u.email)' : 'NULL'} AS email,
+             COUNT(*) AS executions,
+             AVG(r.peak_rss_mb) AS avg_peak_rss_mb,
+             MIN(CASE WHEN r.rss_share >= 0.95 THEN r.peak_rss_mb END) AS p95_peak_rss_mb,
+             MAX(r.peak_rss_mb) AS max_peak_rss_mb,
+             MAX(r.workers_peak_rss_mb) AS max_workers_peak_rss_mb,
+             MAX(CASE WHEN r.heaviest = 1 THEN r.largest_objects END) AS largest_objects
+      FROM ranked r
+      ${groupBy === 'user' ? 'LEFT JOIN users u ON u.id = r.bucket' : ''}
+      GROUP BY r.bucket
+      ORDER BY max_peak_rss_mb DESC
+    `;
+
+    const rows = await this.query('all', sql, [since(days)]);
+    return rows.map((row) => ({ ...row, largest_objects: row.largest_objects ? JSON.parse(row.largest_objects) : [] }));
+  }
+}
+
+function since(days) {
+  return new Date(Date.now() - days * 24 * 60 * 60 * 1000).toISOString().replace('T', ' ').slice(0, 19);
+}
+
+ExecutionTelemetry.SCHEMA = SCHEMA;
+ExecutionTelemetry.ROLLUP_GROUPS = Object.keys(ROLLUP_GROUPS);
+ExecutionTelemetry.MEMORY_GROUPS = Object.keys(MEMORY_GROUPS);
+
+module.exports = ExecutionTelemetry;
@@ -57,9 +57,11 @@ class GPUServiceInterface {
    * @param {string} userId - User ID
    * @param {string} sessionId - Session ID
    * @param {string} code - Python code to execute
-   * @returns {Promise<Object>} Execution result
+   * @param {Object} [options] - Execution options
+   * @param {string} [options.profile] - 'cpu' or 'memory' to profile the user code
+   * @returns {Promise<Object>} Execution result, with per-phase `metrics`
    */
-  async executeCode(userId, sessionId, code) {
+  async executeCode(userId, sessionId, code, options = {}) {
     throw new Error('executeCode method must be implemented');
   }
 }
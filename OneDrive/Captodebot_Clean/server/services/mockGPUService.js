@@ -1,17 +1,26 @@
 const GPUServiceInterface = require('./gpuServiceInterface');
+const ExecutionTelemetry = require('./executionTelemetry');
 const { spawn } = require('child_process');
 const path = require('path');
 const fs = require('fs');
 
+// Prefix of the line the kernel prints at exit with its phase timings and profile
+const METRICS_MARKER = '__CAPTODEBOT_METRICS__';
+const PROFILE_MODES = ['cpu', 'memory'];
+// `%%profile` or `%%profile memory` as the first line of a cell opts in to profiling
+const PROFILE_MAGIC = /^\s*%%profile(?:[ \t]+(\w+))?[ \t]*(?:\n|$)/;
+const EXECUTION_TIMEOUT_MS = 300000; // 5 minutes
+
 /**
  * Mock GPU Service Implementation
  * Simulates GPU execution for demo purposes.
  * Can be replaced with real GPU implementation later.
  */
 class MockGPUService extends GPUServiceInterface {
-  constructor(db) {
+  constructor(db, telemetry = new ExecutionTelemetry(db)) {
     super();
     this.db = db;
+    this.telemetry = telemetry;
     this.activeSessions = new Map(); // userId -> session data
     this.pendingInputs = new Map(); // Store sessions waiting for input
     this.DAILY_QUOTA_MINUTES = parseInt(process.env.DAILY_GPU_QUOTA_MINUTES) || 60;
@@ -160,7 +169,8 @@ class MockGPUService extends GPUServiceInterface {
     return usage.remainingMinutes > 0;
   }
 
-  async executeCode(userId, sessionId, code) {
+  async executeCode(userId, sessionId, code, options = {}) {
+    const requestedAt = Date.now();
     console.log('Executing code for user:', userId, 'session:', sessionId);
     console.log('Code to execute:', code);
     
@@ -180,7 +190,7 @@ class MockGPUService extends GPUServiceInterface {
       const tempFile = path.join(tempDir, `temp_${sessionId}_${Date.now()}.py`);
       
       // Prepend ML template to user code
-      const templatePath = path.join(__dirname, 'ml_template.py');
+      const templatePath = path.join(__dirname, '..', 'ml_template.py');
       let templateCode = '';
       try {
         templateCode = fs.readFileSync(templatePath, 'utf8') + '\n\n';
@@ -188,8 +198,19 @@ class MockGPUService extends GPUServiceInterface {
         console.error('Error reading ML template:', err);
       }
       
-      // Process user code for pip install commands
+      // Profiling is requested by the caller or by a %%profile cell magic
       let processedCode = code;
+      let profile = options.profile;
+      const profileMagic = code.match(PROFILE_MAGIC);
+      if (profileMagic) {
+        profile = profile || profileMagic[1] || 'cpu';
+        processedCode = processedCode.replace(PROFILE_MAGIC, '');
+      }
+      if (!PROFILE_MODES.includes(profile)) {
+        profile = null;
+      }
+
+      // Process user code for pip install commands
       let pipCommands = [];
       
       // Extract pip install commands (both !pip and pip)
@@ -211,10 +232,12 @@ class MockGPUService extends GPUServiceInterface {
       
       // Build the full execution code
       let fullCode = templateCode;
+      // Phase marks for the kernel's cell metrics (defined by the template)
+      const markPhase = (phase) => (templateCode ? `_cell_phase('${phase}')\n` : '');
       
       // Add pip install commands first if any
       if (pipCommands.length > 0) {
-        fullCode += '# Package Installation Commands\n';
+        fullCode += '# Package Installation Commands\n' + markPhase('packages');
         pipCommands.forEach(cmd => {
           fullCode += `import subprocess\n`;
           fullCode += `import sys\n`;
@@ -232,10 +255,11 @@ class MockGPUService extends GPUServiceInterface {
       
       // Add user code with proper formatting
       if (processedCode.trim()) {
-        fullCode += '\n# User Code\n' + processedCode + '\n';
+        fullCode += '\n# User Code\n' + markPhase('user_code') + processedCode + '\n';
       }
       
       // Add automatic figure rendering at the end (Colab-style)
+      fullCode += '\n' + markPhase('finalize');
       fullCode += '\n# Automatic figure rendering (Colab-style)\ntry:\n    render_existing_figures()\nexcept NameError:\n    pass\nexcept Exception as e:\n    print(f"Warning: Could not render figures: {e}")\n';
       
       fs.writeFileSync(tempFile, fullCode, 'utf8');
@@ -246,7 +270,7 @@ class MockGPUService extends GPUServiceInterface {
       
       // Execute Python code with ML libraries support
       const pythonProcess = spawn('python', [tempFile], {
-        timeout: 300000, // 5 minutes timeout
+        timeout: EXECUTION_TIMEOUT_MS,
         cwd: tempDir,
         env: {
           ...process.env,
@@ -255,8 +279,17 @@ class MockGPUService extends GPUServiceInterface {
           PYTHONIOENCODING: 'utf-8', // Force UTF-8 encoding for Python I/O
           LC_ALL: 'en_US.UTF-8', // Set locale to UTF-8
           LANG: 'en_US.UTF-8', // Set language to UTF-8
-          // Matplotlib config directory
-          MPLCONFIGDIR: tempDir
+          // Matplotlib config directory (kept out of the managed temp files)
+          MPLCONFIGDIR: path.join(tempDir, '.matplotlib'),
+          // Lets the kernel scope dataset lookups (and its latest upload) to the caller's catalog entries
+          CAPTODEBOT_USER_ID: String(userId),
+          // Spawn time for the kernel's startup phase, and the opt-in profiler
+          CAPTODEBOT_SPAWN_TIME: String(startTime),
+          ...(profile ? { CAPTODEBOT_PROFILE: profile } : {}),
+          // CPU allotment for parallel helpers (affinity/cgroup limits apply when unset)
+          ...(process.env.PYTHON_WORKER_CPUS ? { CAPTODEBOT_CPUS: process.env.PYTHON_WORKER_CPUS } : {}),
+          // Size of the per-user trained-model cache (the kernel defaults to 256 MB)
+          ...(process.env.PYTHON_MODEL_CACHE_MB ? { CAPTODEBOT_MODEL_CACHE_MB: process.env.PYTHON_MODEL_CACHE_MB } : {})
         }
       });
 
@@ -273,90 +306,208 @@ class MockGPUService extends GPUServiceInterface {
         stderr += data.toString();
       });
 
-      pythonProcess.on('close', async (code) => {
-        console.log('Python process closed with code:', code);
-        console.log('stdout:', stdout);
-        console.log('stderr:', stderr);
-        
-        const executionTime = Date.now() - startTime;
-        const durationMinutes = Math.ceil(executionTime / (1000 * 60));
-
-        try {
-          // Clean up temp file
-          fs.unlinkSync(tempFile);
-        } catch (err) {
-          console.error('Error cleaning up temp file:', err);
-        }
+      pythonProcess.on('close', (exitCode, signal) => {
+        this.finalizeExecution({
+          userId, sessionId, source: code, exitCode, signal, stdout, stderr,
+          requestedAt, startTime, tempFile, tempDir, profile
+        }).then(resolve, reject);
+      });
 
-        // Process output for ML-specific content
-        let processedOutput = stdout || stderr;
-        let outputType = 'text';
-
-        // Check for plot files (robust execution environment)
-        const plotFiles = fs.readdirSync(tempDir).filter(file => 
-          (file.endsWith('.png') || file.endsWith('.svg')) && 
-          (file.startsWith('plot_') || file.startsWith('figure_'))
-        );
-
-        if (plotFiles.length > 0) {
-          // Convert plots to base64 for embedding
-          const plotData = plotFiles.map(plotFile => {
-            const plotPath = path.join(tempDir, plotFile);
-            const plotBuffer = fs.readFileSync(plotPath);
-            const base64Plot = plotBuffer.toString('base64');
-            const mimeType = plotFile.endsWith('.png') ? 'image/png' : 'image/svg+xml';
-            
-            // Clean up plot file
-            fs.unlinkSync(plotPath);
-            
-            return `data:${mimeType};base64,${base64Plot}`;
-          });
-
-          if (plotData.length > 0) {
-            processedOutput = plotData.map((data, index) => 
-              `<img src="${data}" alt="Plot ${index + 1}" style="max-width: 100%; height: auto;">`
-            ).join('\n');
-            outputType = 'html';
-          }
-        }
+      pythonProcess.on('error', (err) => {
+        reject(err);
+      });
+    });
+  }
 
-        // Check for DataFrame outputs and format them nicely
-        if (processedOutput.includes('DataFrame') || processedOutput.includes('shape:')) {
-          outputType = 'dataframe';
-        }
+  /**
+   * Turn a finished Python run into the cell result: removes the temp file,
+   * embeds plot files, records quota, the execution session and its metrics.
+   * @param {Object} run - The finished run
+   * @param {string} run.source - The user's code, as submitted
+   * @param {number|null} run.exitCode - Python exit code (null when killed by a signal)
+   * @param {string|null} [run.signal] - Signal that ended the process, if any
+   * @param {number} run.requestedAt - When executeCode was called (ms epoch)
+   * @param {number} run.startTime - When the process was spawned (ms epoch)
+   * @returns {Promise<Object>} result resolved by executeCode
+   */
+  async finalizeExecution({
+    userId, sessionId, source, exitCode, signal = null, stdout, stderr,
+    requestedAt, startTime, tempFile, tempDir, profile = null
+  }) {
+    const finalizeStart = Date.now();
+    const outputBytes = Buffer.byteLength(stdout);
+    const kernel = this.extractKernelMetrics(stdout);
+    stdout = kernel.stdout;
+
+    console.log('Python process closed with code:', exitCode, signal ? `(signal ${signal})` : '');
+    console.log('stdout:', stdout);
+    console.log('stderr:', stderr);
+    
+    const executionTime = Date.now() - startTime;
+    const durationMinutes = Math.ceil(executionTime / (1000 * 60));
+    const success = exitCode === 0;
 
-        // Record usage
-        await this.updateDailyQuota(userId, durationMinutes);
-
-        // Store execution session
-        this.db.run(
-          'INSERT INTO execution_sessions (user_id, session_id, code, output, execution_time, status) VALUES (?, ?, ?, ?, ?, ?)',
-          [userId, sessionId, code, processedOutput, executionTime, code === 0 ? 'success' : 'error']
-        );
-
-        console.log('Resolving with result:', {
-          success: code === 0,
-          output: processedOutput,
-          executionTime,
-          durationMinutes,
-          exitCode: code,
-          error: code !== 0 ? stderr : null
-        });
+    try {
+      // Clean up temp file
+      fs.unlinkSync(tempFile);
+    } catch (err) {
+      console.error('Error cleaning up temp file:', err);
+    }
 
-        resolve({
-          success: code === 0,
-          output: processedOutput,
-          executionTime,
-          durationMinutes,
-          exitCode: code,
-          error: code !== 0 ? stderr : null
-        });
+    // Process output for ML-specific content
+    let processedOutput = stdout || stderr;
+    let outputType = 'text';
+
+    // Check for plot files (robust execution environment)
+    const plotFiles = fs.readdirSync(tempDir).filter(file => 
+      (file.endsWith('.png') || file.endsWith('.svg')) && 
+      (file.startsWith('plot_') || file.startsWith('figure_'))
+    );
+
+    if (plotFiles.length > 0) {
+      // Convert plots to base64 for embedding
+      const plotData = plotFiles.map(plotFile => {
+        const plotPath = path.join(tempDir, plotFile);
+        const plotBuffer = fs.readFileSync(plotPath);
+        const base64Plot = plotBuffer.toString('base64');
+        const mimeType = plotFile.endsWith('.png') ? 'image/png' : 'image/svg+xml';
+        
+        // Clean up plot file
+        fs.unlinkSync(plotPath);
+        
+        return `data:${mimeType};base64,${base64Plot}`;
       });
 
-      pythonProcess.on('error', (err) => {
-        reject(err);
-      });
+      if (plotData.length > 0) {
+        processedOutput = plotData.map((data, index) => 
+          `<img src="${data}" alt="Plot ${index + 1}" style="max-width: 100%; height: auto;">`
+        ).join('\n');
+        outputType = 'html';
+      }
+    }
+
+    // Check for DataFrame outputs and format them nicely
+    if (processedOutput.includes('DataFrame') || processedOutput.includes('shape:')) {
+      outputType = 'dataframe';
+    }
+
+    // Record usage
+    await this.updateDailyQuota(userId, durationMinutes);
+
+    // Store execution session
+    this.db.run(
+      'INSERT INTO execution_sessions (user_id, session_id, code, output, execution_time, status) VALUES (?, ?, ?, ?, ?, ?)',
+      [userId, sessionId, source, processedOutput, executionTime, success ? 'success' : 'error']
+    );
+
+    console.log('Resolving with result:', {
+      success,
+      output: processedOutput,
+      executionTime,
+      durationMinutes,
+      exitCode,
+      error: success ? null : stderr
+    });
+
+    const phases = (kernel.metrics && kernel.metrics.phases) || {};
+    const run = (kernel.metrics && kernel.metrics.run) || {};
+    const memory = (kernel.metrics && kernel.metrics.memory) || {};
+    const metrics = {
+      queueWaitMs: startTime - requestedAt,
+      startupMs: phases.startup ?? null,
+      packagesMs: phases.packages ?? null,
+      userCodeMs: phases.user_code ?? null,
+      renderMs: phases.render ?? null,
+      finalizeMs: Date.now() - finalizeStart,
+      outputBytes,
+      totalMs: executionTime,
+      cpuSeconds: run.cpu_seconds ?? null,
+      peakRssMb: run.peak_rss_mb ?? null,
+      workersPeakRssMb: run.workers_peak_rss_mb ?? null,
+      datasets: memory.datasets || [],
+      largestObjects: memory.largest_objects || [],
+      figures: run.figures ?? null,
+      cacheHits: run.cache_hits ?? null,
+      cacheMisses: run.cache_misses ?? null,
+      exitReason: this.exitReason({ exitCode, signal, executionTime, kernelReason: run.exit_reason }),
+      profile: (kernel.metrics && kernel.metrics.profile) || null
+    };
+
+    this.telemetry.record({
+      user_id: userId,
+      session_id: sessionId,
+      created_at: new Date(startTime).toISOString().replace('T', ' ').slice(0, 19),
+      exit_code: exitCode,
+      exit_reason: metrics.exitReason,
+      profile,
+      queue_wait_ms: metrics.queueWaitMs,
+      startup_ms: metrics.startupMs,
+      packages_ms: metrics.packagesMs,
+      user_code_ms: metrics.userCodeMs,
+      render_ms: metrics.renderMs,
+      finalize_ms: metrics.finalizeMs,
+      total_ms: executionTime,
+      cpu_seconds: metrics.cpuSeconds,
+      peak_rss_mb: metrics.peakRssMb,
+      workers_peak_rss_mb: metrics.workersPeakRssMb,
+      // Runs are attributed to the first dataset they read
+      dataset: metrics.datasets[0] ?? null,
+      largest_objects: metrics.largestObjects.length ? JSON.stringify(metrics.largestObjects) : null,
+      output_bytes: outputBytes,
+      figure_count: metrics.figures,
+      cache_hits: metrics.cacheHits,
+      cache_misses: metrics.cacheMisses
     });
+
+    return {
+      success,
+      output: processedOutput,
+      executionTime,
+      durationMinutes,
+      exitCode,
+      error: success ? null : stderr,
+      metrics
+    };
+  }
+
+  /**
+   * Why a run ended: 'success', 'timeout', 'killed', 'exception',
+   * 'interrupted', 'exit' (non-zero exit without a traceback) or 'error'
+   * (the kernel never reported, e.g. a syntax error in the cell).
+   */
+  exitReason({ exitCode, signal, executionTime, kernelReason }) {
+    if (exitCode === 0) {
+      return 'success';
+    }
+    if (signal) {
+      return executionTime >= EXECUTION_TIMEOUT_MS ? 'timeout' : 'killed';
+    }
+    if (kernelReason) {
+      return kernelReason;
+    }
+    return kernelReason === undefined ? 'error' : 'exit';
+  }
+
+  /**
+   * Split the kernel's metrics line (printed by ml_template.py at exit) out of its stdout.
+   * @param {string} stdout - Raw kernel stdout
+   * @returns {{stdout: string, metrics: Object|null}} stdout without the line, and the parsed metrics
+   */
+  extractKernelMetrics(stdout) {
+    const start = stdout.lastIndexOf(METRICS_MARKER);
+    if (start === -1) {
+      return { stdout, metrics: null };
+    }
+    const end = stdout.indexOf('\n', start);
+    const line = stdout.slice(start + METRICS_MARKER.length, end === -1 ? stdout.length : end);
+    let metrics = null;
+    try {
+      metrics = JSON.parse(line);
+    } catch (err) {
+      console.error('Could not parse kernel metrics:', err.message);
+    }
+    const before = stdout.slice(0, start).replace(/\r?\n$/, '');
+    return { stdout: before + (end === -1 ? '' : stdout.slice(end + 1)), metrics };
   }
 
   async updateDailyQuota(userId, additionalMinutes) {
@@ -409,7 +560,7 @@ class MockGPUService extends GPUServiceInterface {
     });
   }
 
-  async executeCodeWithInputSupport(userId, sessionId, code) {
+  async executeCodeWithInputSupport(userId, sessionId, code, options = {}) {
     console.log('Checking for input() in code:', code);
     
     // Check if code contains input() function calls
@@ -431,7 +582,8 @@ class MockGPUService extends GPUServiceInterface {
         originalCode: code,
         currentInputIndex: 0,
         totalInputs: inputMatches.length,
-        inputMatches: inputMatches
+        inputMatches: inputMatches,
+        options
       });
 
       console.log('Session data stored for:', sessionId);
@@ -450,7 +602,7 @@ class MockGPUService extends GPUServiceInterface {
 
     // No input required, execute normally
     console.log('No input found, executing normally');
-    return this.executeCode(userId, sessionId, code);
+    return this.executeCode(userId, sessionId, code, options);
   }
 
   async handleUserInput(userId, sessionId, input) {
@@ -510,7 +662,7 @@ class MockGPUService extends GPUServiceInterface {
       } else {
         // All inputs provided, execute the final code
         console.log('All inputs provided, executing final code');
-        const result = await this.executeCode(userId, sessionId, modifiedCode);
+        const result = await this.executeCode(userId, sessionId, modifiedCode, sessionData.options);
         
         // Clear the pending input
         this.pendingInputs.delete(sessionId);
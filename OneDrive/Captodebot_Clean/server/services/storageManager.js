@@ -0,0 +1,401 @@
+const path = require('path');
+const fs = require('fs');
+
+const MB = 1024 * 1024;
+const DIGEST_PATTERN = /^[0-9a-f]{64}$/;
+
+/**
+ * Storage lifecycle manager for uploads, temp and derived caches.
+ * Enforces a global and a per-user byte budget with LRU eviction: derived
+ * artifacts (columnar/profile caches, cached models, figures, stray temp
+ * files) go first, source datasets only when that is not enough. Kernel
+ * exports and reports are the user's own outputs: they are evicted last,
+ * and only under their owner's budget. A background compaction
+ * pass removes orphaned objects and leftovers from aborted work.
+ *
+ * Recency is the file mtime; the dataset store touches objects whenever
+ * they are resolved, and the kernel touches cache files it reads.
+ */
+class StorageManager {
+  constructor(db, datasetStore, options = {}) {
+    this.db = db;
+    this.datasetStore = datasetStore;
+    this.tempDir = options.tempDir || path.join(__dirname, '..', 'temp');
+    this.GLOBAL_BUDGET_BYTES = (parseInt(process.env.STORAGE_GLOBAL_BUDGET_MB) || 2048) * MB;
+    this.USER_BUDGET_BYTES = (parseInt(process.env.STORAGE_USER_BUDGET_MB) || 256) * MB;
+    this.COMPACTION_INTERVAL_MS = (parseInt(process.env.STORAGE_COMPACTION_INTERVAL_MINUTES) || 15) * 60 * 1000;
+    // Files younger than this may belong to a running upload or execution
+    this.GRACE_PERIOD_MS = 60 * 60 * 1000;
+    this.timer = null;
+    this.running = null;
+  }
+
+  async walk(dir) {
+    const files = [];
+    let entries;
+    try {
+      entries = await fs.promises.readdir(dir, { withFileTypes: true });
+    } catch {
+      return files;
+    }
+
+    for (const entry of entries) {
+      const entryPath = path.join(dir, entry.name);
+      if (entry.isDirectory()) {
+        files.push(...await this.walk(entryPath));
+      } else if (entry.isFile()) {
+        try {
+          const stat = await fs.promises.stat(entryPath);
+          files.push({ path: entryPath, size: stat.size, mtimeMs: stat.mtimeMs });
+        } catch {
+          // Removed while scanning
+        }
+      }
+    }
+    return files;
+  }
+
+  async getReferences() {
+    await this.datasetStore.ensureSchema();
+    return new Promise((resolve, reject) => {
+      this.db.all('SELECT id, user_id, digest FROM datasets', [], (err, rows) => {
+        if (err) {
+          reject(err);
+        } else {
+          resolve(rows);
+        }
+      });
+    });
+  }
+
+  /**
+   * Scan the store. Source objects are keyed by digest; derived artifacts
+   * carry the digest they were computed from when there is one.
+   */
+  async inventory() {
+    const store = this.datasetStore;
+    const objects = new Map();
+    for (const file of await this.walk(store.objectsDir)) {
+      const digest = path.basename(file.path).split('.')[0];
+      objects.set(digest, { ...file, digest });
+    }
+
+    const derived = [];
+    for (const file of await this.walk(store.cacheDir)) {
+      const owner = path.relative(store.cacheDir, file.path).split(path.sep)[0];
+      derived.push({ ...file, digest: DIGEST_PATTERN.test(owner) ? owner : null, kind: 'cache' });
+    }
+
+    // Kernel exports (export_df) and cached models (cached_fit) are stored
+    // per user: exports/<userId>/<file>, models/<userId>/<key>.joblib
+    // Exports are only evicted under their owner's budget; saved encoders
+    // (encoders/<userId>) are user data and are never evicted
+    for (const [dirName, kind] of [['exports', 'export'], ['models', 'model']]) {
+      const ownerDir = path.join(store.rootDir, dirName);
+      for (const file of await this.walk(ownerDir)) {
+        const owner = path.relative(ownerDir, file.path).split(path.sep)[0];
+        derived.push({ ...file, digest: null, userId: owner, kind });
+      }
+    }
+
+    // Only top-level temp files are managed; subdirectories hold tool caches
+    const tempEntries = await fs.promises.readdir(this.tempDir, { withFileTypes: true }).catch(() => []);
+    for (const entry of tempEntries) {
+      if (!entry.isFile() || entry.name.startsWith('temp_')) {
+        continue;
+      }
+      const entryPath = path.join(this.tempDir, entry.name);
+      try {
+        const stat = await fs.promises.stat(entryPath);
+        derived.push({ path: entryPath, size: stat.size, mtimeMs: stat.mtimeMs, digest: null, kind: 'temp' });
+      } catch {
+        // Removed while scanning
+      }
+    }
+
+    const incoming = await this.walk(store.incomingDir);
+    return { objects, derived, incoming, references: await this.getReferences() };
+  }
+
+  async removeFile(filePath) {
+    // Objects are read-only, which blocks unlinking on some platforms
+    await fs.promises.chmod(filePath, 0o644).catch(() => {});
+    await fs.promises.rm(filePath, { force: true });
+  }
+
+  async removeReference(id) {
+    return new Promise((resolve, reject) => {
+      this.db.run('DELETE FROM datasets WHERE id = ?', [id], (err) => (err ? reject(err) : resolve()));
+    });
+  }
+
+  /**
+   * Delete a stored object and everything derived from it once no catalog
+   * entry references it any more.
+   */
+  async removeObjectIfUnreferenced(digest, references) {
+    if (references.some(ref => ref.digest === digest)) {
+      return 0;
+    }
+    const objectPath = this.datasetStore.objectPath(digest);
+    const cacheDir = this.datasetStore.cachePath(digest);
+    const freed = (await this.walk(cacheDir)).reduce((sum, file) => sum + file.size, 0) +
+      await fs.promises.stat(objectPath).then(stat => stat.size, () => 0);
+
+    await this.removeFile(objectPath);
+    await fs.promises.rm(cacheDir, { recursive: true, force: true });
+    return freed;
+  }
+
+  /**
+   * Evict LRU derived artifacts, then LRU source datasets, then LRU user
+   * outputs (exports and reports, only when `derived` includes them), until
+   * `usage` is within `budget`. Each source carries the catalog references
+   * that are dropped with it; the object itself is deleted once nothing else
+   * references it.
+   * @param {Object} [options]
+   * @param {boolean} [options.chargedPerReference] - Usage counts a source for every owner
+   *   (user budgets), so dropping the references releases it even if another user keeps the object
+   * @param {string} [options.keepDigest] - Source that must not be evicted (a just-finished upload)
+   * @returns {Promise<Object>} { freedBytes, evictedArtifacts, evictedDatasets }
+   */
+  async evict(usage, budget, derived, sources, references, { chargedPerReference = false, keepDigest = null } = {}) {
+    const result = { freedBytes: 0, evictedArtifacts: 0, evictedDatasets: 0 };
+    const now = Date.now();
+    // Bytes taken off `usage`; differs from freedBytes only for shared objects under a user budget
+    let released = 0;
+
+    const removeFiles = async (files) => {
+      for (const file of [...files].sort((a, b) => a.mtimeMs - b.mtimeMs)) {
+        if (usage - released <= budget) {
+          return;
+        }
+        // Temp files and exports this young may belong to a running execution
+        if (now - file.mtimeMs < this.GRACE_PERIOD_MS && (file.kind === 'temp' || file.kind === 'export')) {
+          continue;
+        }
+        await this.removeFile(file.path);
+        result.freedBytes += file.size;
+        released += file.size;
+        result.evictedArtifacts++;
+      }
+    };
+
+    await removeFiles(derived.filter(file => file.kind !== 'export'));
+
+    // Source data: least recently used dataset references first
+    for (const source of [...sources].sort((a, b) => a.mtimeMs - b.mtimeMs)) {
+      if (usage - released <= budget) {
+        break;
+      }
+      if (source.digest === keepDigest) {
+        continue;
+      }
+      for (const ref of source.references) {
+        await this.removeReference(ref.id);
+        result.evictedDatasets++;
+      }
+      const remaining = references.filter(ref => !source.references.includes(ref));
+      references.length = 0;
+      references.push(...remaining);
+      // Nothing is freed on disk while another user still references the object
+      const freed = await this.removeObjectIfUnreferenced(source.digest, references);
+      result.freedBytes += freed;
+      released += chargedPerReference ? Math.max(freed, source.size) : freed;
+    }
+
+    // The user's own outputs go last
+    await removeFiles(derived.filter(file => file.kind === 'export'));
+    return result;
+  }
+
+  userUsage(userId, { objects, derived, references }) {
+    const owned = references.filter(ref => ref.user_id === userId);
+    const digests = new Set(owned.map(ref => ref.digest));
+
+    const userDerived = derived.filter(file =>
+      (file.digest && digests.has(file.digest)) || file.userId === String(userId)
+    );
+    const sources = [...digests]
+      .filter(digest => objects.has(digest))
+      .map(digest => ({ ...objects.get(digest), references: owned.filter(ref => ref.digest === digest) }));
+
+    const sourceBytes = sources.reduce((sum, source) => sum + source.size, 0);
+    const derivedBytes = userDerived.reduce((sum, file) => sum + file.size, 0);
+    return { sources, derived: userDerived, sourceBytes, derivedBytes, totalBytes: sourceBytes + derivedBytes };
+  }
+
+  /**
+   * Evict the user's least recently used data until they are within their budget.
+   * @param {number} userId
+   * @param {Object} [options]
+   * @param {string} [options.keepDigest] - Upload that triggered the check; never evicted
+   */
+  async enforceUserBudget(userId, { keepDigest = null } = {}) {
+    const inventory = await this.inventory();
+    const usage = this.userUsage(userId, inventory);
+    if (usage.totalBytes <= this.USER_BUDGET_BYTES) {
+      return { freedBytes: 0, evictedArtifacts: 0, evictedDatasets: 0 };
+    }
+
+    const result = await this.evict(
+      usage.totalBytes, this.USER_BUDGET_BYTES, usage.derived, usage.sources, inventory.references,
+      { chargedPerReference: true, keepDigest }
+    );
+    console.log(`Storage: user ${userId} over budget, freed ${(result.freedBytes / MB).toFixed(1)} MB`);
+    return result;
+  }
+
+  async enforceGlobalBudget(inventory) {
+    const { objects, derived, references } = inventory || await this.inventory();
+    const sources = [...objects.values()].map(object => ({
+      ...object,
+      references: references.filter(ref => ref.digest === object.digest)
+    }));
+    const totalBytes = sources.reduce((sum, source) => sum + source.size, 0) +
+      derived.reduce((sum, file) => sum + file.size, 0);
+
+    if (totalBytes <= this.GLOBAL_BUDGET_BYTES) {
+      return { freedBytes: 0, evictedArtifacts: 0, evictedDatasets: 0 };
+    }
+
+    // Exports are user data: they count towards the total but are only
+    // evicted under their owner's budget, never to make room for someone else
+    const evictable = derived.filter(file => file.kind !== 'export');
+    const result = await this.evict(totalBytes, this.GLOBAL_BUDGET_BYTES, evictable, sources, references);
+    console.log(`Storage: global budget exceeded, freed ${(result.freedBytes / MB).toFixed(1)} MB`);
+    return result;
+  }
+
+  /**
+   * Remove orphaned objects, caches of deleted objects, abandoned incoming
+   * files and old stray temp files, then enforce every owner's budget
+   * (kernel exports and cached models never pass through an upload) and
+   * the global budget.
+   */
+  async compact() {
+    // Never run two passes over the same files concurrently
+    if (this.running) {
+      return this.running;
+    }
+
+    this.running = (async () => {
+      const inventory = await this.inventory();
+      const now = Date.now();
+      const result = { freedBytes: 0, removedFiles: 0 };
+      const referenced = new Set(inventory.references.map(ref => ref.digest));
+
+      for (const [digest, object] of inventory.objects) {
+        if (!referenced.has(digest) && now - object.mtimeMs > this.GRACE_PERIOD_MS) {
+          result.freedBytes += await this.removeObjectIfUnreferenced(digest, inventory.references);
+          result.removedFiles++;
+          inventory.objects.delete(digest);
+        }
+      }
+
+      const stale = [
+        ...inventory.incoming,
+        ...inventory.derived.filter(file => file.digest && !inventory.objects.has(file.digest)),
+        ...inventory.derived.filter(file => file.kind === 'temp')
+      ].filter(file => now - file.mtimeMs > this.GRACE_PERIOD_MS);
+
+      for (const file of stale) {
+        await this.removeFile(file.path);
+        result.freedBytes += file.size;
+        result.removedFiles++;
+      }
+
+      const removed = new Set(stale.map(file => file.path));
+      inventory.derived = inventory.derived.filter(file => !removed.has(file.path));
+      result.evictedDatasets = 0;
+
+      const owners = new Set(inventory.references.map(ref => ref.user_id).filter(id => id !== null));
+      for (const file of inventory.derived) {
+        if (file.userId && /^\d+$/.test(file.userId)) {
+          owners.add(parseInt(file.userId));
+        }
+      }
+      let current = inventory;
+      for (const userId of owners) {
+        if (this.userUsage(userId, inventory).totalBytes <= this.USER_BUDGET_BYTES) {
+          continue;
+        }
+        const eviction = await this.enforceUserBudget(userId);
+        result.freedBytes += eviction.freedBytes;
+        result.removedFiles += eviction.evictedArtifacts;
+        result.evictedDatasets += eviction.evictedDatasets;
+        current = null;
+      }
+
+      // Rescan when user evictions changed the store
+      const eviction = await this.enforceGlobalBudget(current);
+      result.freedBytes += eviction.freedBytes;
+      result.removedFiles += eviction.evictedArtifacts;
+      result.evictedDatasets += eviction.evictedDatasets;
+      return result;
+    })();
+
+    try {
+      return await this.running;
+    } finally {
+      this.running = null;
+    }
+  }
+
+  /**
+   * Usage report for the admin dashboard.
+   */
+  async getUsage() {
+    const inventory = await this.inventory();
+    const sum = (files) => files.reduce((total, file) => total + file.size, 0);
+    const userIds = [...new Set(inventory.references.map(ref => ref.user_id).filter(id => id !== null))];
+
+    const users = await new Promise((resolve, reject) => {
+      this.db.all('SELECT id, email FROM users', [], (err, rows) => (err ? reject(err) : resolve(rows)));
+    });
+    const emails = new Map(users.map(user => [user.id, user.email]));
+
+    return {
+      globalBudgetBytes: this.GLOBAL_BUDGET_BYTES,
+      userBudgetBytes: this.USER_BUDGET_BYTES,
+      sourceBytes: sum([...inventory.objects.values()]),
+      derivedBytes: sum(inventory.derived.filter(file => file.kind === 'cache')),
+      exportBytes: sum(inventory.derived.filter(file => file.kind === 'export')),
+      modelBytes: sum(inventory.derived.filter(file => file.kind === 'model')),
+      tempBytes: sum(inventory.derived.filter(file => file.kind === 'temp')) + sum(inventory.incoming),
+      objectCount: inventory.objects.size,
+      datasetCount: inventory.references.length,
+      users: userIds
+        .map(userId => {
+          const usage = this.userUsage(userId, inventory);
+          return {
+            userId,
+            email: emails.get(userId) || null,
+            datasets: inventory.references.filter(ref => ref.user_id === userId).length,
+            sourceBytes: usage.sourceBytes,
+            derivedBytes: usage.derivedBytes,
+            totalBytes: usage.totalBytes
+          };
+        })
+        .sort((a, b) => b.totalBytes - a.totalBytes)
+    };
+  }
+
+  start() {
+    if (this.timer) {
+      return;
+    }
+    this.timer = setInterval(() => {
+      this.compact().catch(error => console.error('Storage compaction error:', error));
+    }, this.COMPACTION_INTERVAL_MS);
+    // Do not keep the process alive just for compaction
+    this.timer.unref();
+  }
+
+  stop() {
+    clearInterval(this.timer);
+    this.timer = null;
+  }
+}
+
+module.exports = StorageManager;